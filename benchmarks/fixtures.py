@@ -0,0 +1,101 @@
+"""
+Fixtures for the pipeline benchmarks: media files served by the stub
+providers, and synthetic mapped.json timelines of a given size.
+
+Media is generated with the ffmpeg binary the pipeline already uses
+(imageio_ffmpeg), from ffmpeg's test sources, so every run gets identical
+files without binaries in the repository.
+"""
+import json
+import os
+import subprocess
+
+DEFAULT_FIXTURE_DIR = ".cache/benchmarks/fixtures"
+
+# name -> ffmpeg arguments producing it
+_MEDIA = {
+    "image.jpg": ["-f", "lavfi", "-i", "testsrc2=size=1280x720", "-frames:v", "1", "-q:v", "3"],
+    "clip.mp4": ["-f", "lavfi", "-i", "testsrc2=size=480x480:rate=15:duration=2",
+                 "-pix_fmt", "yuv420p", "-c:v", "libx264", "-preset", "veryfast"],
+    "clip.gif": ["-f", "lavfi", "-i", "testsrc2=size=320x320:rate=10:duration=2"],
+    # One second of silence; fake TTS repeats it to the length of the text
+    "silence.mp3": ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono", "-t", "1",
+                    "-c:a", "libmp3lame", "-b:a", "128k"],
+}
+
+# Asset types of a synthetic timeline, in rotation
+TIMELINE_TYPES = ("image", "gif", "text")
+
+_WORDS = ("river", "engine", "signal", "harbor", "lantern", "circuit", "meadow", "glacier",
+          "compass", "orbit", "canyon", "beacon", "falcon", "quartz", "summit", "tunnel")
+
+
+def ensure_fixtures(fixture_dir=DEFAULT_FIXTURE_DIR):
+    """
+    Creates any missing fixture file.
+
+    Returns:
+        dict: fixture name -> path.
+    """
+    import imageio_ffmpeg
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    paths = {}
+    for name, args in _MEDIA.items():
+        path = os.path.join(fixture_dir, name)
+        if not os.path.exists(path):
+            tmp_path = os.path.join(fixture_dir, f".part.{name}")
+            subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error", *args, tmp_path],
+                           check=True)
+            os.replace(tmp_path, path)
+        paths[name] = path
+    return paths
+
+
+def make_sentences(count, words_per_sentence=8):
+    """Deterministic narration of count sentences."""
+    sentences = []
+    for i in range(count):
+        words = [_WORDS[(i * 7 + j) % len(_WORDS)] for j in range(words_per_sentence)]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+def make_timeline(count, asset_seconds=2.0):
+    """
+    Synthetic mapped.json content: count back-to-back assets of asset_seconds
+    each, cycling through image, gif and text, in the shape map_assets returns.
+    """
+    step = int(asset_seconds * 1000)
+    timeline = []
+    for i in range(count):
+        timeline.append({
+            "order_id": i + 1,
+            "text": " ".join(_WORDS[(i + j) % len(_WORDS)] for j in range(2)),
+            "type": TIMELINE_TYPES[i % len(TIMELINE_TYPES)],
+            "start": i * step,
+            "end": (i + 1) * step - 1 if i + 1 < count else (i + 1) * step,
+        })
+    return timeline
+
+
+def write_timeline(count, fixture_dir=DEFAULT_FIXTURE_DIR, asset_seconds=2.0):
+    """Writes make_timeline(count) to <fixture_dir>/mapped_<count>.json and returns the path."""
+    path = os.path.join(fixture_dir, f"mapped_{count}.json")
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_timeline(count, asset_seconds), f, indent=4)
+    return path
+
+
+def write_narration(path, seconds, silence_mp3):
+    """Silent MP3 narration of about seconds length, built from the one-second fixture."""
+    from tools.audio.audio_utils import strip_id3
+
+    with open(silence_mp3, "rb") as f:
+        second = strip_id3(f.read())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        for _ in range(int(seconds + 1)):
+            f.write(second)
+    return path
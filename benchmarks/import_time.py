@@ -0,0 +1,77 @@
+"""
+Import-time benchmark for the tools package.
+
+Every case runs in a fresh interpreter (so nothing is already cached in
+sys.modules) and reports the median wall time over several runs, plus any
+heavy dependency the import dragged in. Lightweight entry points must not
+load moviepy, pygame or the provider SDKs.
+
+    python benchmarks/import_time.py [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that make an import slow or need API keys / native libraries
+HEAVY_MODULES = ("moviepy", "pygame", "assemblyai", "elevenlabs", "google.genai", "pyht", "streamlit")
+
+CASES = {
+    "package": "import tools",
+    "segmentation": "from tools import words_to_sentances, segment_transcript, WordTimeline",
+    "json utils": "from tools import extract_json, iter_json_objects",
+    "pipeline state": "from tools import PipelineState",
+    "pipeline runner": "from tools.pipeline.runner import build_stages, DEFAULT_CONFIG",
+    "cache": "from tools.cache import DiskCache",
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed * 1000, "heavy": heavy}}))
+"""
+
+
+def measure(statement, runs=5):
+    """Median import time (ms) of statement in fresh interpreters, and the heavy modules it loaded."""
+    times, heavy = [], []
+    for _ in range(runs):
+        probe = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+        result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr else "failed"}
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(data["ms"])
+        heavy = data["heavy"]
+    return {"ms": round(statistics.median(times), 1), "heavy": heavy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {name: measure(statement, args.runs) for name, statement in CASES.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            if "error" in result:
+                print(f"{name:<18} ERROR {result['error']}")
+            else:
+                heavy = f"  loads: {', '.join(result['heavy'])}" if result["heavy"] else ""
+                print(f"{name:<18} {result['ms']:>8.1f} ms{heavy}")
+    # Non-zero exit when a lightweight entry point pulls in a heavy dependency
+    return 1 if any(r.get("heavy") or "error" in r for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+End-to-end pipeline benchmark on offline stub providers.
+
+Every provider is replaced by a local stand-in with a fixed latency (see
+stubs.py): Gemini, ElevenLabs and AssemblyAI by fake SDK modules, and
+Google Custom Search, Unsplash and Tenor by a stub HTTP server serving
+fixture media. Each timeline size runs in a fresh interpreter with cold
+caches and reports, per stage, wall time, throughput, render fps and peak
+RSS, and compares them with stored baselines.
+
+    python benchmarks/pipeline.py [--sizes 10 100 1000] [--stages ...] [--latency-ms 50]
+    python benchmarks/pipeline.py --save-baseline   # record this machine's numbers
+
+Exits 1 when a stage fails or regresses beyond --tolerance. Baselines are
+only comparable on the machine that recorded them.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_BASELINE = os.path.join(HERE, "baselines.json")
+DEFAULT_WORKDIR = ".cache/benchmarks/runs"
+
+# Stage -> (group, unit of its throughput). A failed stage skips the rest of its group.
+STAGES = {
+    "script": ("text", "calls"),
+    "tts": ("text", "sentences"),
+    "stt": ("text", "words"),
+    "segment": ("text", "sentences"),
+    "assets": ("text", "calls"),
+    "map": ("text", "assets"),
+    "fetch": ("media", "assets"),
+    "render": ("media", "frames"),
+    "render_segmented": ("media", "frames"),
+    "render_ken_burns": ("media", "frames"),
+}
+
+# Differences below this many seconds are noise, whatever the ratio
+NOISE_SECONDS = 0.05
+
+
+# --- Measuring (in the child process) ---
+
+def _reset_peak_rss():
+    """Resets the kernel's peak RSS counter (Linux); False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(fn):
+    """Runs fn() and returns (its result, {"seconds", "peak_rss_mb"}); seconds are unrounded."""
+    _reset_peak_rss()
+    started = time.perf_counter()
+    result = fn()
+    return result, {"seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_size(count, args):
+    """Benchmarks one timeline size; meant to run in a fresh interpreter."""
+    from fixtures import ensure_fixtures, make_sentences, write_timeline, write_narration
+    from stubs import StubServer, FakeProviders, install_fake_sdks
+
+    workdir = os.path.abspath(os.path.join(args.workdir, f"size_{count}"))
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(os.path.join(workdir, "render"))
+    # Cold caches, so every run measures real work
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "cache", "tts")
+    os.environ["TRANSCRIPT_CACHE_DIR"] = os.path.join(workdir, "cache", "transcripts")
+
+    latency = args.latency_ms / 1000
+    fixtures = ensure_fixtures(args.fixture_dir)
+    providers = install_fake_sdks(FakeProviders(make_sentences(count), latency,
+                                                silence_mp3=fixtures["silence.mp3"]))
+    server = StubServer(fixtures, latency).start()
+
+    from tools.pipeline import (PipelineState, run_script, run_tts, run_stt, run_segment,
+                                run_assets, run_map, run_fetch, run_render)
+
+    with open(write_timeline(count, args.fixture_dir, args.asset_seconds), "r", encoding="utf-8") as f:
+        timeline = json.load(f)
+    duration = timeline[-1]["end"] / 1000
+    frames = round(duration * args.fps)
+    background = os.path.join(ROOT, "background.jpg")
+
+    text = PipelineState(topic="benchmark")
+    media = PipelineState(mapped=timeline,
+                          audio_path=write_narration(os.path.join(workdir, "narration.mp3"), duration,
+                                                     fixtures["silence.mp3"]))
+    media_dir = os.path.join(workdir, "media")
+
+    def stt():
+        text.transcript = None  # TTS already returned timings; measure transcription anyway
+        run_stt(text, use_cache=False)
+
+    steps = {
+        "script": (lambda: run_script(text), lambda: 1),
+        "tts": (lambda: run_tts(text, os.path.join(workdir, "audio", "narration.mp3"),
+                                os.path.join(workdir, "transcript.json"), use_cache=False),
+                lambda: count),
+        "stt": (stt, lambda: len(text.transcript["words"])),
+        "segment": (lambda: run_segment(text), lambda: len(text.sentences)),
+        "assets": (lambda: run_assets(text), lambda: len(text.sentences)),
+        "map": (lambda: run_map(text), lambda: len(text.mapped)),
+        "fetch": (lambda: run_fetch(media, media_dir=media_dir), lambda: count),
+        "render": (lambda: run_render(media, os.path.join(workdir, "render", "final.mp4"), background,
+                                      args.fps, media_dir=media_dir),
+                   lambda: frames),
+        "render_segmented": (lambda: run_render(media, os.path.join(workdir, "render", "segmented.mp4"),
+                                                background, args.fps, segment_seconds=args.segment_seconds,
+                                                media_dir=media_dir),
+                             lambda: frames),
+        # Same timeline with still images panned and zoomed instead of shaken; compare with render
+        "render_ken_burns": (lambda: run_render(media, os.path.join(workdir, "render", "ken_burns.mp4"),
+                                                background, args.fps, media_dir=media_dir,
+                                                motion={"ken_burns": True}),
+                             lambda: frames),
+    }
+
+    results, failed_groups = {}, set()
+    for name in args.stages:
+        group, unit = STAGES[name]
+        if group in failed_groups:
+            results[name] = {"skipped": True}
+            continue
+        run, items = steps[name]
+        try:
+            _, stats = measure(run)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            failed_groups.add(group)
+            continue
+        stats["items"] = items()
+        stats["unit"] = unit
+        # From the unrounded time, so a stage faster than a millisecond still has one
+        stats["throughput"] = round(stats["items"] / stats["seconds"], 2) if stats["seconds"] > 0 else None
+        stats["seconds"] = round(stats["seconds"], 3)
+        if unit == "frames":
+            stats["fps"] = stats["throughput"]
+        results[name] = stats
+        print(f"{name}: {stats}")
+
+    server.stop()
+    # Stage peaks reset the counter, so the run's peak is the largest of them
+    peak = max([_peak_rss_mb()] + [s["peak_rss_mb"] for s in results.values() if "peak_rss_mb" in s])
+    return {"size": count, "stages": results, "peak_rss_mb": peak,
+            "provider_calls": dict(providers.calls, http=server.requests)}
+
+
+# --- Orchestrating (in the parent process) ---
+
+def run_child(count, args):
+    """Runs one size in a fresh interpreter; its output goes to a log next to its workdir."""
+    os.makedirs(args.workdir, exist_ok=True)
+    result_path = os.path.join(args.workdir, f"size_{count}.json")
+    log_path = os.path.join(args.workdir, f"size_{count}.log")
+    if os.path.exists(result_path):
+        os.remove(result_path)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", str(count), "--result-file", result_path,
+           "--latency-ms", str(args.latency_ms), "--fps", str(args.fps),
+           "--asset-seconds", str(args.asset_seconds), "--segment-seconds", str(args.segment_seconds),
+           "--workdir", args.workdir, "--fixture-dir", args.fixture_dir, "--stages", *args.stages]
+    with open(log_path, "w", encoding="utf-8") as log:
+        returncode = subprocess.run(cmd, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT).returncode
+    if returncode != 0 or not os.path.exists(result_path):
+        return {"size": count, "error": f"benchmark process exited with {returncode} (see {log_path})"}
+    with open(result_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions against a baseline: stages that got slower, or used more
+    memory, by more than tolerance (a fraction).
+
+    Returns:
+        list: human-readable regression lines.
+    """
+    regressions = []
+    for result in results:
+        base_stages = baseline.get(str(result["size"]), {}).get("stages", {})
+        for name, stats in result.get("stages", {}).items():
+            base = base_stages.get(name)
+            if not base or "seconds" not in base or "seconds" not in stats:
+                continue
+            if (stats["seconds"] > base["seconds"] * (1 + tolerance)
+                    and stats["seconds"] - base["seconds"] > NOISE_SECONDS):
+                regressions.append(f"size {result['size']} {name}: {base['seconds']}s -> {stats['seconds']}s")
+            if stats["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f"size {result['size']} {name}: peak RSS "
+                                   f"{base['peak_rss_mb']} MB -> {stats['peak_rss_mb']} MB")
+    return regressions
+
+
+def _change(value, base):
+    if not base:
+        return ""
+    return f"{(value - base) / base * 100:+.0f}%"
+
+
+def print_report(results, baseline):
+    print(f"{'size':>5} {'stage':<17} {'seconds':>9} {'vs base':>8} {'throughput':>18} {'peak RSS':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['size']:>5} ERROR {result['error']}")
+            continue
+        base_stages = baseline.get(str(result["size"]), {}).get("stages", {})
+        for name, stats in result["stages"].items():
+            if "error" in stats or stats.get("skipped"):
+                print(f"{result['size']:>5} {name:<17} {'skipped' if stats.get('skipped') else 'ERROR ' + stats['error']}")
+                continue
+            base = base_stages.get(name, {}).get("seconds")
+            throughput = f"{stats['throughput']} {stats['unit']}/s" if stats["throughput"] is not None else "n/a"
+            print(f"{result['size']:>5} {name:<17} {stats['seconds']:>9.3f} {_change(stats['seconds'], base):>8} "
+                  f"{throughput:>18} {stats['peak_rss_mb']:>7.1f} MB")
+        print(f"{result['size']:>5} {'(process)':<17} {'':>9} {'':>8} {'':>18} {result['peak_rss_mb']:>7.1f} MB"
+              f"  calls: {result['provider_calls']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Timeline sizes in assets")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latency of every stub provider call")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--asset-seconds", type=float, default=2.0, help="Length of each timeline asset")
+    parser.add_argument("--segment-seconds", type=float, default=10)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--fixture-dir", default=os.path.join(".cache", "benchmarks", "fixtures"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown or memory growth before a stage counts as regressed")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        sys.path.insert(0, ROOT)
+        result = run_size(args.child, args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        return 0
+
+    os.chdir(ROOT)
+    results = []
+    for count in args.sizes:
+        print(f"Benchmarking {count} assets...", file=sys.stderr)
+        results.append(run_child(count, args))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline)
+
+    failed = [r for r in results if "error" in r or any("error" in s for s in r["stages"].values())]
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    # Keep --json output parseable
+    notes = sys.stderr if args.json else sys.stdout
+    for line in regressions:
+        print(f"REGRESSION {line}", file=notes)
+    if not baseline:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline.", file=notes)
+
+    if args.save_baseline:
+        if failed:
+            print("Not saving a baseline from a run with failures.", file=notes)
+        else:
+            stored = {}
+            if os.path.exists(args.baseline):
+                with open(args.baseline, "r", encoding="utf-8") as f:
+                    stored = json.load(f).get("results", {})
+            # Per stage, so a run of some stages keeps the baselines of the others
+            for r in results:
+                entry = stored.setdefault(str(r["size"]), {"size": r["size"], "stages": {}})
+                entry["stages"].update(r["stages"])
+                entry.update({k: v for k, v in r.items() if k != "stages"})
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump({"machine": {"platform": platform.platform(), "python": platform.python_version(),
+                                       "cpus": os.cpu_count()},
+                           "latency_ms": args.latency_ms, "fps": args.fps, "results": stored}, f, indent=2)
+            print(f"Baseline saved to {args.baseline}", file=notes)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
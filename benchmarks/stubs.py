@@ -0,0 +1,223 @@
+"""
+Offline stand-ins for every provider the pipeline calls, with configurable
+latency, so benchmarks measure our own code and not the network.
+
+- StubServer: local HTTP server answering the Google Custom Search,
+  Unsplash and Tenor endpoints (and serving the fixture media they point to).
+  The tools reach it through GOOGLE_SEARCH_API_URL, UNSPLASH_API_URL and
+  TENOR_API_URL.
+- install_fake_sdks(): registers fake google.genai, elevenlabs and
+  assemblyai modules. Call it before anything imports the tools that use them.
+"""
+import base64
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class StubServer:
+    """Threaded HTTP stub for the search/media providers, on a free localhost port."""
+
+    def __init__(self, fixtures, latency=0.05, host="127.0.0.1"):
+        self.fixtures = fixtures  # name -> path, see fixtures.ensure_fixtures
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, 0), self._make_handler())
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        os.environ.update({
+            "GOOGLE_SEARCH_API_URL": f"{self.url}/google",
+            "UNSPLASH_API_URL": f"{self.url}/unsplash",
+            "TENOR_API_URL": f"{self.url}/tenor",
+            # The download functions refuse to run without credentials
+            "SEARCH_ENGINE_API_KEY": "stub", "SEARCH_ENGINE_ID": "stub",
+            "UNSPLASH_ACCESS_KEY": "stub", "TENOR_API_KEY": "stub", "C_KEY": "stub",
+        })
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def response(self, path):
+        """(status, content type, body) for a request path."""
+        route = urlparse(path).path
+        file_url = f"{self.url}/files/"
+        if route.startswith("/google"):
+            return _json({"items": [{"link": file_url + "image.jpg"}]})
+        if route.startswith("/unsplash/search/photos"):
+            return _json({"results": [{"urls": {"regular": file_url + "image.jpg"}}]})
+        if route.startswith("/tenor/search"):
+            return _json({"results": [{"media_formats": {"mp4": {"url": file_url + "clip.mp4"},
+                                                         "gif": {"url": file_url + "clip.gif"}}}]})
+        if route.startswith("/files/"):
+            name = route[len("/files/"):]
+            if name in self.fixtures:
+                with open(self.fixtures[name], "rb") as f:
+                    return 200, _CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream"), f.read()
+        return 404, "application/json", b'{"error": "not found"}'
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+                status, content_type, body = stub.response(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+_CONTENT_TYPES = {".jpg": "image/jpeg", ".mp4": "video/mp4", ".gif": "image/gif", ".mp3": "audio/mpeg"}
+
+
+def _json(data):
+    return 200, "application/json", json.dumps(data).encode("utf-8")
+
+
+# --- Fake SDKs ---
+
+class FakeProviders:
+    """What the fake SDKs answer with, and how long they take to answer."""
+
+    def __init__(self, sentences=(), latency=0.05, seconds_per_word=0.35, silence_mp3=None):
+        self.sentences = list(sentences)  # the narration the fake LLM "writes"
+        self.latency = latency
+        self.seconds_per_word = seconds_per_word
+        self.silence_mp3 = silence_mp3
+        self.calls = {"genai": 0, "elevenlabs": 0, "assemblyai": 0}
+        self._lock = threading.Lock()
+        self._second = None
+
+    def call(self, provider):
+        with self._lock:
+            self.calls[provider] += 1
+        time.sleep(self.latency)
+
+    def speech(self, text):
+        """MP3 bytes about as long as text takes to read, and their duration in seconds."""
+        from tools.audio.audio_utils import strip_id3, mp3_duration_ms
+
+        if self._second is None:
+            with open(self.silence_mp3, "rb") as f:
+                self._second = strip_id3(f.read())
+        seconds = max(1, round(len(text.split()) * self.seconds_per_word))
+        audio = self._second * seconds
+        return audio, mp3_duration_ms(audio) / 1000
+
+
+class _FakeModels:
+    _types = itertools.cycle(("image", "gif", "text"))
+
+    def __init__(self, providers):
+        self.providers = providers
+
+    def _answer(self, contents):
+        if "\nTopic:" in contents:
+            return json.dumps({"script": " ".join(self.providers.sentences)})
+        if "\nSentences:" in contents:
+            count = sum(1 for line in contents.split("\nSentences:\n", 1)[1].splitlines() if line.strip())
+            return json.dumps([{"order_id": i + 1, "text": f"asset {i + 1}", "type": next(self._types)}
+                               for i in range(count)])
+        sentence = contents.rsplit("\nSentence:", 1)[-1].split()
+        return json.dumps({"text": " ".join(sentence[:2]), "type": next(self._types)})
+
+    def generate_content(self, model, contents, **kwargs):
+        self.providers.call("genai")
+        return types.SimpleNamespace(text=self._answer(contents))
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        self.providers.call("genai")
+        text = self._answer(contents)
+        for start in range(0, len(text), 64):
+            yield types.SimpleNamespace(text=text[start:start + 64])
+
+
+class _FakeTextToSpeech:
+    def __init__(self, providers):
+        self.providers = providers
+
+    def convert(self, text, **kwargs):
+        self.providers.call("elevenlabs")
+        audio, _ = self.providers.speech(text)
+        return iter([audio[i:i + 4096] for i in range(0, len(audio), 4096)])
+
+    def convert_with_timestamps(self, text, **kwargs):
+        self.providers.call("elevenlabs")
+        audio, seconds = self.providers.speech(text)
+        step = seconds / max(1, len(text))
+        alignment = types.SimpleNamespace(
+            characters=list(text),
+            character_start_times_seconds=[i * step for i in range(len(text))],
+            character_end_times_seconds=[(i + 1) * step for i in range(len(text))],
+        )
+        return types.SimpleNamespace(audio_base_64=base64.b64encode(audio).decode("ascii"),
+                                     alignment=alignment)
+
+
+class _FakeTranscriber:
+    def __init__(self, providers, config=None):
+        self.providers = providers
+
+    def transcribe(self, audio_file):
+        from tools.audio.audio_utils import audio_duration_ms
+
+        self.providers.call("assemblyai")
+        with open(audio_file, "rb") as f:
+            duration = audio_duration_ms(f.read())
+        words = " ".join(self.providers.sentences).split()
+        step = duration / max(1, len(words))
+        return types.SimpleNamespace(
+            status="completed", error=None, text=" ".join(words),
+            words=[types.SimpleNamespace(start=int(i * step), end=int((i + 1) * step), text=word)
+                   for i, word in enumerate(words)],
+        )
+
+
+def install_fake_sdks(providers):
+    """Registers fake google.genai, elevenlabs and assemblyai modules backed by providers."""
+    genai = types.ModuleType("google.genai")
+    genai.Client = lambda *args, **kwargs: types.SimpleNamespace(models=_FakeModels(providers))
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.__path__ = getattr(google, "__path__", [])
+    google.genai = genai
+
+    elevenlabs = types.ModuleType("elevenlabs")
+    elevenlabs_client = types.ModuleType("elevenlabs.client")
+    elevenlabs_client.ElevenLabs = lambda *args, **kwargs: types.SimpleNamespace(
+        text_to_speech=_FakeTextToSpeech(providers))
+    elevenlabs.client = elevenlabs_client
+
+    assemblyai = types.ModuleType("assemblyai")
+    assemblyai.settings = types.SimpleNamespace(api_key="stub")
+    assemblyai.TranscriptStatus = types.SimpleNamespace(completed="completed", error="error")
+    assemblyai.TranscriptionConfig = lambda **kwargs: types.SimpleNamespace(**kwargs)
+    assemblyai.Transcriber = lambda config=None: _FakeTranscriber(providers, config)
+
+    sys.modules.update({
+        "google": google, "google.genai": genai,
+        "elevenlabs": elevenlabs, "elevenlabs.client": elevenlabs_client,
+        "assemblyai": assemblyai,
+    })
+    return providers
@@ -1,21 +1,26 @@
 import streamlit as st
 import os
 import json
+import time
 from tools import (
     text_to_audio_elevenlabs,
     speech_to_text_assemblyai,
-    generate_script,
+    generate_script_with_audio,
     generate_assets,
     map_assets_to_sentences,
     words_to_sentances,
     json_to_script_text,
     render_video,
-    generate_assets_from_json
+    generate_assets_from_json,
+    PipelineState
 )
+from tools.pipeline import run_stt, run_segment, run_assets, run_map, run_fetch, run_render
+from tools.pipeline import render_via_daemon, JobRunner
 
 # --- SETUP ---
 st.set_page_config(layout="wide")
 OUTPUT_DIR = "output"
+POLL_SECONDS = 0.5
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 st.title("Advanced Video Generation Pipeline 🎬")
 
@@ -26,21 +31,87 @@ if 'sentences_ready' not in st.session_state:
     st.session_state.sentences_ready = False
 if 'assets_ready' not in st.session_state:
     st.session_state.assets_ready = False
+if 'pipeline' not in st.session_state:
+    st.session_state.pipeline = PipelineState()
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}  # step -> Job running or finished in the background
+
+# --- BACKGROUND JOBS ---
+# The API clients, fonts and background frame are already process-wide in tools,
+# so the runner is the only resource that needs to outlive reruns and sessions.
+@st.cache_resource
+def get_job_runner():
+    """One worker per server process, so renders from several tabs don't compete for the CPU."""
+    return JobRunner(max_workers=1)
+
+def start_job(step, fn, *args):
+    st.session_state.jobs[step] = get_job_runner().submit(step, fn, *args)
+
+def busy():
+    return any(job.running for job in st.session_state.jobs.values())
+
+def job_status(step):
+    """Shows the progress of a step's job; returns its status, or None if it never ran."""
+    job = st.session_state.jobs.get(step)
+    if job is None:
+        return None
+    info = job.snapshot()
+    for stage, seconds in info["stages"]:
+        st.caption(f"✅ {stage} ({seconds}s)")
+    if job.running:
+        label = info["stage"] or "Waiting for the worker"
+        if info["message"]:
+            label += f" - {info['message']}"
+        st.progress(info["fraction"], text=f"{label}... ({info['elapsed']}s)")
+    elif info["status"] == "failed":
+        st.error(f"{info['error']} (see the server log for the traceback)")
+    return info["status"]
 
 # --- HELPER FUNCTION TO VISUALIZE JSON ---
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_json_file(file_path, mtime):
+    """Parsed artifact; the mtime in the key re-reads it only after the file changes."""
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_file_bytes(file_path, mtime):
+    with open(file_path, "rb") as f:
+        return f.read()
+
 def show_json_file(file_path, header):
     """Reads a JSON file and displays it in Streamlit."""
     if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            try:
-                data = json.load(f)
-                st.subheader(header)
-                st.json(data)
-            except (json.JSONDecodeError, FileNotFoundError):
-                st.error(f"Error reading {file_path}. It might be empty or invalid.")
+        try:
+            data = load_json_file(file_path, os.path.getmtime(file_path))
+            st.subheader(header)
+            st.json(data)
+        except (json.JSONDecodeError, FileNotFoundError):
+            st.error(f"Error reading {file_path}. It might be empty or invalid.")
     else:
         st.warning(f"{file_path} not found.")
 
+def show_final_video(file_path):
+    st.video(file_path)
+    st.download_button(
+        label="Download Final Video",
+        data=load_file_bytes(file_path, os.path.getmtime(file_path)),
+        file_name="final_video.mp4",
+        mime="video/mp4"
+    )
+
+def show_json(data, header):
+    """Displays in-memory pipeline data without touching the disk."""
+    st.subheader(header)
+    st.json(data)
+
+# --- SEGMENTATION SETTINGS ---
+st.sidebar.header("Segmentation")
+assets_per_minute = st.sidebar.slider(
+    "Target assets per minute (0 = break on every phrase)", 0, 60, 0,
+    help="Merges short fragments and splits run-ons by duration, which cuts API calls, downloads and render layers."
+)
+
 # --- UI FOR CHOOSING STARTING POINT ---
 st.header("1. Choose Your Starting Point")
 start_option = st.radio(
@@ -57,6 +128,60 @@ sentences_path = f"{OUTPUT_DIR}/transcript/sentences.json"
 assets_path = f"{OUTPUT_DIR}/assets/asset.json"
 mapped_path = f"{OUTPUT_DIR}/render/mapped.json"
 final_video_path = f"{OUTPUT_DIR}/render/final.mp4"
+state_path = f"{OUTPUT_DIR}/state.json"
+
+# ---------------------------------------------------
+# JOBS: run on the background worker and report their progress.
+# They only touch the PipelineState they were given, never st.session_state.
+# ---------------------------------------------------
+def topic_job(job, pipeline, topic):
+    job.report("Generating script and narration audio")
+    script_path = f"{OUTPUT_DIR}/scripts/script.json"
+    # Sentences are sent to TTS while the script is still streaming in
+    script_text, _ = generate_script_with_audio(topic, script_path, audio_path,
+                                                transcript_path=transcript_path)
+    pipeline.script = script_text
+
+def narration_job(job, pipeline, narration_text):
+    job.report("Generating narration audio")
+    os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+    # Word timings come back with the audio, so STT is skipped later
+    text_to_audio_elevenlabs(narration_text, output_path=audio_path,
+                             transcript_path=transcript_path)
+
+def transcript_job(job, pipeline, assets_per_minute):
+    pipeline.audio_path = audio_path
+    # A transcript from TTS timings or a manual upload is read once; otherwise transcribe
+    if pipeline.transcript is None and os.path.exists(transcript_path):
+        with open(transcript_path, "r") as f:
+            pipeline.transcript = json.load(f)
+    if pipeline.transcript is None:
+        job.report("Generating transcript from audio")
+        run_stt(pipeline)
+
+    # Now, create sentences from the transcript (whether provided or generated)
+    job.report("Splitting sentences")
+    run_segment(pipeline, assets_per_minute=assets_per_minute or None)
+    pipeline.save(state_path)
+
+def assets_job(job, pipeline):
+    job.report("Generating assets based on sentences")
+    run_assets(pipeline)
+    pipeline.save(state_path)
+
+def render_job(job, pipeline):
+    job.report("Mapping assets to sentence timings")
+    run_map(pipeline)
+    pipeline.save(state_path)
+
+    job.report("Downloading/creating asset files")
+    run_fetch(pipeline, progress=job.progress("Downloading/creating asset files"))
+
+    # A running render daemon (python -m tools.pipeline --serve) skips the cold start
+    job.report("Rendering the final video", message="on the render daemon")
+    if not render_via_daemon(pipeline, final_video_path):
+        job.report(message="frames written")
+        run_render(pipeline, final_video_path, progress=job.progress("Rendering the final video"))
 
 # ---------------------------------------------------
 # STEP 1: Process Input and Prepare Audio/Transcript
@@ -66,6 +191,8 @@ def reset_state():
     st.session_state.audio_ready = False
     st.session_state.sentences_ready = False
     st.session_state.assets_ready = False
+    st.session_state.pipeline = PipelineState()
+    st.session_state.jobs = {}
     # Clean up old files if they exist to prevent using stale data
     for path in [audio_path, transcript_path, sentences_path, assets_path, mapped_path]:
         if os.path.exists(path):
@@ -75,37 +202,22 @@ def reset_state():
 if start_option == 'Topic':
     st.subheader("Generate everything from a single topic")
     topic = st.text_input("Enter a topic", "The history of the Eiffel Tower")
-    if st.button("Generate Video from Topic"):
+    if st.button("Generate Video from Topic", disabled=busy()):
         reset_state()
-        with st.spinner("1. Generating script... 📜"):
-            script_path = f"{OUTPUT_DIR}/scripts/script.json"
-            os.makedirs(os.path.dirname(script_path), exist_ok=True)
-            script_json_output = generate_script(topic, script_path)
-            script_text = json_to_script_text(script_path)
-            st.success("Script generated!")
-            st.json(script_json_output)
-        with st.spinner("2. Generating narration audio... 🎤"):
-            os.makedirs(os.path.dirname(audio_path), exist_ok=True)
-            text_to_audio_elevenlabs(script_text, output_path=audio_path)
-            st.success("Audio generated!")
-            st.session_state.audio_ready = True
+        start_job("input", topic_job, st.session_state.pipeline, topic)
 
 elif start_option == 'Narration Text':
     st.subheader("Provide your own script to generate the video")
     narration_text = st.text_area("Enter your script here", height=200)
-    if st.button("Generate Video from Text") and narration_text:
+    if st.button("Generate Video from Text", disabled=busy()) and narration_text:
         reset_state()
-        with st.spinner("1. Generating narration audio... 🎤"):
-            os.makedirs(os.path.dirname(audio_path), exist_ok=True)
-            text_to_audio_elevenlabs(narration_text, output_path=audio_path)
-            st.success("Audio generated!")
-            st.session_state.audio_ready = True
+        start_job("input", narration_job, st.session_state.pipeline, narration_text)
 
 elif start_option == 'Audio File':
     st.subheader("Upload your own narration audio file")
     uploaded_audio = st.file_uploader("Choose an audio file", type=['mp3', 'wav', 'm4a'])
     if uploaded_audio is not None:
-        if st.button("Generate Video from Audio"):
+        if st.button("Generate Video from Audio", disabled=busy()):
             reset_state()
             with st.spinner("1. Saving uploaded audio... 🎧"):
                 os.makedirs(os.path.dirname(audio_path), exist_ok=True)
@@ -129,12 +241,13 @@ elif start_option == 'Manual Transcript':
         ]}, indent=4)
     manual_transcript_json = st.text_area("2. Paste your transcript JSON here", height=250, value=placeholder_transcript)
 
-    if st.button("Generate from Manual Transcript"):
+    if st.button("Generate from Manual Transcript", disabled=busy()):
         if uploaded_audio is not None and manual_transcript_json:
             reset_state()
             try:
                 # Validate and save the transcript
                 json_data = json.loads(manual_transcript_json)
+                st.session_state.pipeline.transcript = json_data
                 os.makedirs(os.path.dirname(transcript_path), exist_ok=True)
                 with open(transcript_path, "w") as f:
                     json.dump(json_data, f, indent=4)
@@ -151,6 +264,13 @@ elif start_option == 'Manual Transcript':
         else:
             st.warning("Please upload an audio file and provide the transcript JSON.")
 
+# Topic and narration text are turned into audio on the background worker
+if job_status("input") == "done":
+    if st.session_state.pipeline.script:
+        st.json({"script": st.session_state.pipeline.script})
+    if not st.session_state.audio_ready:
+        st.success("Audio generated!")
+        st.session_state.audio_ready = True
 
 # ---------------------------------------------------
 # STEP 2: Transcription and Sentence Splitting
@@ -159,20 +279,19 @@ if st.session_state.audio_ready:
     st.header("2. Processing Audio")
     st.audio(audio_path)
     if not st.session_state.sentences_ready:
-        with st.spinner("Processing transcript and splitting sentences... ✍️"):
-            # If transcript doesn't exist (i.e., wasn't manually provided), generate it
-            if not os.path.exists(transcript_path):
-                st.info("Generating transcript from audio...")
-                os.makedirs(os.path.dirname(transcript_path), exist_ok=True)
-                speech_to_text_assemblyai(audio_path, output_file=transcript_path)
-            
-            # Now, create sentences from the transcript (whether provided or generated)
-            words_to_sentances(transcript_path, output_path=sentences_path)
+        if "transcript" not in st.session_state.jobs:
+            start_job("transcript", transcript_job, st.session_state.pipeline, assets_per_minute)
+        status = job_status("transcript")
+        if status == "done":
             st.success("Transcription and sentence splitting complete!")
             st.session_state.sentences_ready = True
-    
-    show_json_file(transcript_path, "Visualizing Transcript")
-    show_json_file(sentences_path, "Visualizing Sentences")
+        elif status == "failed" and st.button("Retry Transcription"):
+            del st.session_state.jobs["transcript"]
+            st.rerun()
+
+    if st.session_state.sentences_ready:
+        show_json(st.session_state.pipeline.transcript, "Visualizing Transcript")
+        show_json({"sentences": st.session_state.pipeline.sentences}, "Visualizing Sentences")
 
 # ---------------------------------------------------
 # STEP 3: Asset Generation
@@ -185,56 +304,45 @@ if st.session_state.sentences_ready:
         horizontal=True
     )
     if asset_option == 'Automatically generate assets':
-        if st.button("Generate Assets Automatically"):
-            with st.spinner("Generating assets based on sentences... 🤖"):
-                os.makedirs(os.path.dirname(assets_path), exist_ok=True)
-                generate_assets(sentences_path, output_path=assets_path)
-                st.success("Assets generated automatically!")
-                st.session_state.assets_ready = True
+        if st.button("Generate Assets Automatically", disabled=busy()):
+            st.session_state.assets_ready = False
+            start_job("assets", assets_job, st.session_state.pipeline)
+        if job_status("assets") == "done" and not st.session_state.assets_ready:
+            st.success("Assets generated automatically!")
+            st.session_state.assets_ready = True
     else: # Manual option
         placeholder_json = json.dumps({"assets":[
             { "order_id": 1, "text": "A happy cat", "type": "gif" },
             { "order_id": 2, "text": "Hello World!", "type": "text" }
         ]}, indent=4)
         manual_asset_json = st.text_area("Asset JSON", height=250, value=placeholder_json)
-        if st.button("Use Manual Assets"):
+        if st.button("Use Manual Assets", disabled=busy()):
             try:
                 json_data = json.loads(manual_asset_json)
-                os.makedirs(os.path.dirname(assets_path), exist_ok=True)
-                with open(assets_path, "w") as f:
-                    json.dump(json_data, f, indent=4)
+                st.session_state.pipeline.assets = json_data.get("assets", [])
+                st.session_state.pipeline.save(state_path)
                 st.success("Manual asset JSON saved successfully!")
                 st.session_state.assets_ready = True
             except json.JSONDecodeError:
                 st.error("Invalid JSON format. Please check your input.")
     
     if st.session_state.assets_ready:
-         show_json_file(assets_path, "Final Assets for Rendering")
+         show_json({"assets": st.session_state.pipeline.assets}, "Final Assets for Rendering")
 
 # ---------------------------------------------------
 # STEP 4: Final Video Assembly
 # ---------------------------------------------------
 if st.session_state.assets_ready:
     st.header("4. Final Video Assembly")
-    if st.button("Render Final Video 🎥"):
-        with st.spinner("Mapping assets to sentence timings... 🗺️"):
-            os.makedirs(os.path.dirname(mapped_path), exist_ok=True)
-            map_assets_to_sentences(sentences_path, assets_path, output_path=mapped_path)
-            st.success("Assets mapped!")
-        
-        with st.spinner("Downloading/creating asset files (images, gifs, etc.)... 🖼️"):
-            generate_assets_from_json(mapped_path)
-            st.success("Asset files are ready!")
-
-        with st.spinner("Rendering the final video... This may take a moment."):
-            render_video(mapped_path, "background.jpg", final_video_path, audio_path)
-            st.success("Final video rendered!")
-            
-            st.video(final_video_path)
-            with open(final_video_path, "rb") as video_file:
-                st.download_button(
-                    label="Download Final Video",
-                    data=video_file,
-                    file_name="final_video.mp4",
-                    mime="video/mp4"
-                )
\ No newline at end of file
+    if st.button("Render Final Video 🎥", disabled=busy()):
+        start_job("render", render_job, st.session_state.pipeline)
+    if job_status("render") == "done":
+        st.success("Final video rendered!")
+        show_final_video(final_video_path)
+
+# ---------------------------------------------------
+# Jobs keep running between reruns; poll until they finish
+# ---------------------------------------------------
+if busy():
+    time.sleep(POLL_SECONDS)
+    st.rerun()
\ No newline at end of file
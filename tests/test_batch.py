@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from tools.pipeline import runner
+from tools.pipeline.batch import load_manifest, run_job
+
+
+def manifest(tmp_path, data, name="jobs.json"):
+    path = tmp_path / name
+    if name.endswith(".jsonl"):
+        path.write_text("\n".join(json.dumps(job) for job in data) + "\n", encoding="utf-8")
+    else:
+        path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_defaults_ids_and_relative_paths(tmp_path):
+    path = manifest(tmp_path, {
+        "defaults": {"fps": 24, "background": "bg.jpg"},
+        "jobs": [{"topic": "Tides"}, {"id": "moon/landing", "script_file": "moon.txt", "fps": 30}],
+    })
+
+    first, second = load_manifest(path)
+
+    assert first == {"topic": "Tides", "fps": 24, "background": str(tmp_path / "bg.jpg"), "id": "job_001"}
+    assert second["id"] == "moon_landing"
+    assert second["fps"] == 30
+    assert second["script_file"] == str(tmp_path / "moon.txt")
+
+
+def test_json_lines_manifest(tmp_path):
+    path = manifest(tmp_path, [{"topic": "a"}, {"audio": "/abs/narration.mp3"}], name="jobs.jsonl")
+    jobs = load_manifest(path)
+    assert [job["id"] for job in jobs] == ["job_001", "job_002"]
+    assert jobs[1]["audio"] == "/abs/narration.mp3"
+
+
+@pytest.mark.parametrize("data, message", [
+    ([{"topic": "a", "asets_per_minute": 6}], "unknown keys: asets_per_minute"),
+    ({"defaults": {"frames": 24}, "jobs": [{"topic": "a"}]}, "unknown keys: frames"),
+    ([{"topic": "a", "workdir": "elsewhere"}], "unknown keys: workdir"),
+    ([{"fps": 24}], "needs one of"),
+    ([{"id": "same", "topic": "a"}, {"id": "same", "topic": "b"}], "Duplicate job id"),
+])
+def test_invalid_manifests_are_rejected(tmp_path, data, message):
+    with pytest.raises(ValueError, match=message):
+        load_manifest(manifest(tmp_path, data))
+
+
+def test_run_job_passes_config_and_records_the_result(monkeypatch, tmp_path):
+    calls = []
+
+    def run_pipeline(config, topic=None, script=None, audio_path=None):
+        calls.append((config, topic, script, audio_path))
+        return type("State", (), {"video_path": "final.mp4"})(), [("render", "run")]
+
+    monkeypatch.setattr(runner, "run_pipeline", run_pipeline)
+    script_file = tmp_path / "moon.txt"
+    script_file.write_text("The moon.", encoding="utf-8")
+
+    result = run_job({"id": "moon", "script_file": str(script_file), "fps": 24}, str(tmp_path / "batch"))
+
+    workdir = str(tmp_path / "batch" / "moon")
+    assert calls == [({"fps": 24, "workdir": workdir}, None, "The moon.", None)]
+    assert result["status"] == "done" and result["video_path"] == "final.mp4"
+    with open(os.path.join(workdir, "result.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["stages"] == [["render", "run"]]
+
+
+def test_a_failing_job_is_recorded_not_raised(monkeypatch, tmp_path):
+    def run_pipeline(config, **kwargs):
+        raise RuntimeError("no narration")
+
+    monkeypatch.setattr(runner, "run_pipeline", run_pipeline)
+
+    result = run_job({"id": "broken", "topic": "x"}, str(tmp_path))
+
+    assert result["status"] == "failed" and result["error"] == "RuntimeError: no narration"
+    with open(tmp_path / "broken" / "job.log", "r", encoding="utf-8") as f:
+        assert "no narration" in f.read()
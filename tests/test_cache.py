@@ -0,0 +1,67 @@
+import json
+import os
+
+from tools.cache import DiskCache
+
+
+def index_keys(directory):
+    path = os.path.join(directory, "index.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [entry["key"] for entry in json.load(f)["entries"]]
+
+
+def test_index_is_written_in_batches(tmp_path):
+    directory = str(tmp_path)
+    cache = DiskCache(directory, flush_every=3)
+
+    cache.set("aa1", b"one")
+    cache.set("aa2", b"two")
+    assert index_keys(directory) == []  # files are on disk, the index waits for the batch
+    assert cache.get("aa1") == b"one"
+
+    cache.set("aa3", b"three")
+    assert sorted(index_keys(directory)) == ["aa1", "aa2", "aa3"]
+
+    cache.set("aa4", b"four")
+    cache.flush()
+    assert len(index_keys(directory)) == 4
+
+
+def test_processes_sharing_a_directory_keep_each_others_entries(tmp_path):
+    directory = str(tmp_path)
+    first, second = DiskCache(directory), DiskCache(directory)
+
+    first.set("bb1", b"first")
+    second.set("bb2", b"second")
+    first.flush()
+    second.flush()
+
+    assert sorted(index_keys(directory)) == ["bb1", "bb2"]
+    assert DiskCache(directory).get("bb1") == b"first"
+
+
+def test_eviction_follows_reads_once_flushed(tmp_path):
+    directory = str(tmp_path)
+    writer = DiskCache(directory, max_bytes=12)
+    writer.set("cc1", b"12345")
+    writer.set("cc2", b"12345")
+    writer.flush()
+
+    reader = DiskCache(directory, max_bytes=12)
+    assert reader.get("cc1") == b"12345"  # cc1 is now the most recently used
+    reader.flush()
+
+    writer.set("cc3", b"12345")
+    writer.flush()
+    assert sorted(index_keys(directory)) == ["cc1", "cc3"]
+    assert reader.get("cc2") is None
+
+
+def test_size_bound_holds_between_flushes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10, flush_every=100)
+    for n in range(5):
+        cache.set(f"dd{n}", b"12345")
+    assert cache.size_bytes() <= 10
+    assert cache.get("dd4") == b"12345" and cache.get("dd0") is None
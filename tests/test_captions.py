@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from tools.video.captions import DEFAULT_CAPTION_STYLE, CaptionTrack
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STYLE = {"font_path": os.path.join(ROOT, "fonts", "Roboto-Bold.ttf"), "font_size": 32, "max_width": 400,
+         "lines": 2, "pause_ms": 700, "hold_ms": 400}
+
+# Two captions: three words, a 1 s pause, then two words
+WORDS = [{"start": 0, "end": 400, "word": "Hello"}, {"start": 450, "end": 800, "word": "karaoke"},
+         {"start": 850, "end": 1200, "word": "world."}, {"start": 2200, "end": 2500, "word": "Second"},
+         {"start": 2550, "end": 3000, "word": "caption!"}]
+
+
+@pytest.fixture
+def track():
+    return CaptionTrack({"text": "", "words": WORDS}, STYLE)
+
+
+def test_frame_words_follow_the_speech(track):
+    fps = 10
+    words = track.frame_words(40, fps).tolist()  # 0.0 .. 3.9 s
+    at = {t: words[round(t * fps)] for t in (0.0, 0.42, 0.5, 1.1, 1.5, 1.7, 2.3, 2.6, 3.3, 3.5)}
+    assert at == {
+        0.0: 0,
+        0.42: 0,   # between words the last one stays highlighted
+        0.5: 1,
+        1.1: 2,
+        1.5: 2,    # held for hold_ms after the caption's last word
+        1.7: -1,   # then the pause shows no caption
+        2.3: 3,
+        2.6: 4,
+        3.3: 4,
+        3.5: -1,
+    }
+
+
+def test_frame_words_with_an_offset_match_the_whole_timeline(track):
+    whole = track.frame_words(60, 20)
+    assert track.frame_words(20, 20, offset_sec=2.0).tolist() == whole[40:].tolist()
+
+
+def test_a_pause_or_a_full_caption_starts_a_new_caption():
+    words = [{"start": i * 300, "end": i * 300 + 250, "word": f"word{i}"} for i in range(30)]
+    words.append({"start": 10000, "end": 10300, "word": "after"})
+    track = CaptionTrack(words, STYLE)
+    layout = track.layout
+    widths = np.array([track.atlas.width(w["word"]) for w in words])
+
+    assert (track.x >= 0).all() and (track.x + widths <= track.size[0]).all()
+    assert layout["rows"].max() == STYLE["lines"]
+    # Without pauses, a caption only ends when its lines are full
+    for c in range(len(layout["first"]) - 2):
+        assert layout["rows"][layout["first"][c]] == STYLE["lines"]
+    # The pause before the last word starts a caption of its own
+    assert layout["first"][-1] == len(words) - 1
+
+
+def test_atlas_covers_every_word_of_a_clip(track):
+    assert track.clip(4.0, fps=10) is not None
+
+    for word in {w["word"] for w in WORDS}:
+        x, y, width = track.atlas.rects[word]
+        assert width == track.atlas.width(word)
+        sprite = track.atlas.sprite((x, y, width))
+        assert sprite.shape == (track.atlas.height, width, 2)
+        assert sprite[:, :, 0].any()  # glyph coverage, not an empty slot
+
+
+def test_compose_highlights_only_the_spoken_word(track):
+    base = track._caption(0)
+    highlighted = track.compose(1)
+    changed = np.any(highlighted != base, axis=2)
+    columns = np.flatnonzero(changed.any(axis=0))
+    x, width = int(track.x[1]), track.atlas.width("karaoke")
+    assert columns.min() >= x and columns.max() < x + width
+    # Highlight color where the glyphs are fully covered
+    assert (highlighted[changed][:, :3] == DEFAULT_CAPTION_STYLE["highlight"]).all(axis=1).any()
+
+
+def test_no_clip_while_no_caption_is_up(track):
+    assert track.clip(0.4, fps=10, offset_sec=1.65) is None
+
+
+def test_fingerprint_follows_the_words_shown(track):
+    same = CaptionTrack({"words": WORDS}, STYLE)
+    edited = CaptionTrack({"words": WORDS[:3] + [dict(WORDS[3], word="Other")] + WORDS[4:]}, STYLE)
+    assert track.fingerprint(0, 1) == same.fingerprint(0, 1) == edited.fingerprint(0, 1)
+    assert track.fingerprint(2, 3) != edited.fingerprint(2, 3)
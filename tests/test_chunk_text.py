@@ -0,0 +1,32 @@
+import pytest
+
+from tools.audio.text_to_audio import synthesize_chunks
+from tools.utils import chunk_text
+
+
+def test_groups_sentences_within_budget():
+    text = "One. Two two. Three three three. Four."
+    assert chunk_text(text, 20) == ["One. Two two.", "Three three three.", "Four."]
+
+
+def test_run_on_sentence_splits_at_commas_first():
+    sentence = ("alpha beta gamma delta, epsilon zeta eta theta, iota kappa lambda mu, "
+                "nu xi omicron pi rho sigma tau upsilon phi chi psi omega.")
+
+    chunks = chunk_text(sentence, 50)
+
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks) == sentence
+    # Every chunk but the over-long last clause ends at a comma
+    assert chunks[:2] == ["alpha beta gamma delta, epsilon zeta eta theta,", "iota kappa lambda mu,"]
+
+
+def test_retry_failure_keeps_the_cause(monkeypatch):
+    monkeypatch.setattr("tools.audio.text_to_audio.time.sleep", lambda seconds: None)
+
+    def synthesize(index, chunk):
+        raise ValueError("provider down")
+
+    with pytest.raises(RuntimeError) as error:
+        synthesize_chunks(["a"], synthesize, retries=1)
+    assert isinstance(error.value.__cause__, ValueError)
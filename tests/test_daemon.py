@@ -0,0 +1,97 @@
+import threading
+import types
+
+import pytest
+
+from tools.log import get_logger
+from tools.pipeline import daemon as daemon_module
+from tools.pipeline.daemon import RenderDaemon, render_via_daemon
+from tools.video import video_editor
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Replaces the job kinds with ones the tests control."""
+    release = threading.Event()
+    log = get_logger("tests.daemon")
+
+    def wait(payload, log_path):
+        log.info(f"job says {payload['say']}")
+        release.wait(5)
+        return {"said": payload["say"]}
+
+    def fail(payload, log_path):
+        raise RuntimeError("broken asset")
+
+    monkeypatch.setitem(daemon_module._HANDLERS, "render", wait)
+    monkeypatch.setitem(daemon_module._HANDLERS, "pipeline", fail)
+    return release
+
+
+def wait_until_finished(daemon, job_id):
+    for _ in range(500):
+        job = daemon.get(job_id)
+        if job["finished"]:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_log_holds_the_jobs_logging_and_not_other_output(handlers, tmp_path, capsys):
+    daemon = RenderDaemon(str(tmp_path))
+    daemon.start()
+    job = daemon.submit("render", {"say": "hello"})
+    while daemon.get(job["id"])["status"] == "queued":
+        threading.Event().wait(0.01)
+    print("from another thread")
+    handlers.set()
+
+    job = wait_until_finished(daemon, job["id"])
+
+    assert job["status"] == "done" and job["result"]["said"] == "hello"
+    with open(job["log"], "r", encoding="utf-8") as f:
+        text = f.read()
+    assert "job says hello" in text
+    assert "from another thread" not in text
+    assert "from another thread" in capsys.readouterr().out
+
+
+def test_failed_job_records_its_error(handlers, tmp_path):
+    daemon = RenderDaemon(str(tmp_path))
+    daemon.start()
+    job = wait_until_finished(daemon, daemon.submit("pipeline", {})["id"])
+    assert job["status"] == "failed" and job["error"] == "RuntimeError: broken asset"
+    with open(job["log"], "r", encoding="utf-8") as f:
+        assert "broken asset" in f.read()
+
+
+def test_render_job_forwards_the_render_options(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(video_editor, "render_timeline", lambda *args, **kwargs: calls.append(("timeline", kwargs)))
+    monkeypatch.setattr(video_editor, "render_segmented", lambda *args, **kwargs: calls.append(("segmented", kwargs)))
+    payload = {"mapped": [], "audio_path": "a.mp3", "output": str(tmp_path / "out.mp4"), "media_dir": "m",
+               "preflight": "skip", "motion": {"zoom": 1.2}, "transcript": {"words": []},
+               "caption_style": {"lines": 1}}
+
+    daemon_module._render_job(payload, "job.log")
+    daemon_module._render_job(dict(payload, segment_seconds=5), "job.log")
+
+    expected = dict(media_dir="m", preflight_policy="skip", motion={"zoom": 1.2}, captions={"words": []},
+                    caption_style={"lines": 1})
+    assert calls == [("timeline", expected), ("segmented", dict(expected, segment_seconds=5))]
+
+
+def test_render_via_daemon_sends_the_same_options_as_run_render(monkeypatch, tmp_path):
+    sent = {}
+    monkeypatch.setattr(daemon_module, "daemon_available", lambda url: True)
+    monkeypatch.setattr(daemon_module, "submit_job", lambda kind, payload, url: sent.update(payload) or {"id": "1"})
+    monkeypatch.setattr(daemon_module, "wait_for_job", lambda job_id, url: {"status": "done"})
+    state = types.SimpleNamespace(mapped=[], audio_path="a.mp3", transcript={"words": []}, video_path=None)
+
+    assert render_via_daemon(state, str(tmp_path / "out.mp4"), segment_seconds=8, preflight_policy="fail",
+                             motion={"pan": 0.5}, captions=True, caption_style={"lines": 1})
+
+    assert {k: sent[k] for k in ("segment_seconds", "preflight", "motion", "transcript", "caption_style")} == \
+        {"segment_seconds": 8, "preflight": "fail", "motion": {"pan": 0.5}, "transcript": {"words": []},
+         "caption_style": {"lines": 1}}
+    assert state.video_path == str(tmp_path / "out.mp4")
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from tools.pipeline.jobs import Job, JobRunner
+
+
+def wait_for(job):
+    for _ in range(500):
+        if not job.running:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job.id} did not finish")
+
+
+def test_submit_returns_at_once_and_progress_is_visible():
+    runner = JobRunner()
+    started, release = threading.Event(), threading.Event()
+
+    def work(job, n):
+        job.report("fetch", 0.5, "3 of 6 assets")
+        started.set()
+        release.wait(5)
+        job.progress("render")(2.0)  # clamped
+        return n * 2
+
+    job = runner.submit("video", work, 21)
+    assert started.wait(5)
+
+    snapshot = job.snapshot()
+    assert (snapshot["status"], snapshot["stage"], snapshot["fraction"], snapshot["message"]) == \
+        ("running", "fetch", 0.5, "3 of 6 assets")
+    assert runner.get(job.id) is job
+
+    release.set()
+    wait_for(job)
+
+    assert job.status == "done" and job.result == 42
+    assert [stage for stage, _ in job.snapshot()["stages"]] == ["fetch", "render"]
+    assert job.snapshot()["stage"] is None
+
+
+def test_failed_job_keeps_its_error_and_traceback():
+    runner = JobRunner()
+
+    def work(job):
+        job.report("tts")
+        raise RuntimeError("quota exceeded")
+
+    job = wait_for(runner.submit("video", work))
+
+    assert job.status == "failed"
+    assert job.error == "RuntimeError: quota exceeded"
+    assert "quota exceeded" in job.traceback
+    assert job.snapshot()["stages"][0][0] == "tts"
+
+
+def test_jobs_queue_behind_the_worker_limit():
+    runner = JobRunner(max_workers=1)
+    release = threading.Event()
+    first = runner.submit("first", lambda job: release.wait(5))
+    second = runner.submit("second", lambda job: "ran")
+
+    threading.Event().wait(0.05)
+    assert second.status == "queued" and first.id != second.id
+
+    release.set()
+    assert wait_for(second).result == "ran"
+    assert runner.get("99999") is None
+
+
+@pytest.mark.parametrize("fraction, expected", [(-1, 0.0), (0.25, 0.25), (3, 1.0)])
+def test_fraction_is_clamped(fraction, expected):
+    job = Job("00001", "video")
+    job.report("render", fraction)
+    assert job.fraction == expected
+
+
+def test_a_new_stage_resets_the_progress():
+    job = Job("00001", "video")
+    job.report("fetch", 1.0, "done")
+    job.report("fetch", message="still fetching")  # same stage keeps the fraction
+    assert job.fraction == 1.0
+    job.report("render")
+    assert (job.fraction, job.message) == (0.0, "")
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from tools.agent import find_save
+from tools.agent.find_save import generate_asset_files
+from tools.pipeline.journal import RunJournal
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_completed_units_survive_a_restart(tmp_path):
+    path = str(tmp_path / ".pipeline" / "journal.jsonl")
+    output = write(tmp_path / "segment.mp4", b"video")
+    RunJournal(path).record("segment", "seg_0000", "fp1", [output])
+
+    journal = RunJournal(path)
+
+    assert journal.is_done("segment", "seg_0000", "fp1")
+    assert not journal.is_done("segment", "seg_0000", "fp2")  # other inputs
+    assert not journal.is_done("segment", "seg_0001", "fp1")
+
+
+def test_a_torn_last_line_is_not_done(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record("asset", 1, "fp")
+    journal.record("asset", 2, "fp")
+    with open(path, "r+", encoding="utf-8") as f:
+        text = f.read()
+        f.seek(0)
+        f.truncate()
+        f.write(text[:-10])  # the crash cut the second record short
+
+    journal = RunJournal(path)
+
+    assert journal.is_done("asset", 1, "fp")
+    assert not journal.is_done("asset", 2, "fp")
+
+
+def test_output_files_are_verified(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    output = write(tmp_path / "1.jpg", b"image")
+    journal.record("asset", 1, "fp", [output])
+
+    # Touched but identical content is still done
+    os.utime(output, ns=(1, 1))
+    assert journal.is_done("asset", 1, "fp")
+
+    write(output, b"other")  # same size, other bytes
+    assert not journal.is_done("asset", 1, "fp")
+
+    os.remove(output)
+    assert not journal.is_done("asset", 1, "fp")
+
+
+def test_forget_and_compaction_rewrite_the_file(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    for n in range(150):
+        journal.record("stage", "render", f"fp{n}")
+    journal.record("asset", 1, "fp")
+
+    # Reopening a journal with many superseded lines keeps one per unit
+    journal = RunJournal(path)
+    with open(path, "r", encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    assert journal.is_done("stage", "render", "fp149")
+
+    journal.forget("asset", 1)
+    assert not RunJournal(path).is_done("asset", 1, "fp")
+    assert RunJournal(path).is_done("stage", "render", "fp149")
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Replaces process_item with a stand-in that writes a file per asset and can crash mid-run."""
+    fetched = []
+    crash_at = {"order_id": None}
+
+    def process_item(item, media_dir):
+        if item["order_id"] == crash_at["order_id"]:
+            raise ConnectionError("network dropped")
+        fetched.append(item["order_id"])
+        return write(os.path.join(media_dir, item["type"], f"{item['order_id']}.jpg"), item["text"].encode())
+
+    monkeypatch.setattr(find_save, "process_item", process_item)
+    return fetched, crash_at
+
+
+def test_fetch_resumes_after_a_crash(downloads, tmp_path):
+    fetched, crash_at = downloads
+    media_dir = str(tmp_path / "media")
+    mapped = [{"order_id": n, "type": "image", "text": f"keyword {n}", "start": n, "end": n + 1} for n in range(5)]
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    crash_at["order_id"] = 3
+    with pytest.raises(ConnectionError):
+        generate_asset_files(mapped, RunJournal(journal_path), media_dir)
+    assert fetched == [0, 1, 2]
+
+    crash_at["order_id"] = None
+    fetched.clear()
+    paths = generate_asset_files(mapped, RunJournal(journal_path), media_dir)
+
+    assert fetched == [3, 4]
+    assert paths == [os.path.join(media_dir, "image", f"{n}.jpg") for n in range(5)]
+
+    # An edited asset is fetched again, and so is a removed file
+    fetched.clear()
+    mapped[1] = dict(mapped[1], text="another keyword")
+    os.remove(paths[4])
+    generate_asset_files(mapped, RunJournal(journal_path), media_dir)
+    assert fetched == [1, 4]
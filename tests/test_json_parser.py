@@ -0,0 +1,184 @@
+"""
+Fuzz comparison of extract_json / JSONStreamParser with the regex and
+brace-counting extract_json they replaced. Run as a module to also time both:
+
+    python -m tests.test_json_parser [--cases 2000]
+"""
+import json
+import random
+import re
+import string
+
+import pytest
+
+from tools.utils import JSONStreamParser, extract_json, iter_json_objects
+
+CASES = 500
+
+
+def legacy_extract_json(text):
+    """extract_json as it was before JSONStreamParser, kept as the reference."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+
+    start = text.find("{")
+    if start != -1:
+        brace_count = 0
+        for i, char in enumerate(text[start:], start=start):
+            if char == "{":
+                brace_count += 1
+            elif char == "}":
+                brace_count -= 1
+                if brace_count == 0:
+                    try:
+                        return json.loads(text[start:i + 1])
+                    except json.JSONDecodeError:
+                        break
+
+    return {"script": text.strip()}
+
+
+# Strings with the characters that trip up scanners: quotes, escapes and brackets
+_TRICKY = ['say "hi"', "back\\slash", "{not json}", "[1, 2", "}", "]", "é ✓", "line\nbreak", ""]
+
+
+def random_string(rng):
+    if rng.random() < 0.4:
+        return rng.choice(_TRICKY)
+    return "".join(rng.choice(string.ascii_letters + " ,.:") for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng, depth=0):
+    kind = rng.random()
+    if depth < 3 and kind < 0.25:
+        return {random_string(rng): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    if depth < 3 and kind < 0.4:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    if kind < 0.7:
+        return random_string(rng)
+    return rng.choice([rng.randint(-1000, 1000), rng.random(), True, False, None])
+
+
+def random_object(rng):
+    return {"script": random_string(rng), "meta": {random_string(rng): random_value(rng) for _ in range(3)},
+            "items": [random_value(rng) for _ in range(rng.randint(0, 3))]}
+
+
+PROSE = ["Here is the JSON you asked for:", "Sure! {braces} in prose first.", "Note: use [brackets] wisely.",
+         "", "Thanks", "The result } follows"]
+
+
+def wrap(rng, text):
+    """The text as a model might answer: plain, prose-wrapped or fenced."""
+    style = rng.choice(["plain", "prose", "fenced", "fenced_prose"])
+    if style in ("fenced", "fenced_prose"):
+        text = f"```json\n{text}\n```"
+    if style in ("prose", "fenced_prose"):
+        text = f"{rng.choice(PROSE)}\n{text}\n{rng.choice(PROSE)}"
+    return text
+
+
+def corpus(cases=CASES, seed=1234):
+    """(kind, text, expected) triples for every input shape."""
+    rng = random.Random(seed)
+    for _ in range(cases):
+        obj = random_object(rng)
+        text = json.dumps(obj, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+        yield "wrapped", wrap(rng, text), obj
+        # Escaped quotes and braces inside string values
+        obj = dict(obj, script='He said "{go}" and \\"left\\"')
+        yield "escaped", wrap(rng, json.dumps(obj)), obj
+        # A complete object followed by a second one cut off mid-stream
+        cut = json.dumps(random_object(rng))
+        yield "truncated_tail", wrap(rng, json.dumps(obj) + "\n" + cut[:rng.randint(1, len(cut) - 1)]), obj
+        # Only a cut-off object without nested ones: nothing to extract, so both fall back to the raw text
+        text = json.dumps({"script": random_string(rng), "n": rng.randint(0, 9)})
+        truncated = "Result: " + text[:rng.randint(1, len(text) - 2)]
+        yield "truncated", truncated, {"script": truncated.strip()}
+
+
+def nested_corpus(cases=CASES, seed=99):
+    """Deeply nested objects, the brace counting's worst case."""
+    rng = random.Random(seed)
+    for _ in range(cases):
+        obj = {"v": random_string(rng)}
+        for _ in range(rng.randint(1, 30)):
+            obj = {"child": obj, "list": [obj.get("v"), {"x": "}"}]}
+        yield "nested", wrap(rng, json.dumps(obj)), obj
+
+
+def all_cases():
+    return list(corpus()) + list(nested_corpus())
+
+
+@pytest.mark.parametrize("kind", ["wrapped", "escaped", "truncated_tail", "truncated", "nested"])
+def test_extract_json_decodes_every_shape(kind):
+    # Right on every case, so also wherever the legacy version was
+    for k, text, expected in all_cases():
+        if k == kind:
+            assert extract_json(text) == expected, text
+
+
+def test_truncated_input_falls_back_like_legacy():
+    for kind, text, _ in corpus():
+        if kind == "truncated":
+            assert extract_json(text) == legacy_extract_json(text)
+
+
+def test_stream_parser_is_chunking_independent():
+    rng = random.Random(7)
+    for kind, text, expected in all_cases():
+        if kind == "truncated":
+            continue
+        chunks, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 40)
+            chunks.append(text[i:i + size])
+            i += size
+        whole = JSONStreamParser(split_arrays=False).feed(text)
+        streamed = list(iter_json_objects(chunks, split_arrays=False))
+        assert streamed == whole
+        assert expected in streamed
+
+
+def test_stream_parser_splits_top_level_arrays():
+    rng = random.Random(3)
+    items = [random_object(rng) for _ in range(20)] + ["scalar", 3, None]
+    text = wrap(rng, json.dumps(items, indent=2))
+    parser = JSONStreamParser(split_arrays=True)
+    values = []
+    for i in range(0, len(text), 17):
+        values += parser.feed(text[i:i + 17])
+    assert values == items
+
+
+def benchmark(cases=2000):
+    import time
+
+    inputs = [text for _, text, _ in list(corpus(cases)) + list(nested_corpus(cases))]
+    for name, fn in (("legacy", legacy_extract_json), ("extract_json", extract_json)):
+        started = time.perf_counter()
+        for text in inputs:
+            fn(text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>13}: {elapsed * 1000:8.1f} ms for {len(inputs)} inputs "
+              f"({elapsed / len(inputs) * 1e6:.1f} us each)")
+    wrong = sum(legacy_extract_json(text) != expected for _, text, expected in all_cases())
+    print(f"legacy wrong on {wrong} of {len(all_cases())} fuzz cases")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Times extract_json against the legacy version.")
+    parser.add_argument("--cases", type=int, default=2000)
+    benchmark(parser.parse_args().cases)
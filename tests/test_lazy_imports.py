@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("moviepy", "pygame", "assemblyai", "elevenlabs", "google.genai", "pyht", "streamlit")
+
+
+def loaded_heavy_modules(statement):
+    """Runs statement in a fresh interpreter and returns the heavy modules it imported."""
+    probe = f"import json, sys\n{statement}\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("statement", [
+    "import tools",
+    "from tools import words_to_sentances, segment_transcript, WordTimeline",
+    "from tools import extract_json, iter_json_objects",
+    "from tools import PipelineState",
+    "from tools.pipeline.runner import build_stages, DEFAULT_CONFIG",
+    "from tools.cache import DiskCache",
+    "import tools.video, tools.audio, tools.agent, tools.image, tools.pipeline",
+])
+def test_light_imports_load_no_heavy_dependency(statement):
+    assert loaded_heavy_modules(statement) == []
+
+
+def test_exports_are_listed_and_unknown_names_raise():
+    assert "render_timeline" in dir(tools) and "render_timeline" in tools.__all__
+    with pytest.raises(AttributeError):
+        tools.no_such_function
+
+
+def test_exported_name_is_cached_on_the_package():
+    from tools.text import text_tools
+    assert tools.segment_transcript is text_tools.segment_transcript
+    assert "segment_transcript" in vars(tools)
@@ -0,0 +1,78 @@
+import pytest
+
+from tools.cache import get_shared_cache
+from tools.metrics import MetricsRegistry, REGISTRY, record_encode, track_call, write_metrics
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "API calls", ("provider",))
+    readers = registry.gauge("readers_open", "Open readers")
+    calls.inc(provider="tenor")
+    calls.inc(2, provider='un"splash')
+    readers.set(3)
+    readers.dec()
+    registry.add_collector(lambda: [("cache_hit_ratio", "gauge", "Hit ratio", {"cache": "tts"}, 0.5)])
+
+    assert registry.to_prometheus() == (
+        "# HELP cache_hit_ratio Hit ratio\n"
+        "# TYPE cache_hit_ratio gauge\n"
+        'cache_hit_ratio{cache="tts"} 0.5\n'
+        "# HELP calls_total API calls\n"
+        "# TYPE calls_total counter\n"
+        'calls_total{provider="tenor"} 1\n'
+        'calls_total{provider="un\\"splash"} 2\n'
+        "# HELP readers_open Open readers\n"
+        "# TYPE readers_open gauge\n"
+        "readers_open 2\n"
+    )
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "API calls", ("provider",))
+    assert registry.counter("calls_total", "API calls", ("provider",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "API calls", ("provider",))
+    with pytest.raises(ValueError):
+        counter.inc(kind="image")  # wrong labels
+
+
+def test_track_call_counts_errors_and_time():
+    calls = REGISTRY.counter("tools_provider_calls_total", "", ("provider",))
+    errors = REGISTRY.counter("tools_provider_errors_total", "", ("provider",))
+    before = calls.get(provider="test-provider"), errors.get(provider="test-provider")
+
+    with track_call("test-provider"):
+        pass
+    with pytest.raises(TimeoutError):
+        with track_call("test-provider"):
+            raise TimeoutError
+
+    assert calls.get(provider="test-provider") == before[0] + 2
+    assert errors.get(provider="test-provider") == before[1] + 1
+
+
+def test_encode_and_disk_cache_metrics_are_written(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_METRICS_CACHE_DIR", str(tmp_path / "cache"))
+    cache = get_shared_cache("test_metrics", str(tmp_path / "unused"), 1)
+    cache.set("ab1", b"data")
+    cache.get("ab1")
+    cache.get("ab2")
+    record_encode("test", frames=60, fps=30, seconds=4.0)
+
+    monkeypatch.setenv("TOOLS_METRICS_FILE", str(tmp_path / "metrics" / "run.prom"))
+    path = write_metrics()
+
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert 'tools_render_fps{kind="test"} 15.0' in lines
+    assert 'tools_render_encode_seconds_per_output_second{kind="test"} 2.0' in lines
+    assert 'tools_disk_cache_hits_total{cache="test_metrics"} 1' in lines
+    assert 'tools_disk_cache_misses_total{cache="test_metrics"} 1' in lines
+    assert 'tools_disk_cache_hit_ratio{cache="test_metrics"} 0.5' in lines
+
+
+def test_no_metrics_file_configured(monkeypatch):
+    monkeypatch.delenv("TOOLS_METRICS_FILE", raising=False)
+    assert write_metrics() is None
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tools.video.video_editor import (SCREEN_SIZE, apply_media_effects, frame_positions, ken_burns_rects,
+                                      motion_settings, shake_offsets)
+
+
+@pytest.mark.parametrize("override", [{"pan": 1.5}, {"pan": -0.1}, {"zoom": 0.9}, {"wobble": 1}])
+def test_invalid_motion_is_rejected(override):
+    with pytest.raises(ValueError):
+        motion_settings(override)
+
+
+@pytest.mark.parametrize("zoom, pan", [(1.0, 0.0), (1.15, 0.6), (2.0, 1.0)])
+def test_ken_burns_crop_stays_inside_the_source(zoom, pan):
+    size = (1600, 900)
+    motion_settings({"zoom": zoom, "pan": pan})
+    for direction in range(8):
+        x, y, width, height = ken_burns_rects(size, 90, zoom, pan, direction)
+        assert x.min() >= 0 and y.min() >= 0
+        assert np.all(x + width <= size[0] + 1e-6) and np.all(y + height <= size[1] + 1e-6)
+
+
+def test_precomputed_shake_matches_the_continuous_motion():
+    fps, frames = 30, 90
+    dx, dy = shake_offsets(frames, fps)
+    t = np.arange(frames) / fps
+    # The shake the overlays used to compute per call, now rounded to whole pixels
+    assert np.abs(dx - 3 * np.sin(t * 2 * 2 * np.pi)).max() <= 0.5
+    assert np.abs(dy - 3 * np.cos(t * 2 * 2 * np.pi)).max() <= 0.5
+    assert dx.dtype == np.int32 and (dx[0], dy[0]) == (0, 3)
+
+
+def test_shake_settings_are_applied():
+    dx, dy = shake_offsets(60, 30, {"shake_amount": 0})
+    assert not dx.any() and not dy.any()
+
+    dx, dy = shake_offsets(60, 30, {"shake_amount": 10, "shake_frequency_x": 1})
+    assert dx.max() == 10 and dx.min() == -10
+    assert (dx[8], dx[15], dx[23], dx[30]) == (10, 0, -10, 0)  # one horizontal shake per second
+
+
+def test_frame_positions_look_up_the_nearest_frame():
+    position = frame_positions(np.array([10, 11, 12]), np.array([20, 21, 22]), fps=10)
+    assert position(0) == (10, 20)
+    assert position(0.04) == (10, 20) and position(0.06) == (11, 21)
+    assert position(-1) == (10, 20) and position(5) == (12, 22)  # clamped to the table
+    assert all(isinstance(v, int) for v in position(0.1))
+
+
+def test_overlay_is_centered_and_shaken_per_frame():
+    from moviepy.editor import ColorClip
+
+    clip = apply_media_effects(ColorClip((600, 440), color=(255, 0, 0), duration=2), fps=10)
+    center = ((SCREEN_SIZE[0] - 1200) // 2, (SCREEN_SIZE[1] - 880) // 2)
+    dx, dy = shake_offsets(21, 10)
+
+    assert clip.size == (1200, 880)
+    for frame in (0, 3, 20):
+        assert clip.pos(frame / 10) == (center[0] + dx[frame], center[1] + dy[frame])
+
+    still = apply_media_effects(ColorClip((600, 440), color=(255, 0, 0), duration=2), 10, {"shake_amount": 0})
+    assert {still.pos(t / 10) for t in range(21)} == {center}
@@ -0,0 +1,73 @@
+import importlib
+
+import pytest
+from PIL import Image
+
+from tools.video.preflight import check_timing, is_placeable, run_preflight
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    (tmp_path / "image").mkdir()
+    Image.new("RGB", (64, 48), "red").save(tmp_path / "image" / "1.jpg")
+    return str(tmp_path)
+
+
+def item(order_id, start, end, kind="image"):
+    return {"order_id": order_id, "type": kind, "start": start, "end": end}
+
+
+def test_package_export_is_the_function_after_the_submodule_loads():
+    importlib.import_module("tools.video.video_editor")  # binds tools.video.preflight to the module
+    from tools.video import run_preflight as exported
+    assert exported is run_preflight
+
+
+def test_is_placeable():
+    assert is_placeable(item(1, 0, 10))
+    assert not is_placeable(item(1, 10, 10))
+    assert not is_placeable(item(1, -5, 10))
+    assert not is_placeable(item(1, "x", 10))
+    assert not is_placeable({"order_id": 1})
+
+
+def test_check_timing_flags_fatal_and_soft_problems():
+    problems = check_timing([item(1, 0, 1000), item(2, 2000, 1500), item(2, 500, 900), item(3, 9000, 9500)],
+                            audio_seconds=5)
+    assert problems == [(1, "empty slot (2000-1500 ms)", True),
+                        (2, "duplicate order_id 2", False),
+                        (2, "starts before the previous asset", False),
+                        (3, "starts after the narration ends (5.00s)", False)]
+
+
+def test_broken_media_gets_the_policy(media_dir):
+    mapped = [item(1, 0, 1000), item(2, 1000, 2000)]
+
+    repaired, issues = run_preflight(mapped, media_dir=media_dir, policy="placeholder")
+
+    assert "repair" not in repaired[0]
+    assert repaired[1]["repair"] == "placeholder"
+    assert [(i["order_id"], i["problem"], i["action"]) for i in issues] == [(2, "missing", "placeholder")]
+    assert "repair" not in mapped[1]  # the input is not modified
+
+
+def test_unplaceable_items_are_skipped_whatever_the_policy(media_dir):
+    repaired, issues = run_preflight([item(1, "soon", 1000)], media_dir=media_dir, policy="fail")
+    assert repaired[0]["repair"] == "skip"
+    assert issues[0]["action"] == "skip"
+
+
+def test_fail_policy_raises_before_rendering(media_dir):
+    with pytest.raises(RuntimeError, match="2 \\(missing\\)"):
+        run_preflight([item(1, 0, 1000), item(2, 1000, 2000)], media_dir=media_dir, policy="fail")
+
+
+def test_broken_narration_always_raises(media_dir, tmp_path):
+    with pytest.raises(RuntimeError, match="narration"):
+        run_preflight([item(1, 0, 1000)], audio_path=str(tmp_path / "missing.mp3"), media_dir=media_dir,
+                      policy="skip")
+
+
+def test_unknown_policy_is_rejected(media_dir):
+    with pytest.raises(ValueError):
+        run_preflight([], media_dir=media_dir, policy="ignore")
@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+from tools.pipeline import runner
+from tools.pipeline.runner import run_pipeline
+
+SCRIPT = "The moon pulls the sea. Twice a day, the tide comes in."
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def stages(monkeypatch, tmp_path):
+    """Stand-ins for the external stages, recording which ran; segment runs for real."""
+    calls = []
+
+    def tts(state, audio_path, transcript_path=None, **options):
+        calls.append("tts")
+        state.audio_path = write(audio_path, b"narration")
+        words = state.script.split()
+        state.transcript = {"text": state.script,
+                            "words": [{"start": i * 400, "end": i * 400 + 300, "word": w} for i, w in enumerate(words)]}
+
+    def assets(state):
+        calls.append("assets")
+        state.assets = [{"order_id": n, "text": s["sentence"], "type": "image"} for n, s in enumerate(state.sentences)]
+
+    def mapped(state):
+        calls.append("map")
+        state.mapped = [dict(a, start=s["start"], end=s["end"]) for a, s in zip(state.assets, state.sentences)]
+
+    def fetch(state, journal, media_dir):
+        calls.append("fetch")
+        state.media = [write(os.path.join(media_dir, "media", f"{a['order_id']}.jpg"), b"jpg") for a in state.mapped]
+
+    def render(state, path, *args, **kwargs):
+        calls.append("render")
+        state.video_path = write(path, b"mp4")
+
+    for name, stub in (("run_tts", tts), ("run_assets", assets), ("run_map", mapped),
+                       ("run_fetch", fetch), ("run_render", render)):
+        monkeypatch.setattr(runner, name, stub)
+    background = write(str(tmp_path / "background.jpg"), b"background")
+    config = {"workdir": str(tmp_path / "work"), "background": background}
+    return calls, config
+
+
+def actions(report):
+    return {name: action for name, action in report}
+
+
+def test_second_run_skips_every_stage(stages):
+    calls, config = stages
+    state, report = run_pipeline(config, script=SCRIPT)
+    assert calls == ["tts", "assets", "map", "fetch", "render"]
+    assert set(actions(report).values()) == {"run"}
+
+    calls.clear()
+    again, report = run_pipeline(config)  # the sources of the last run are reused
+    assert calls == []
+    assert set(actions(report).values()) == {"skip"}
+    assert again == state
+
+
+def test_changed_option_reruns_only_what_depends_on_it(stages):
+    calls, config = stages
+    run_pipeline(config, script=SCRIPT)
+    calls.clear()
+
+    # A different segmentation of the same words: segment and everything downstream reruns
+    _, report = run_pipeline({**config, "assets_per_minute": 60})
+    assert actions(report) == {"tts": "skip", "segment": "run", "assets": "run", "map": "run",
+                               "fetch": "run", "render": "run"}
+
+    # A render option reruns the render only
+    calls.clear()
+    run_pipeline({**config, "assets_per_minute": 60, "fps": 24})
+    assert calls == ["render"]
+
+
+def test_unchanged_stage_output_stops_the_rerun(stages):
+    calls, config = stages
+    run_pipeline(config, script=SCRIPT)
+    calls.clear()
+
+    # Segment reruns with another option, but the sentences come out the same
+    run_pipeline({**config, "assets_per_minute": 1})
+    _, report = run_pipeline({**config, "assets_per_minute": 2})
+    assert actions(report)["segment"] == "run"
+    assert all(action == "skip" for name, action in report if name != "segment")
+
+
+def test_edited_or_missing_files_are_redone(stages):
+    calls, config = stages
+    state, _ = run_pipeline(config, script=SCRIPT)
+
+    # An edited download no longer matches the journal, so fetch restores it;
+    # the render's inputs then hash as before and it stays valid
+    calls.clear()
+    write(state.media[0], b"png")
+    run_pipeline(config)
+    assert calls == ["fetch"]
+    with open(state.media[0], "rb") as f:
+        assert f.read() == b"jpg"
+
+    # A deleted output invalidates the stage that wrote it
+    calls.clear()
+    os.remove(state.video_path)
+    run_pipeline(config)
+    assert calls == ["render"]
+
+    calls.clear()
+    write(config["background"], b"another background")
+    run_pipeline(config)
+    assert calls == ["render"]
+
+
+def test_force_and_dry_run(stages):
+    calls, config = stages
+    run_pipeline(config, script=SCRIPT)
+    calls.clear()
+
+    _, report = run_pipeline(config, force={"assets"}, dry_run=True)
+    assert calls == []
+    # Its consumers would see new assets, so they would run too
+    assert actions(report) == {"tts": "skip", "segment": "skip", "assets": "run", "map": "run",
+                               "fetch": "run", "render": "run"}
+
+    run_pipeline(config, force={"fetch"})
+    assert calls == ["fetch"]  # same media files back, so the render stays valid
+
+
+def test_a_run_needs_a_source(stages, tmp_path):
+    _, config = stages
+    with pytest.raises(ValueError):
+        run_pipeline(config)
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from tools.text.text_tools import segment_transcript, words_to_sentances
+
+
+def narration(seconds=60):
+    """A word every 300 ms with a comma every third word and a full stop every ninth."""
+    words = []
+    for i in range(seconds * 1000 // 300):
+        text = f"w{i}" + ("." if i % 9 == 8 else "," if i % 3 == 2 else "")
+        words.append({"start": i * 300, "end": i * 300 + 250, "word": text})
+    return {"text": " ".join(w["word"] for w in words), "words": words}
+
+
+def spoken(segments):
+    return " ".join(s["sentence"] for s in segments).split()
+
+
+def test_duration_mode_cuts_the_comma_fragments():
+    transcript = narration()
+    by_punctuation = segment_transcript(transcript)
+    by_duration = segment_transcript(transcript, mode="duration", min_duration_ms=1500, max_duration_ms=6000)
+
+    assert len(by_punctuation) == 67  # one per comma or stop, plus the unpunctuated tail
+    assert len(by_duration) < len(by_punctuation) / 2
+    assert all(1500 <= s["end"] - s["start"] <= 6000 for s in by_duration)
+    assert spoken(by_duration) == spoken(by_punctuation) == transcript["text"].split()
+
+
+@pytest.mark.parametrize("rate", [6, 12, 20])
+def test_assets_per_minute_sets_the_segment_rate(rate):
+    segments = segment_transcript(narration(), assets_per_minute=rate)
+    # Breaks can only fall after punctuation, so the rate is approximate
+    assert rate * 0.6 <= len(segments) <= rate * 1.5
+
+
+def test_words_to_sentances_writes_the_segments(tmp_path):
+    transcript_path = tmp_path / "transcript.json"
+    transcript_path.write_text(json.dumps(narration(10)))
+    output = tmp_path / "out" / "sentences.json"
+
+    words_to_sentances(str(transcript_path), str(output), mode="duration")
+
+    sentences = json.loads(output.read_text())["sentences"]
+    assert sentences == segment_transcript(narration(10), mode="duration")
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        segment_transcript(narration(5), mode="paragraph")
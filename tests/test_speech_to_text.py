@@ -0,0 +1,162 @@
+import types
+
+import pytest
+
+from tools.cache import DiskCache
+from tools.text import speech_to_text
+from tools.text.speech_to_text import merge_chunk_transcripts, transcribe_audio, transcribe_chunked
+
+# What the narration says: (start ms, end ms, word), some of it inside the chunk overlaps
+SPOKEN = [(i * 400, i * 400 + 300, f"word{i}") for i in range(60)]
+
+# Three chunks owning [0, 8000), [8000, 16000) and [16000, 24000), each extended by 1 s of overlap
+CHUNKS = [
+    {"path": "chunk_0000.wav", "offset": 0, "own_start": 0, "own_end": 8000},
+    {"path": "chunk_0001.wav", "offset": 7000, "own_start": 8000, "own_end": 16000},
+    {"path": "chunk_0002.wav", "offset": 15000, "own_start": 16000, "own_end": 24000},
+]
+CHUNK_ENDS = [9000, 17000, 24000]
+
+
+def stub_transcribe(path):
+    """Local stand-in for AssemblyAI: the words heard in a chunk file, timed from the chunk's start."""
+    i = next(n for n, chunk in enumerate(CHUNKS) if chunk["path"] == path)
+    offset, end = CHUNKS[i]["offset"], CHUNK_ENDS[i]
+    words = [{"start": s - offset, "end": e - offset, "word": w} for s, e, w in SPOKEN if offset <= s and e <= end]
+    return {"text": " ".join(w["word"] for w in words), "words": words}
+
+
+def expected():
+    return [{"start": s, "end": e, "word": w} for s, e, w in SPOKEN]
+
+
+def test_merge_drops_overlap_duplicates_in_order():
+    results = [stub_transcribe(chunk["path"]) for chunk in CHUNKS]
+    # The overlaps really do hear some words twice
+    assert sum(len(r["words"]) for r in results) > len(SPOKEN)
+
+    merged = merge_chunk_transcripts(CHUNKS, results)
+
+    assert merged["words"] == expected()
+    assert merged["text"] == " ".join(w for _, _, w in SPOKEN)
+
+
+def test_transcribe_chunked_with_stub(monkeypatch, tmp_path):
+    monkeypatch.setattr(speech_to_text, "split_audio_at_silences", lambda *args, **kwargs: CHUNKS)
+    audio = tmp_path / "narration.wav"
+    audio.write_bytes(b"RIFF")
+
+    merged = transcribe_chunked(str(audio), stub_transcribe, chunk_seconds=8, overlap_seconds=1, max_workers=3)
+
+    assert merged["words"] == expected()
+
+
+def test_stub_transcriber_bypasses_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(speech_to_text, "split_audio_at_silences", lambda *args, **kwargs: CHUNKS)
+
+    def no_cache():
+        raise AssertionError("stub transcripts must not touch the shared cache")
+
+    monkeypatch.setattr(speech_to_text, "get_transcript_cache", no_cache)
+    audio = tmp_path / "narration.wav"
+    audio.write_bytes(b"RIFF")
+
+    result = transcribe_audio(str(audio), chunked=True, chunk_seconds=8, overlap_seconds=1,
+                              transcribe=stub_transcribe)
+
+    assert result["words"] == expected()
+
+
+def test_cache_key_includes_overlap(monkeypatch, tmp_path):
+    keys = []
+
+    class RecordingCache:
+        def get(self, key):
+            keys.append(key)
+            return b'{"text": "", "words": []}'
+
+        def stats(self):
+            return {}
+
+    monkeypatch.setattr(speech_to_text, "get_transcript_cache", RecordingCache)
+    audio = tmp_path / "narration.wav"
+    audio.write_bytes(b"RIFF")
+
+    for overlap in (1.0, 2.0):
+        transcribe_audio(str(audio), chunked=True, overlap_seconds=overlap)
+
+    assert len(keys) == 2 and keys[0] != keys[1]
+
+
+# A trailing chunk with nothing but silence, for which AssemblyAI returns words=None
+SILENT_CHUNK = {"path": "chunk_0003.wav", "offset": 23000, "own_start": 24000, "own_end": 30000}
+
+
+class StubTranscriber:
+    """Local stand-in for aai.Transcriber, answering with SDK-shaped transcripts."""
+    calls = []
+
+    def __init__(self, config=None):
+        pass
+
+    def transcribe(self, path):
+        StubTranscriber.calls.append(path)
+        if path == SILENT_CHUNK["path"]:
+            return types.SimpleNamespace(status="completed", text="", words=None, error=None)
+        # An unchunked run sends the whole file, heard here as the first chunk
+        result = stub_transcribe(path if any(c["path"] == path for c in CHUNKS) else CHUNKS[0]["path"])
+        words = [types.SimpleNamespace(start=w["start"], end=w["end"], text=w["word"]) for w in result["words"]]
+        return types.SimpleNamespace(status="completed", text=result["text"], words=words, error=None)
+
+
+@pytest.fixture
+def assemblyai(monkeypatch, tmp_path):
+    """Chunked transcription through the AssemblyAI path, with a stub transcriber and a fresh cache."""
+    StubTranscriber.calls = []
+    monkeypatch.setattr(speech_to_text, "split_audio_at_silences", lambda *args, **kwargs: CHUNKS + [SILENT_CHUNK])
+    monkeypatch.setattr(speech_to_text.aai, "Transcriber", StubTranscriber)
+    cache = DiskCache(str(tmp_path / "transcripts"))
+    monkeypatch.setattr(speech_to_text, "get_transcript_cache", lambda: cache)
+    audio = tmp_path / "narration.wav"
+    audio.write_bytes(b"RIFF")
+    return str(audio), cache
+
+
+def test_silent_chunk_has_no_words():
+    transcribe = speech_to_text._transcribe_with(StubTranscriber())
+    assert transcribe(SILENT_CHUNK["path"]) == {"text": "", "words": []}
+
+
+def test_chunked_transcripts_are_cached_by_chunking(assemblyai):
+    audio, cache = assemblyai
+
+    first = transcribe_audio(audio, chunked=True, chunk_seconds=8, overlap_seconds=1)
+    calls = len(StubTranscriber.calls)
+    again = transcribe_audio(audio, chunked=True, chunk_seconds=8, overlap_seconds=1)
+
+    assert first["words"] == again["words"] == expected()
+    assert calls == len(CHUNKS) + 1 and len(StubTranscriber.calls) == calls  # the second came from the cache
+    assert cache.stats()["hits"] == 1
+
+    # Other chunking can split words differently, so it is transcribed again
+    transcribe_audio(audio, chunked=True, chunk_seconds=8, overlap_seconds=2)
+    transcribe_audio(audio, chunked=True, chunk_seconds=10, overlap_seconds=1)
+    assert len(StubTranscriber.calls) == 3 * calls
+
+
+def test_transcripts_are_cached_by_audio_content_and_config(assemblyai, tmp_path):
+    audio, cache = assemblyai
+    copy = tmp_path / "renamed.wav"
+    copy.write_bytes(b"RIFF")
+
+    first = transcribe_audio(audio)
+    assert transcribe_audio(str(copy)) == first  # same bytes under another name
+    assert len(StubTranscriber.calls) == 1
+
+    transcribe_audio(audio, punctuate=False)  # other config
+    transcribe_audio(audio, use_cache=False)
+    assert len(StubTranscriber.calls) == 3
+
+    copy.write_bytes(b"RIFF, but other audio")
+    transcribe_audio(str(copy))
+    assert len(StubTranscriber.calls) == 4
@@ -0,0 +1,75 @@
+import json
+
+from tools.pipeline.state import PipelineState
+
+
+def sample_state():
+    return PipelineState(
+        topic="Tides",
+        script="The moon pulls the sea.",
+        audio_path="audio/narration.mp3",
+        transcript={"text": "The moon", "words": [{"start": 0, "end": 200, "word": "The"},
+                                                   {"start": 250, "end": 600, "word": "moon"}]},
+        sentences=[{"start": 0, "end": 600, "sentence": "The moon"}],
+        assets=[{"order_id": 1, "text": "moon", "type": "image"}],
+        mapped=[{"order_id": 1, "text": "moon", "type": "image", "start": 0, "end": 600}],
+        media=["media/1.jpg"],
+    )
+
+
+def test_foreground_save_round_trips(tmp_path):
+    path = tmp_path / "nested" / "state.json"
+    state = sample_state()
+
+    assert state.save(str(path), background=False) is None
+
+    assert PipelineState.load(str(path)) == state
+    assert "\n" not in path.read_text(encoding="utf-8")  # minified
+    assert not (tmp_path / "nested" / "state.json.tmp").exists()
+
+
+def test_background_save_snapshots_the_state_when_called(tmp_path):
+    path = tmp_path / "state.json"
+    state = sample_state()
+
+    future = state.save(str(path))
+    state.media.append("media/2.jpg")  # after the call, so it must not be written
+    future.result(timeout=10)
+
+    assert PipelineState.load(str(path)).media == ["media/1.jpg"]
+
+
+def test_background_saves_of_one_file_land_in_order(tmp_path):
+    path = tmp_path / "state.json"
+    state = PipelineState()
+    futures = []
+    for n in range(20):
+        state.topic = f"topic {n}"
+        futures.append(state.save(str(path)))
+    for future in futures:
+        future.result(timeout=10)
+
+    assert PipelineState.load(str(path)).topic == "topic 19"
+
+
+def test_unknown_keys_are_ignored_on_load(tmp_path):
+    path = tmp_path / "state.json"
+    data = {**sample_state().to_dict(), "removed_field": 1}
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert PipelineState.load(str(path)) == sample_state()
+
+
+def test_from_files_reads_the_legacy_stage_files(tmp_path):
+    state = sample_state()
+    (tmp_path / "transcript.json").write_text(json.dumps(state.transcript))
+    (tmp_path / "sentences.json").write_text(json.dumps({"sentences": state.sentences}))
+    (tmp_path / "mapped.json").write_text(json.dumps(state.mapped))
+
+    loaded = PipelineState.from_files(str(tmp_path / "transcript.json"), str(tmp_path / "sentences.json"),
+                                      str(tmp_path / "assets.json"), str(tmp_path / "mapped.json"))
+
+    assert loaded.transcript == state.transcript
+    assert loaded.sentences == state.sentences
+    assert loaded.assets == []  # no such file
+    assert loaded.mapped == state.mapped
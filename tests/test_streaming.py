@@ -0,0 +1,76 @@
+import os
+import threading
+
+import pytest
+
+from tools.pipeline import streaming
+from tools.pipeline.state import PipelineState
+from tools.pipeline.streaming import run_streaming
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTENCES = 40
+
+
+def make_state():
+    sentences = [{"start": i * 2000, "end": i * 2000 + 1900, "sentence": f"Sentence {i}."}
+                 for i in range(SENTENCES)]
+    return PipelineState(sentences=sentences, audio_path="narration.mp3")
+
+
+def plan(sentences):
+    for i in range(len(sentences)):
+        yield {"order_id": i + 1, "text": f"keyword {i}", "type": "image"}
+
+
+def worker_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("asset-")]
+
+
+@pytest.fixture
+def render(monkeypatch):
+    """Records the segments instead of encoding them."""
+    rendered = []
+    monkeypatch.setattr(streaming, "load_background", lambda path: None)
+    monkeypatch.setattr(streaming, "render_segment",
+                        lambda timeline, segment, *args, **kwargs: rendered.append(sorted(timeline)))
+    monkeypatch.setattr(streaming, "concat_segments", lambda paths, audio, output: None)
+    return rendered
+
+
+def test_every_asset_reaches_a_segment(render, tmp_path):
+    state = run_streaming(make_state(), str(tmp_path / "final.mp4"), os.path.join(ROOT, "background.jpg"),
+                          segment_seconds=10, fetch_workers=3, queue_size=2, plan=plan,
+                          fetch=lambda item: f"{item['order_id']}.jpg", media_dir=str(tmp_path),
+                          preflight_policy=None)
+
+    assert sum(render, []) == list(range(SENTENCES))
+    assert state.media == [f"{i + 1}.jpg" for i in range(SENTENCES)]
+    assert not worker_threads()
+
+
+def test_a_failed_render_stops_and_joins_the_workers(render, monkeypatch, tmp_path):
+    # Small queues and a failure on the first segment leave the planner and fetchers blocked on put
+    def fail(*args, **kwargs):
+        raise RuntimeError("encoder crashed")
+
+    monkeypatch.setattr(streaming, "render_segment", fail)
+    with pytest.raises(RuntimeError, match="encoder crashed"):
+        run_streaming(make_state(), str(tmp_path / "final.mp4"), os.path.join(ROOT, "background.jpg"),
+                      segment_seconds=4, fetch_workers=2, queue_size=1, plan=plan,
+                      fetch=lambda item: f"{item['order_id']}.jpg", media_dir=str(tmp_path),
+                      preflight_policy=None)
+
+    assert not worker_threads()
+
+
+def test_planning_errors_are_raised_after_the_workers_stop(render, tmp_path):
+    def broken_plan(sentences):
+        yield {"order_id": 1, "text": "first", "type": "image"}
+        raise ValueError("model stream cut off")
+
+    with pytest.raises(RuntimeError, match="model stream cut off"):
+        run_streaming(make_state(), str(tmp_path / "final.mp4"), os.path.join(ROOT, "background.jpg"),
+                      fetch_workers=2, plan=broken_plan, fetch=lambda item: "1.jpg", media_dir=str(tmp_path),
+                      preflight_policy=None)
+
+    assert not worker_threads()
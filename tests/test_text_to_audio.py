@@ -0,0 +1,121 @@
+import base64
+import io
+import json
+import types
+import wave
+
+import pytest
+
+from tools.audio import text_to_audio
+from tools.audio.text_to_audio import alignment_to_words, text_to_audio_elevenlabs
+from tools.cache import DiskCache
+
+CHAR_SECONDS = 0.05   # every character takes 50 ms in the stub's alignment
+TAIL_SECONDS = 0.2    # and each chunk's audio runs 200 ms past its last character
+SAMPLE_RATE = 8000
+
+
+def silence(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(b"\0\0" * round(seconds * SAMPLE_RATE))
+    return buffer.getvalue()
+
+
+class StubTextToSpeech:
+    """Local stand-in for ElevenLabs' convert_with_timestamps: WAV silence plus a character alignment."""
+
+    def __init__(self):
+        self.calls = []
+
+    def convert_with_timestamps(self, voice_id, output_format, text, model_id, previous_text=None, next_text=None):
+        self.calls.append(text)
+        alignment = types.SimpleNamespace(
+            characters=list(text),
+            character_start_times_seconds=[i * CHAR_SECONDS for i in range(len(text))],
+            character_end_times_seconds=[(i + 1) * CHAR_SECONDS for i in range(len(text))],
+        )
+        audio = silence(len(text) * CHAR_SECONDS + TAIL_SECONDS)
+        return types.SimpleNamespace(audio_base_64=base64.b64encode(audio).decode("ascii"), alignment=alignment)
+
+
+@pytest.fixture
+def client():
+    return types.SimpleNamespace(text_to_speech=StubTextToSpeech())
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    disk_cache = DiskCache(str(tmp_path / "tts-cache"))
+    monkeypatch.setattr(text_to_audio, "get_tts_cache", lambda: disk_cache)
+    return disk_cache
+
+
+def expected_words(chunks):
+    """Word timings the stub implies for chunks joined in order."""
+    words, offset = [], 0
+    for chunk in chunks:
+        position = 0
+        for word in chunk.split():
+            position = chunk.index(word, position)
+            words.append({"start": round(offset + position * CHAR_SECONDS * 1000),
+                          "end": round(offset + (position + len(word)) * CHAR_SECONDS * 1000),
+                          "word": word})
+            position += len(word)
+        offset += (len(chunk) * CHAR_SECONDS + TAIL_SECONDS) * 1000
+    return words
+
+
+def test_alignment_to_words_groups_characters():
+    text = "  Hello,  world!\nBye "
+    alignment = {"characters": list(text),
+                 "starts": [i * 0.1 for i in range(len(text))],
+                 "ends": [(i + 1) * 0.1 for i in range(len(text))]}
+
+    words = alignment_to_words(alignment, offset_ms=1000)
+
+    assert words == [{"start": 1200, "end": 1800, "word": "Hello,"},
+                     {"start": 2000, "end": 2600, "word": "world!"},
+                     {"start": 2700, "end": 3000, "word": "Bye"}]
+
+
+def test_chunked_transcript_offsets_follow_the_audio(client, cache, tmp_path):
+    text = "One two three. Four five six. Seven eight nine. Ten."
+    transcript_path = tmp_path / "transcript.json"
+
+    text_to_audio_elevenlabs(text, str(tmp_path / "narration.wav"), chunked=True, max_chunk_chars=20,
+                             max_workers=2, transcript_path=str(transcript_path), client=client)
+
+    chunks = client.text_to_speech.calls
+    assert len(chunks) > 1
+    transcript = json.loads(transcript_path.read_text())
+    # Offsets come from each chunk's audio length, not from its last character
+    assert transcript["words"] == expected_words(sorted(chunks, key=text.index))
+    assert [w["word"] for w in transcript["words"]] == text.split()
+
+
+def test_alignment_is_read_back_from_the_cache(client, cache, tmp_path):
+    text = "Cached words come back. With their timings."
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+
+    text_to_audio_elevenlabs(text, str(tmp_path / "a.wav"), chunked=True, max_chunk_chars=25,
+                             transcript_path=str(first), client=client)
+    calls = len(client.text_to_speech.calls)
+    text_to_audio_elevenlabs(text, str(tmp_path / "b.wav"), chunked=True, max_chunk_chars=25,
+                             transcript_path=str(second), client=client)
+
+    assert len(client.text_to_speech.calls) == calls  # every chunk came from the cache
+    assert json.loads(second.read_text()) == json.loads(first.read_text())
+    assert cache.stats()["hits"] == calls
+
+
+def test_parallel_misses_are_all_counted(client, cache, tmp_path):
+    text = " ".join(f"Sentence number {n} is here." for n in range(40))
+
+    text_to_audio_elevenlabs(text, str(tmp_path / "a.wav"), chunked=True, max_chunk_chars=30, max_workers=8,
+                             transcript_path=str(tmp_path / "t.json"), client=client)
+
+    assert cache.stats()["misses"] == len(client.text_to_speech.calls) == 40
@@ -0,0 +1,33 @@
+import os
+import subprocess
+
+import imageio_ffmpeg
+import pytest
+
+from tools.agent.find_save import process_item
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stream_info(path):
+    """ffmpeg's description of the file's video stream."""
+    completed = subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-i", path],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    lines = completed.stderr.decode("utf-8", errors="replace").splitlines()
+    return next(line for line in lines if "Video:" in line)
+
+
+@pytest.fixture
+def repo_cwd(monkeypatch):
+    monkeypatch.chdir(ROOT)  # font paths are relative to the repository root
+
+
+def test_text_asset_is_a_transparent_qtrle_clip(repo_cwd, tmp_path):
+    item = {"order_id": 7, "type": "text", "text": "Hello there", "start": 0, "end": 600}
+
+    path = process_item(item, media_dir=str(tmp_path))
+
+    assert path == str(tmp_path / "text" / "7.mov")
+    info = stream_info(path)
+    assert "qtrle" in info
+    assert "argb" in info or "rgba" in info, info
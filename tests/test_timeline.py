@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+
+from tools.text.timeline import WordTimeline, iter_transcript_words, sidecar_path
+
+
+def words(*spec):
+    """(start, end, text) triples -> transcript word dicts."""
+    return [{"start": s, "end": e, "word": w} for s, e, w in spec]
+
+
+WORDS = words((0, 300, "Hello"), (350, 700, "world."), (1200, 1500, "This"), (1550, 1900, "is"),
+              (1950, 2300, "a"), (2350, 2800, "test,"), (2850, 3200, "really."))
+
+
+def write_transcript(path, word_list):
+    with open(path, "w", encoding="utf-8") as f:
+        # The "text" value mentions the key, which the streaming reader must skip
+        json.dump({"text": 'said "words": [1]', "words": word_list}, f, indent=2)
+    return str(path)
+
+
+def test_active_at_finds_the_spoken_word():
+    timeline = WordTimeline.from_words(WORDS)
+    assert timeline.active_at(-1) == -1
+    assert timeline.active_at(0) == 0
+    assert timeline.active_at(320) == -1  # between "Hello" and "world."
+    assert timeline.active_at(699) == 1
+    assert timeline.active_at(3200) == -1
+    assert timeline.active_at(np.array([0, 320, 1600, 5000])).tolist() == [0, -1, 3, -1]
+
+
+def test_in_range_returns_overlapping_words():
+    timeline = WordTimeline.from_words(WORDS)
+    assert timeline.in_range(0, 100) == slice(0, 1)
+    assert timeline.in_range(310, 340) == slice(1, 1)  # nothing spoken
+    assert timeline.in_range(650, 1560) == slice(1, 4)
+    assert timeline.in_range(4000, 5000) == slice(7, 7)
+
+
+def test_sentences_break_on_punctuation():
+    sentences = WordTimeline.from_words(WORDS).sentences()
+    assert [s["sentence"] for s in sentences] == ["Hello world.", "This is a test,", "really."]
+    assert (sentences[0]["start"], sentences[0]["end"]) == (0, 700)
+
+
+def test_duration_segments_merge_fragments_and_split_run_ons():
+    # A word every 250 ms with no punctuation and one long pause after word 29
+    run_on = words(*[(i * 250 + (2000 if i >= 30 else 0), i * 250 + 200 + (2000 if i >= 30 else 0), f"w{i}")
+                     for i in range(60)])
+    timeline = WordTimeline.from_words(run_on + words((17000, 17100, "Ok.")))
+
+    segments = timeline.segments_by_duration(min_duration_ms=1500, max_duration_ms=4000, pause_ms=1000)
+
+    assert all(s["end"] - s["start"] <= 4000 for s in segments)
+    assert all(s["end"] - s["start"] >= 1500 for s in segments)
+    assert " ".join(s["sentence"] for s in segments).split() == [w["word"] for w in run_on] + ["Ok."]
+    # The pause is a break, so no segment spans it
+    assert any(s["sentence"].endswith("w29") for s in segments)
+
+
+def test_streamed_words_match_the_json(tmp_path):
+    path = write_transcript(tmp_path / "transcript.json", WORDS)
+    assert list(iter_transcript_words(path, block_size=7)) == WORDS
+
+
+def test_sidecar_round_trip(tmp_path):
+    path = write_transcript(tmp_path / "transcript.json", WORDS)
+
+    first = WordTimeline.from_transcript(path)
+    loaded = WordTimeline.load(sidecar_path(path))
+
+    assert loaded.vocab == first.vocab
+    assert loaded.starts.tolist() == first.starts.tolist() and loaded.ends.tolist() == first.ends.tolist()
+    assert loaded.sentences() == first.sentences()
+
+
+def test_replaced_transcript_with_an_older_mtime_is_reloaded(tmp_path):
+    path = write_transcript(tmp_path / "transcript.json", WORDS)
+    WordTimeline.from_transcript(path)
+    old = os.stat(path).st_mtime_ns
+
+    # Restored from a backup: other words, and a timestamp older than the sidecar
+    write_transcript(path, words((0, 100, "Other"), (150, 400, "words.")))
+    os.utime(path, ns=(old - 10 ** 9, old - 10 ** 9))
+
+    timeline = WordTimeline.from_transcript(path)
+
+    assert timeline.text(0, len(timeline) - 1) == "Other words."
+    assert WordTimeline.from_transcript(path).text(0, 1) == "Other words."  # the rewritten sidecar
+
+
+def test_sidecar_is_reused_for_an_unchanged_transcript(tmp_path, monkeypatch):
+    path = write_transcript(tmp_path / "transcript.json", WORDS)
+    WordTimeline.from_transcript(path)
+
+    def no_json(*args, **kwargs):
+        raise AssertionError("the sidecar should have been used")
+
+    monkeypatch.setattr("tools.text.timeline.iter_transcript_words", no_json)
+    assert len(WordTimeline.from_transcript(path)) == len(WORDS)
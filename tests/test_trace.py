@@ -0,0 +1,84 @@
+import json
+import threading
+
+import pytest
+
+from tools import trace
+
+
+@pytest.fixture
+def tracing():
+    trace.enable()
+    yield
+    trace.disable()
+    trace.enable()  # drop what the test recorded
+    trace.disable()
+
+
+def exported(tmp_path):
+    with open(trace.export_chrome_trace(str(tmp_path / "trace.json")), "r", encoding="utf-8") as f:
+        return json.load(f)["traceEvents"]
+
+
+def test_disabled_tracing_records_nothing(tmp_path):
+    trace.disable()
+    with trace.span("render", frames=10) as s:
+        s.set(bytes=1)
+    assert s is trace._NULL_SPAN
+    trace.enable(clear=False)
+    try:
+        assert exported(tmp_path) == []
+    finally:
+        trace.disable()
+
+
+def test_spans_nest_and_carry_attributes(tracing, tmp_path):
+    with trace.span("stage.fetch", category="stage"):
+        with trace.span("asset.fetch", asset_id=3) as s:
+            s.set(bytes=512)
+
+    inner, outer = [e for e in exported(tmp_path) if e["ph"] == "X"]
+
+    assert (outer["name"], outer["cat"], inner["name"]) == ("stage.fetch", "stage", "asset.fetch")
+    assert inner["args"] == {"asset_id": 3, "bytes": 512}
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_a_failing_span_records_the_error(tracing, tmp_path):
+    with pytest.raises(KeyError):
+        with trace.span("asset.fetch"):
+            raise KeyError("order_id")
+
+    event, = [e for e in exported(tmp_path) if e["ph"] == "X"]
+    assert event["args"]["error"] == "KeyError: 'order_id'"
+
+
+def test_traced_functions_and_thread_names(tracing, tmp_path):
+    @trace.traced()
+    def download(keyword):
+        return keyword.upper()
+
+    worker = threading.Thread(target=download, args=("moon",), name="fetch-worker")
+    worker.start()
+    worker.join()
+    assert download("sea") == "SEA"
+
+    events = exported(tmp_path)
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+
+    assert [e["name"] for e in spans] == ["test_trace.download"] * 2
+    assert names[spans[0]["tid"]] == "fetch-worker"
+    assert names[spans[1]["tid"]] == threading.current_thread().name
+
+
+def test_enable_drops_earlier_spans_unless_asked_not_to(tracing, tmp_path):
+    with trace.span("first"):
+        pass
+    trace.enable(clear=False)
+    with trace.span("second"):
+        pass
+    assert [e["name"] for e in exported(tmp_path) if e["ph"] == "X"] == ["first", "second"]
+
+    trace.enable()
+    assert exported(tmp_path) == []
@@ -1,28 +1,42 @@
-# audio modules
-from .audio import text_to_audio_elevenlabs
-from .audio import text_to_audio_playht
+from ._lazy import lazy_exports
 
-
-
-# text modules
-from .text import speech_to_text_assemblyai
-from .text import generate_script
-from .text import generate_assets
-from .text import json_to_script_text
-from .text import text_to_sentences_json
-from .text import words_to_sentances
-from .text import extract_json
-from .text import map_assets_to_sentences
-
-
-# image modules
-from .image import download_image_unsplash
-from .image import download_image_google
-from .image import download_gif_tenor
-
-# video modules
-from .video import create_text_video
-from .video import render_video
-
-# agent modules
-from .agent import generate_assets_from_json
\ No newline at end of file
+# Subpackages are imported on first use of one of their names, so
+# `from tools import words_to_sentances` does not load moviepy, pygame or any SDK
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    # audio modules
+    "text_to_audio_elevenlabs": ".audio",
+    "text_to_audio_playht": ".audio",
+    "synthesize_elevenlabs": ".audio",
+    # text modules
+    "speech_to_text_assemblyai": ".text",
+    "transcribe_audio": ".text",
+    "generate_script": ".text",
+    "generate_script_stream": ".text",
+    "generate_assets": ".text",
+    "plan_assets": ".text",
+    "generate_assets_stream": ".text",
+    "json_to_script_text": ".text",
+    "text_to_sentences_json": ".text",
+    "words_to_sentances": ".text",
+    "extract_json": ".text",
+    "iter_json_objects": ".text",
+    "map_assets_to_sentences": ".text",
+    "map_assets": ".text",
+    "segment_transcript": ".text",
+    "WordTimeline": ".text",
+    # image modules
+    "download_image_unsplash": ".image",
+    "download_image_google": ".image",
+    "download_gif_tenor": ".image",
+    # video modules
+    "create_text_video": ".video",
+    "render_video": ".video",
+    "render_timeline": ".video",
+    # agent modules
+    "generate_assets_from_json": ".agent",
+    "generate_asset_files": ".agent",
+    "generate_script_with_audio": ".agent",
+    # pipeline modules
+    "PipelineState": ".pipeline",
+    "run_pipeline": ".pipeline",
+})
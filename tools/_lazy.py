@@ -0,0 +1,28 @@
+import importlib
+import sys
+
+
+def lazy_exports(package_name, exports):
+    """
+    Module-level __getattr__/__dir__ for a package whose public names live in
+    submodules. A submodule is imported the first time one of its names is
+    looked up, so importing the package itself has no side effects (no SDK
+    clients, no pygame.init, no moviepy).
+
+    Usage in a package __init__:
+        __getattr__, __dir__, __all__ = lazy_exports(__name__, {"name": ".submodule", ...})
+    """
+    package = sys.modules[package_name]
+
+    def __getattr__(name):
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package_name), name)
+        setattr(package, name, value)  # later lookups are plain attribute hits
+        return value
+
+    def __dir__():
+        return sorted(set(vars(package)) | set(exports))
+
+    return __getattr__, __dir__, list(exports)
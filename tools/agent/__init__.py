@@ -1 +1,8 @@
-from .find_save import generate_assets_from_json
\ No newline at end of file
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "generate_assets_from_json": ".find_save",
+    "generate_asset_files": ".find_save",
+    "generate_script_with_audio": ".script_to_audio",
+})
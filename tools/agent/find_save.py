@@ -1,6 +1,8 @@
 import json
 import os
 
+from tools.cache import make_cache_key
+from tools.trace import span
 from tools import download_gif_tenor, download_image_google, download_image_unsplash
 from tools import create_text_video
 
@@ -8,9 +10,9 @@ def load_mapped_json(json_path):
     with open(json_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def prepare_folders():
-    for folder in ['output/image', 'output/gif', 'output/text']:
-        os.makedirs(folder, exist_ok=True)
+def prepare_folders(media_dir="output"):
+    for folder in ['image', 'gif', 'text']:
+        os.makedirs(os.path.join(media_dir, folder), exist_ok=True)
 
 def calculate_text_durations(start, end):
     total_seconds = (end - start) / 1000
@@ -20,13 +22,13 @@ def calculate_text_durations(start, end):
     return effect_duration, hold_duration, fade_out_duration
 
 
-def process_item(item):
+def process_item(item, media_dir="output"):
     order_id = item['order_id']
     keyword = item['text']
     type_ = item['type']
     
     if type_ == 'image':
-        output_path = f"output/image/{order_id}.jpg"
+        output_path = os.path.join(media_dir, "image", f"{order_id}.jpg")
         # Try Unsplash first
         # path = download_image_unsplash(keyword, output_path)
         # if path is None:
@@ -40,11 +42,12 @@ def process_item(item):
         return path
     
     elif type_ == 'gif':
-        output_path = f"output/gif/{order_id}.mp4"
+        output_path = os.path.join(media_dir, "gif", f"{order_id}.mp4")
         return download_gif_tenor(keyword, output_path)
     
     elif type_ == 'text':
-        output_path = f"output/text/{order_id}.mp4"
+        # Only the text's box with an alpha channel, so the background shows around it
+        output_path = os.path.join(media_dir, "text", f"{order_id}.mov")
         effect_duration, hold_duration, fade_out_duration = calculate_text_durations(item['start'], item['end'])
         return create_text_video(
             text=keyword,
@@ -56,26 +59,78 @@ def process_item(item):
             fade_out_duration=fade_out_duration,
             font_color=(0, 0, 0),
             bg_color=(255, 255, 255),
-            font_path="fonts/Roboto-bold.ttf"
+            font_path="fonts/Roboto-Bold.ttf",
+            transparent=True
         )
 
-def process_by_type(mapped_json):
+def asset_fingerprint(item):
+    """What an asset's media file depends on; text clips also depend on their duration and format."""
+    parts = [item['order_id'], item['type'], item['text']]
+    if item['type'] == 'text':
+        parts += [item['start'], item['end'], "rgba"]
+    return make_cache_key("asset", *parts)
+
+
+def fetch_item(item, journal=None, media_dir="output"):
+    """
+    process_item with resume support: media recorded in the journal as
+    complete (and still intact on disk) is reused instead of fetched again.
+    """
+    with span("asset.fetch", asset_id=item['order_id'], type=item['type'], keyword=item['text']) as s:
+        if journal is None:
+            path = process_item(item, media_dir)
+        else:
+            fingerprint = asset_fingerprint(item)
+            record = journal.get("asset", item['order_id'])
+            if journal.is_done("asset", item['order_id'], fingerprint) and record["files"]:
+                s.set(reused=True)
+                return record["files"][0]["path"]
+            path = process_item(item, media_dir)
+            if path and os.path.exists(path):
+                journal.record("asset", item['order_id'], fingerprint, [path])
+        if path and os.path.exists(path):
+            s.set(bytes=os.path.getsize(path))
+        return path
+
+
+def process_by_type(mapped_json, journal=None, media_dir="output", progress=None):
+    paths = []
+
+    def fetch(item):
+        paths.append(fetch_item(item, journal, media_dir))
+        if progress:
+            progress(len(paths) / len(mapped_json))
+
     # First images
     for item in sorted([i for i in mapped_json if i['type'] == 'image'], key=lambda x: x['order_id']):
-        process_item(item)
+        fetch(item)
     
     # Then gifs
     for item in sorted([i for i in mapped_json if i['type'] == 'gif'], key=lambda x: x['order_id']):
-        process_item(item)
+        fetch(item)
     
     # Then text
     for item in sorted([i for i in mapped_json if i['type'] == 'text'], key=lambda x: x['order_id']):
-        process_item(item)
+        fetch(item)
+
+    # Failed downloads return None
+    return [p for p in paths if p]
+
+
+def generate_asset_files(mapped, journal=None, media_dir="output", progress=None):
+    """
+    In-memory core of generate_assets_from_json: takes the mapped asset list
+    and returns the paths of the media files that were written. With a
+    RunJournal, assets completed by an earlier (possibly crashed) run are
+    verified and reused. Files go under media_dir/{image,gif,text}/.
+    progress, if given, is called with the fraction of assets handled.
+    """
+    prepare_folders(media_dir)
+    return process_by_type(mapped, journal, media_dir, progress)
 
 
-def generate_assets_from_json(json_path):
+def generate_assets_from_json(json_path, progress=None):
     mapped_json = load_mapped_json(json_path)
-    prepare_folders()
-    process_by_type(mapped_json)
+    return generate_asset_files(mapped_json, progress=progress)
 
 
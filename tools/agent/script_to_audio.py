@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.text.text_to_text import generate_script_stream
+from tools.audio.text_to_audio import (get_elevenlabs_client, synthesize_elevenlabs,
+                                       synthesize_elevenlabs_with_timestamps,
+                                       alignment_to_words, write_transcript)
+from tools.audio.audio_utils import mp3_duration_ms, strip_id3, write_chunk_manifest
+from tools.log import get_logger
+
+log = get_logger(__name__)
+
+
+def generate_script_with_audio(topic,
+                               script_path="output/scripts/script.json",
+                               audio_path="output/audio/narration.mp3",
+                               max_workers=4,
+                               transcript_path=None):
+    """
+    Streams the script for a topic and sends every sentence to TTS as soon as
+    it is complete, writing the audio in order while later sentences are still
+    being generated. Total latency is roughly max(LLM, TTS) instead of the sum.
+    With transcript_path set, word timings from the TTS response are saved
+    there so the narration can skip speech-to-text.
+
+    Returns:
+        tuple: (script text, audio path)
+    """
+    elevenlabs = get_elevenlabs_client()
+
+    dir_name = os.path.dirname(audio_path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+
+    sentences = []
+    durations = []
+    words = []
+    pending = []  # futures not yet written, in narration order
+
+    def synthesize(sentence, previous_text):
+        if transcript_path:
+            return synthesize_elevenlabs_with_timestamps(elevenlabs, sentence, previous_text)
+        return synthesize_elevenlabs(elevenlabs, sentence, previous_text), None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            open(audio_path, "wb") as audio_file:
+
+        def write_ready(block=False):
+            # Stitch finished sentences in order; never skip ahead of a gap
+            while pending and (block or pending[0].done()):
+                audio, alignment = pending.pop(0).result()
+                if durations:
+                    audio = strip_id3(audio)
+                audio_file.write(audio)
+                audio_file.flush()
+                if alignment:
+                    words.extend(alignment_to_words(alignment, sum(durations)))
+                durations.append(mp3_duration_ms(audio))
+
+        for sentence in generate_script_stream(topic, script_path):
+            previous_text = sentences[-1] if sentences else None
+            sentences.append(sentence)
+            log.info(f"Synthesizing sentence {len(sentences)}: {sentence[:40]}...")
+            pending.append(executor.submit(synthesize, sentence, previous_text))
+            write_ready()
+
+        write_ready(block=True)
+
+    write_chunk_manifest(audio_path, sentences, durations)
+    script_text = " ".join(sentences)
+    if transcript_path:
+        write_transcript(transcript_path, script_text, words)
+    log.info(f"Audio generated and saved as {audio_path}", extra={"sentences": len(sentences)})
+    return script_text, audio_path
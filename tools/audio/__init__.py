@@ -1,2 +1,12 @@
-from .text_to_audio import text_to_audio_elevenlabs
-from .text_to_audio import text_to_audio_playht
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "text_to_audio_elevenlabs": ".text_to_audio",
+    "text_to_audio_playht": ".text_to_audio",
+    "synthesize_elevenlabs": ".text_to_audio",
+    "get_elevenlabs_client": ".text_to_audio",
+    "get_tts_cache": ".text_to_audio",
+    "synthesize_elevenlabs_with_timestamps": ".text_to_audio",
+    "alignment_to_words": ".text_to_audio",
+})
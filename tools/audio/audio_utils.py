@@ -0,0 +1,194 @@
+import io
+import json
+import os
+import subprocess
+import wave
+
+import imageio_ffmpeg
+import numpy as np
+
+# MPEG audio Layer III tables, indexed by the header fields
+_MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],     # MPEG2
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def strip_id3(data):
+    """Removes a leading ID3v2 tag so MP3 segments can be concatenated frame to frame."""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return data
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return data[10 + size:]
+
+
+def mp3_duration_ms(data):
+    """Exact duration of MP3 data by walking the frame headers (works for CBR and VBR)."""
+    data = strip_id3(data)
+    pos = 0
+    samples = 0
+    sample_rate = 44100
+    while pos + 4 <= len(data):
+        b1, b2 = data[pos + 1], data[pos + 2]
+        version = (b1 >> 3) & 3
+        layer = (b1 >> 1) & 3
+        bitrate_idx = b2 >> 4
+        rate_idx = (b2 >> 2) & 3
+        if (data[pos] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or layer != 1
+                or bitrate_idx in (0, 15) or rate_idx == 3):
+            pos += 1  # not a Layer III frame header, resync
+            continue
+        bitrate = _MP3_BITRATES[3 if version == 3 else 2][bitrate_idx] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_idx]
+        padding = (b2 >> 1) & 1
+        if version == 3:
+            frame_len, frame_samples = 144 * bitrate // sample_rate + padding, 1152
+        else:
+            frame_len, frame_samples = 72 * bitrate // sample_rate + padding, 576
+        samples += frame_samples
+        pos += frame_len
+    return samples * 1000 / sample_rate
+
+
+def audio_duration_ms(data):
+    """Duration of a WAV or MP3 byte string in milliseconds."""
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(data)) as w:
+            return w.getnframes() * 1000 / w.getframerate()
+    return mp3_duration_ms(data)
+
+
+def join_audio(parts, output_path):
+    """
+    Losslessly joins audio segments of the same format into output_path.
+    WAV segments are merged sample for sample under a single header; MP3
+    segments are concatenated frame to frame with per-segment ID3 tags removed.
+
+    Returns:
+        list: Duration in milliseconds of each part, in order.
+    """
+    dir_name = os.path.dirname(output_path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+
+    durations = []
+    if parts and parts[0][:4] == b"RIFF":
+        with wave.open(output_path, "wb") as out:
+            for idx, part in enumerate(parts):
+                with wave.open(io.BytesIO(part)) as w:
+                    if idx == 0:
+                        out.setparams(w.getparams())
+                    elif w.getparams()[:3] != out.getparams()[:3]:
+                        raise ValueError(f"Audio chunk {idx} has a different WAV format")
+                    out.writeframes(w.readframes(w.getnframes()))
+                    durations.append(w.getnframes() * 1000 / w.getframerate())
+    else:
+        with open(output_path, "wb") as out:
+            for idx, part in enumerate(parts):
+                if idx > 0:
+                    part = strip_id3(part)
+                out.write(part)
+                durations.append(mp3_duration_ms(part))
+    return durations
+
+
+def chunk_manifest_path(output_path):
+    """Sidecar file that records where each synthesized chunk sits in the final audio."""
+    return os.path.splitext(output_path)[0] + ".chunks.json"
+
+
+def write_chunk_manifest(output_path, chunks, durations):
+    """
+    Saves the start/end offset (ms) of every chunk next to the audio file so
+    later timing stages can map chunk text onto the joined narration.
+    """
+    entries = []
+    offset = 0
+    for idx, (text, duration) in enumerate(zip(chunks, durations)):
+        entries.append({
+            "index": idx,
+            "text": text,
+            "start": round(offset),
+            "end": round(offset + duration)
+        })
+        offset += duration
+
+    manifest_path = chunk_manifest_path(output_path)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"audio": output_path, "chunks": entries}, f, indent=2, ensure_ascii=False)
+    return manifest_path
+
+
+def decode_pcm(audio_path, sample_rate=16000):
+    """
+    Decodes any audio file to mono 16-bit PCM with the ffmpeg binary bundled
+    with moviepy (imageio-ffmpeg).
+
+    Returns:
+        numpy.ndarray: int16 samples.
+    """
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-v", "error", "-i", audio_path,
+           "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def find_silence_cuts(samples, sample_rate, chunk_seconds, search_seconds=10.0, window_ms=50):
+    """
+    Picks cut points (in samples) roughly every chunk_seconds, each moved to
+    the quietest window within +/- search_seconds so cuts fall between words.
+    """
+    window = int(sample_rate * window_ms / 1000)
+    n_windows = len(samples) // window
+    if n_windows == 0:
+        return []
+    frames = samples[:n_windows * window].astype(np.float32).reshape(n_windows, window)
+    energy = np.sqrt((frames ** 2).mean(axis=1))
+
+    cuts = []
+    windows_per_chunk = int(chunk_seconds * 1000 / window_ms)
+    search = int(search_seconds * 1000 / window_ms)
+    target = windows_per_chunk
+    while target < n_windows - search:
+        lo, hi = max(target - search, 1), min(target + search, n_windows - 1)
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(quietest * window + window // 2)
+        target = quietest + windows_per_chunk
+    return cuts
+
+
+def split_audio_at_silences(audio_path, output_dir, chunk_seconds=300, overlap_seconds=2.0,
+                            sample_rate=16000):
+    """
+    Splits long audio at silence points into overlapping WAV chunks.
+
+    Returns:
+        list: dicts with "path", "offset" (ms where the chunk file starts) and
+        "own_start"/"own_end" (ms window this chunk is responsible for, used
+        to drop duplicate words from the overlaps when merging).
+    """
+    samples = decode_pcm(audio_path, sample_rate)
+    cuts = find_silence_cuts(samples, sample_rate, chunk_seconds)
+    bounds = [0] + cuts + [len(samples)]
+    overlap = int(overlap_seconds * sample_rate)
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = []
+    for idx in range(len(bounds) - 1):
+        own_start, own_end = bounds[idx], bounds[idx + 1]
+        start = max(own_start - overlap, 0)
+        end = min(own_end + overlap, len(samples))
+        path = os.path.join(output_dir, f"chunk_{idx:04d}.wav")
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(sample_rate)
+            w.writeframes(samples[start:end].tobytes())
+        chunks.append({
+            "path": path,
+            "offset": start * 1000 / sample_rate,
+            "own_start": own_start * 1000 / sample_rate,
+            "own_end": own_end * 1000 / sample_rate,
+        })
+    return chunks
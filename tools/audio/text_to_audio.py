@@ -1,74 +1,305 @@
 from elevenlabs.client import ElevenLabs
 from dotenv import load_dotenv
 import os
+import json
+import base64
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from pyht import Client
-from pyht.client import TTSOptions
+from tools.utils import chunk_text
+from tools.cache import get_shared_cache, make_cache_key, normalize_text
+from tools.audio.audio_utils import join_audio, write_chunk_manifest
+from tools.log import get_logger
+from tools.metrics import track_call, PROVIDER_RETRIES
+from tools.trace import span
 
 load_dotenv()
 
+log = get_logger(__name__)
 
+# ElevenLabs narration settings
+ELEVENLABS_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
+ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"
+ELEVENLABS_OUTPUT_FORMAT = "mp3_44100_128"
 
+# Play.ht voice used for narration
+PLAYHT_VOICE_MANIFEST = "s3://voice-cloning-zero-shot/775ae416-49bb-4fb6-bd45-740f205d20a1/jennifersaad/manifest.json"
+PLAYHT_VOICE_ENGINE = "PlayDialog-http"
+PLAYHT_OUTPUT_FORMAT = "mp3"
 
+# SDK clients are expensive to build (HTTP session, auth), so share one per process
+_clients = {}
+_clients_lock = threading.Lock()
 
-def text_to_audio_elevenlabs(text, output_path="output.mp3"):
-    elevenlabs_api_key = os.getenv('ELEVENLABS_API_KEY')
-    elevenlabs = ElevenLabs(api_key=elevenlabs_api_key)
+
+def get_elevenlabs_client():
+    """Returns the shared ElevenLabs client, creating it on first use."""
+    with _clients_lock:
+        if "elevenlabs" not in _clients:
+            _clients["elevenlabs"] = ElevenLabs(api_key=os.getenv('ELEVENLABS_API_KEY'))
+        return _clients["elevenlabs"]
+
+
+def get_playht_client(user_id, api_key):
+    """Returns the shared Play.ht client for these credentials, creating it on first use."""
+    with _clients_lock:
+        key = ("playht", user_id, api_key)
+        if key not in _clients:
+            from pyht import Client  # gRPC stack, only loaded when Play.ht is used
+            _clients[key] = Client(user_id=user_id, api_key=api_key)
+        return _clients[key]
+
+
+def get_tts_cache():
+    """
+    Returns the shared on-disk TTS audio cache. Location and size limit come
+    from TTS_CACHE_DIR and TTS_CACHE_MAX_MB.
+    """
+    return get_shared_cache("tts", ".cache/tts", 500)
+
+
+def tts_cache_key(provider, voice_id, model_id, output_format, text):
+    return make_cache_key("tts", provider, voice_id, model_id, output_format, normalize_text(text))
+
+
+def cached_synthesis(key, synthesize, use_cache=True):
+    """Returns cached audio for key, or calls synthesize() and stores its result."""
+    if not use_cache:
+        return synthesize()
+    cache = get_tts_cache()
+    audio = cache.get(key)
+    if audio is None:
+        audio = synthesize()
+        cache.set(key, audio)
+    return audio
+
+
+def synthesize_elevenlabs(elevenlabs, text, previous_text=None, next_text=None, use_cache=True):
+    """
+    Converts a piece of text to speech and returns the audio bytes.
+    previous_text/next_text let ElevenLabs keep prosody continuous across
+    sentences that are synthesized separately. They are left out of the cache
+    key so editing one sentence only re-synthesizes that sentence.
+    """
+    def synthesize():
+        with span("tts.elevenlabs", chars=len(text)) as s, track_call("elevenlabs"):
+            audio_stream = elevenlabs.text_to_speech.convert(
+                voice_id=ELEVENLABS_VOICE_ID,
+                output_format=ELEVENLABS_OUTPUT_FORMAT,
+                text=text,
+                model_id=ELEVENLABS_MODEL_ID,
+                previous_text=previous_text,
+                next_text=next_text,
+            )
+            audio = b"".join(audio_stream)
+            s.set(bytes=len(audio))
+        return audio
+
+    key = tts_cache_key("elevenlabs", ELEVENLABS_VOICE_ID, ELEVENLABS_MODEL_ID, ELEVENLABS_OUTPUT_FORMAT, text)
+    return cached_synthesis(key, synthesize, use_cache)
+
+
+def synthesize_elevenlabs_with_timestamps(elevenlabs, text, previous_text=None, next_text=None, use_cache=True):
+    """
+    Like synthesize_elevenlabs, but also returns the character alignment that
+    ElevenLabs produces alongside the audio.
+
+    Returns:
+        tuple: (audio bytes, {"characters", "starts", "ends"} with times in seconds)
+    """
+    key = tts_cache_key("elevenlabs", ELEVENLABS_VOICE_ID, ELEVENLABS_MODEL_ID, ELEVENLABS_OUTPUT_FORMAT, text)
+    cache = get_tts_cache() if use_cache else None
+    if cache is not None:
+        meta = cache.get_meta(key)
+        if meta and "alignment" in meta:
+            audio = cache.get(key)
+            if audio is not None:
+                return audio, meta["alignment"]
+        else:
+            cache.record_miss()
+
+    with span("tts.elevenlabs", chars=len(text), timestamps=True) as s, track_call("elevenlabs"):
+        response = elevenlabs.text_to_speech.convert_with_timestamps(
+            voice_id=ELEVENLABS_VOICE_ID,
+            output_format=ELEVENLABS_OUTPUT_FORMAT,
+            text=text,
+            model_id=ELEVENLABS_MODEL_ID,
+            previous_text=previous_text,
+            next_text=next_text,
+        )
+        audio = base64.b64decode(response.audio_base_64)
+        s.set(bytes=len(audio))
+    alignment = {
+        "characters": list(response.alignment.characters),
+        "starts": list(response.alignment.character_start_times_seconds),
+        "ends": list(response.alignment.character_end_times_seconds),
+    }
+
+    if cache is not None:
+        cache.set(key, audio, meta={"alignment": alignment})
+    return audio, alignment
+
+
+def alignment_to_words(alignment, offset_ms=0):
+    """
+    Groups a character alignment into AssemblyAI-style word timings
+    ({"start", "end", "word"} in integer milliseconds), shifted by offset_ms.
+    """
+    words = []
+    current, start, end = [], None, None
+    for char, char_start, char_end in zip(alignment["characters"], alignment["starts"], alignment["ends"]):
+        if char.isspace():
+            if current:
+                words.append({"start": start, "end": end, "word": "".join(current)})
+            current, start = [], None
+            continue
+        if start is None:
+            start = int(round(offset_ms + char_start * 1000))
+        end = int(round(offset_ms + char_end * 1000))
+        current.append(char)
+    if current:
+        words.append({"start": start, "end": end, "word": "".join(current)})
+    return words
+
+
+def write_transcript(output_file, text, words):
+    """Saves word timings in the same schema speech_to_text_assemblyai produces."""
+    dir_name = os.path.dirname(output_file)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    with open(output_file, "w") as json_file:
+        json.dump({"text": text, "words": words}, json_file, indent=4)
+    log.info(f"Transcript saved as {output_file}", extra={"words": len(words)})
+    return output_file
+
+
+def synthesize_chunks(chunks, synthesize, max_workers=4, retries=3, provider="tts"):
+    """
+    Synthesizes text chunks concurrently and returns their audio in order.
+    Each chunk is retried on its own with exponential backoff, so one failed
+    request does not redo the whole narration.
+
+    Parameters:
+        chunks (list): Text chunks in narration order.
+        synthesize (callable): synthesize(index, chunk) -> audio bytes.
+        provider (str): Label for the retry counter.
+    """
+    def run(index):
+        for attempt in range(retries + 1):
+            try:
+                return synthesize(index, chunks[index])
+            except Exception as e:
+                if attempt == retries:
+                    raise RuntimeError(f"Chunk {index} failed after {retries + 1} attempts: {e}") from e
+                PROVIDER_RETRIES.inc(provider=provider)
+                log.warning(f"Chunk {index} failed ({e}), retrying...",
+                            extra={"provider": provider, "attempt": attempt + 1})
+                time.sleep(2 ** attempt)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, range(len(chunks))))
+
+
+def text_to_audio_elevenlabs(text, output_path="output.mp3", chunked=False,
+                             max_chunk_chars=800, max_workers=4, retries=3, use_cache=True,
+                             transcript_path=None, client=None):
+    """
+    Converts narration text to speech and saves it to output_path.
+
+    With chunked=True the text is split at sentence boundaries and the pieces
+    are synthesized in parallel (unchanged chunks come from the cache). With
+    transcript_path set, the word timings ElevenLabs returns with the audio
+    are saved there in the transcript.json schema, so the narration does not
+    need to go through speech-to-text. client overrides the shared
+    ElevenLabs client (e.g. a local stub).
+    """
+    elevenlabs = client or get_elevenlabs_client()
     # Ensure directory exists
     dir_name = os.path.dirname(output_path)
     if dir_name:
         os.makedirs(dir_name, exist_ok=True)
 
+    chunks = chunk_text(text, max_chunk_chars) if chunked else [text]
+    alignments = [None] * len(chunks)
+
+    def synthesize(index, chunk):
+        previous_text = chunks[index - 1] if index > 0 else None
+        next_text = chunks[index + 1] if index + 1 < len(chunks) else None
+        if transcript_path:
+            audio, alignments[index] = synthesize_elevenlabs_with_timestamps(
+                elevenlabs, chunk, previous_text, next_text, use_cache)
+            return audio
+        return synthesize_elevenlabs(elevenlabs, chunk, previous_text, next_text, use_cache)
 
-    # Convert text to speech
-    audio_stream = elevenlabs.text_to_speech.convert(
-        voice_id="JBFqnCBsd6RMkjVDRZzb",
-        output_format="mp3_44100_128",
-        text=text,
-        model_id="eleven_multilingual_v2",
-    )
+    parts = synthesize_chunks(chunks, synthesize, max_workers, retries, provider="elevenlabs")
+    durations = join_audio(parts, output_path)
+    if chunked:
+        write_chunk_manifest(output_path, chunks, durations)
 
-    # Save to specified path
-    with open(output_path, "wb") as f:
-        for chunk in audio_stream:
-            f.write(chunk)
+    if transcript_path:
+        # Shift each chunk's word timings by where the chunk starts in the joined audio
+        words = []
+        offset = 0
+        for alignment, duration in zip(alignments, durations):
+            words.extend(alignment_to_words(alignment, offset))
+            offset += duration
+        write_transcript(transcript_path, " ".join(chunks), words)
 
+    if use_cache:
+        get_tts_cache().flush()
+        log.info("TTS cache", extra=get_tts_cache().stats())
     return output_path
 
 
-def text_to_audio_playht(text, output_path="output/audio/output.wav"):
+def text_to_audio_playht(text, output_path="output/audio/output.wav", chunked=False,
+                         max_chunk_chars=800, max_workers=4, retries=3, use_cache=True):
     # Load credentials
     USER_ID = os.getenv('PLAY_HT_USER_ID')
     SECRET_KEY = os.getenv('PLAY_HT_API_KEY')
 
     # Validate credentials
     if not USER_ID or not SECRET_KEY:
-        print("Error: Missing PLAY_HT_USER_ID or PLAY_HT_API_KEY in environment variables")
+        log.error("Missing PLAY_HT_USER_ID or PLAY_HT_API_KEY in environment variables")
         return None
 
     try:
-        client = Client(user_id=USER_ID, api_key=SECRET_KEY)
-        print("Connected to Play.ht. Generating Audio...")
-
-        # Voice manifest URL
-        voice_manifest_url = "s3://voice-cloning-zero-shot/775ae416-49bb-4fb6-bd45-740f205d20a1/jennifersaad/manifest.json"
+        client = get_playht_client(USER_ID, SECRET_KEY)
+        log.info("Connected to Play.ht. Generating Audio...")
 
         # TTS options
-        options = TTSOptions(voice=voice_manifest_url)
+        from pyht.client import TTSOptions
+        options = TTSOptions(voice=PLAYHT_VOICE_MANIFEST)
 
         # Ensure output folder exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-        # Generate audio and save
-        with open(output_path, "wb") as audio_file:
-            for chunk in client.tts(text, options, voice_engine='PlayDialog-http'):
-                audio_file.write(chunk)
+        def tts(chunk):
+            with span("tts.playht", chars=len(chunk)) as s, track_call("playht"):
+                audio = b"".join(client.tts(chunk, options, voice_engine=PLAYHT_VOICE_ENGINE))
+                s.set(bytes=len(audio))
+            return audio
+
+        def synthesize(index, chunk):
+            key = tts_cache_key("playht", PLAYHT_VOICE_MANIFEST, PLAYHT_VOICE_ENGINE, PLAYHT_OUTPUT_FORMAT, chunk)
+            return cached_synthesis(key, lambda: tts(chunk), use_cache)
 
-        print(f"Audio generated and saved as {output_path}")
+        if chunked:
+            chunks = chunk_text(text, max_chunk_chars)
+            parts = synthesize_chunks(chunks, synthesize, max_workers, retries, provider="playht")
+            durations = join_audio(parts, output_path)
+            write_chunk_manifest(output_path, chunks, durations)
+        else:
+            # Generate audio and save
+            with open(output_path, "wb") as audio_file:
+                audio_file.write(synthesize(0, text))
+
+        log.info(f"Audio generated and saved as {output_path}")
+        if use_cache:
+            get_tts_cache().flush()
+            log.info("TTS cache", extra=get_tts_cache().stats())
         return output_path
 
     except Exception as e:
-        print(f"Error generating audio: {e}")
+        log.error(f"Error generating audio: {e}")
         return None
-    
-
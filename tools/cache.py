@@ -0,0 +1,243 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Fraction of max_bytes that eviction frees the cache down to
+EVICT_TO = 0.9
+
+# Process-wide caches by name, so every caller shares hit statistics
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache(name, default_dir, default_max_mb):
+    """
+    Returns the process-wide DiskCache called name, creating it on first use.
+    <NAME>_CACHE_DIR and <NAME>_CACHE_MAX_MB override the defaults.
+    """
+    with _shared_lock:
+        if name not in _shared_caches:
+            prefix = name.upper()
+            _shared_caches[name] = DiskCache(
+                os.getenv(f"{prefix}_CACHE_DIR", default_dir),
+                max_bytes=int(os.getenv(f"{prefix}_CACHE_MAX_MB", str(default_max_mb))) * 1024 * 1024
+            )
+        return _shared_caches[name]
+
+
+def all_cache_stats():
+    """Stats for every shared cache created in this process."""
+    with _shared_lock:
+        return {name: cache.stats() for name, cache in _shared_caches.items()}
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Hashes a file's contents in blocks without loading it whole."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(*parts):
+    """Stable SHA-256 key for any JSON-serializable combination of values."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text):
+    """Collapses whitespace so formatting-only edits still hit the cache."""
+    return " ".join(text.split())
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path shared by every process (threads use the cache's own lock)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class DiskCache:
+    """
+    Persistent content-addressed byte cache with LRU eviction by total size.
+
+    Entries live under directory/<key[:2]>/<key>.bin; an index.json keeps the
+    last use, sizes and optional per-entry metadata. Entries are written
+    atomically, so a crash never leaves a half-written file behind.
+
+    Several processes can share a directory (e.g. batch workers): the index
+    is rewritten under a file lock, merged with what the other processes
+    wrote since, so no entry drops out of the index and eviction keeps the
+    whole directory within max_bytes.
+
+    Entry files are written at once, but the index is only rewritten every
+    flush_every writes, on flush() (callers flush at the end of a batch of
+    writes) and at exit. Reads move an entry to the end of the LRU order in
+    memory; the new last-use time reaches the shared index with the next
+    flush, so until then another process may evict an entry this one has
+    just read (a later get then counts a miss).
+    """
+
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024, flush_every=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._pending = 0  # writes since the last flush
+        self._index_path = os.path.join(directory, "index.json")
+        self._lock_path = os.path.join(directory, "index.lock")
+        self._removed = {}  # key -> when it was evicted or found missing, since the last flush
+        self._index = self._load_index()
+        atexit.register(self.flush)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("entries", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        # Stored least recently used first; indexes from before "used" keep their order
+        return OrderedDict((e["key"], {"size": e["size"], "meta": e.get("meta"), "used": e.get("used", 0)})
+                           for e in entries)
+
+    def _merge_index(self):
+        """Folds in entries other processes added or used since we last read the index (hold the file lock)."""
+        merged = dict(self._index)
+        for key, entry in self._load_index().items():
+            # Skip what we dropped, unless another process stored it again since
+            if entry["used"] <= self._removed.get(key, -1):
+                continue
+            if key not in merged or entry["used"] > merged[key]["used"]:
+                merged[key] = entry
+        self._index = OrderedDict(sorted(merged.items(), key=lambda item: item[1]["used"]))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None on a miss."""
+        with self._lock:
+            path = self._path(key)
+            if key in self._index and os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+                self._index[key]["used"] = time.time()
+                self._index.move_to_end(key)
+                self._dirty = True
+                self.hits += 1
+                return data
+            if self._index.pop(key, None) is not None:
+                self._removed[key] = time.time()
+                self._dirty = True
+            self.misses += 1
+            return None
+
+    def get_meta(self, key):
+        """Returns the metadata stored with key without counting a hit."""
+        with self._lock:
+            entry = self._index.get(key)
+            return entry["meta"] if entry else None
+
+    def record_miss(self):
+        """Counts a miss for a lookup answered without get() (e.g. by get_meta)."""
+        with self._lock:
+            self.misses += 1
+
+    def set(self, key, data, meta=None):
+        """Stores bytes (and optional JSON metadata) under key, evicting old entries if needed."""
+        with self._lock:
+            self._write_atomic(self._path(key), data)
+            self._index.pop(key, None)
+            self._index[key] = {"size": len(data), "meta": meta, "used": time.time()}
+            self._removed.pop(key, None)
+            self._dirty = True
+            self._pending += 1
+            # Eviction waits for a flush, which first merges in what other processes used since
+            if self._pending >= self.flush_every or self.size_bytes() > self.max_bytes:
+                self.flush()
+
+    def _evict(self):
+        """Once over max_bytes, drops least recently used entries down to EVICT_TO of it."""
+        total = sum(e["size"] for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        # Headroom, so a full cache does not flush on every write
+        while total > self.max_bytes * EVICT_TO and len(self._index) > 1:
+            key, entry = self._index.popitem(last=False)
+            self._removed[key] = time.time()
+            total -= entry["size"]
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """
+        Writes the index to disk if it changed, merged with the entries of
+        other processes and evicted down to max_bytes.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            with _file_lock(self._lock_path):
+                self._merge_index()
+                self._evict()
+                entries = [{"key": k, "size": e["size"], "meta": e["meta"], "used": e["used"]}
+                           for k, e in self._index.items()]
+                self._write_atomic(self._index_path, json.dumps({"entries": entries}).encode("utf-8"))
+            self._removed.clear()
+            self._dirty = False
+            self._pending = 0
+
+    def size_bytes(self):
+        with self._lock:
+            return sum(e["size"] for e in self._index.values())
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._index),
+            "bytes": self.size_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
@@ -1,3 +1,8 @@
-from .download_image import download_image_unsplash
-from .download_image import download_image_google
-from .download_image import download_gif_tenor
\ No newline at end of file
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "download_image_unsplash": ".download_image",
+    "download_image_google": ".download_image",
+    "download_gif_tenor": ".download_image",
+})
@@ -3,16 +3,38 @@ from dotenv import load_dotenv
 from urllib.parse import urlencode
 import os
 
+from tools.log import get_logger
+from tools.metrics import track_call, PROVIDER_ERRORS, DOWNLOADED_BYTES
+from tools.trace import span
+
 load_dotenv()
 
+log = get_logger(__name__)
+
 
 unsplash_api_key = os.getenv('UNSPLASH_ACCESS_KEY')
 
+# Provider endpoints; overridable so benchmarks can point them at a local stub server
+UNSPLASH_API_URL = "https://api.unsplash.com"
+GOOGLE_SEARCH_API_URL = "https://www.googleapis.com/customsearch/v1"
+TENOR_API_URL = "https://tenor.googleapis.com/v2"
+
+
+def _get(provider, step, url, keyword):
+    """GET with a trace span and provider metrics; step is "search" or "media"."""
+    with span(f"download.{provider}.{step}", keyword=keyword) as s, track_call(provider):
+        response = requests.get(url)
+        s.set(status=response.status_code, bytes=len(response.content))
+    if response.status_code != 200:
+        PROVIDER_ERRORS.inc(provider=provider)
+    DOWNLOADED_BYTES.inc(len(response.content), provider=provider)
+    return response
+
 
 def download_image_unsplash(keyword, output_path="output.jpg"):
 
     try:
-        print("Collecting images ...")
+        log.info("Collecting images ...", extra={"provider": "unsplash", "keyword": keyword})
 
         # Ensure the directory for output_path exists
         dir_name = os.path.dirname(output_path)
@@ -21,35 +43,38 @@ def download_image_unsplash(keyword, output_path="output.jpg"):
 
 
         # Unsplash API request
-        url = f"https://api.unsplash.com/search/photos?query={keyword}&client_id={unsplash_api_key}&per_page=1"
-        response = requests.get(url)
+        base_url = os.getenv('UNSPLASH_API_URL', UNSPLASH_API_URL)
+        url = f"{base_url}/search/photos?query={keyword}&client_id={unsplash_api_key}&per_page=1"
+        response = _get("unsplash", "search", url, keyword)
         if response.status_code != 200:
-            print(f"Failed to fetch image for keyword '{keyword}': {response.text}")
+            log.warning(f"Failed to fetch image for keyword '{keyword}': {response.text}",
+                        extra={"status": response.status_code})
             return None
         
         results = response.json().get("results", [])
         if not results:
-            print(f"No images found for keyword '{keyword}'")
+            log.warning(f"No images found for keyword '{keyword}'")
             return None
         
         # Get the first image URL
         image_url = results[0]["urls"]["regular"]
-        print(f"Found image URL: {image_url}")
+        log.info(f"Found image URL: {image_url}")
 
         # Download the image content
-        image_response = requests.get(image_url)
+        image_response = _get("unsplash", "media", image_url, keyword)
         if image_response.status_code == 200:
             # Save the image locally
             with open(output_path, "wb") as f:
                 f.write(image_response.content)
-            print(f"Image saved: {output_path}")
+            log.info(f"Image saved: {output_path}", extra={"bytes": len(image_response.content)})
             return output_path
         else:
-            print(f"Failed to download image from URL: {image_url}")
+            log.warning(f"Failed to download image from URL: {image_url}",
+                        extra={"status": image_response.status_code})
             return None
 
     except Exception as e:
-        print(f"Error during image search and save: {e}")
+        log.error(f"Error during image search and save: {e}", extra={"keyword": keyword})
         return None
     
 
@@ -59,10 +84,10 @@ def download_image_google(keyword, output_path="output.jpg"):
     try:
         # Validate input parameters
         if not google_api_key or not search_engine_id:
-            print("API Key and Search Engine ID are required.")
+            log.error("API Key and Search Engine ID are required.")
             return None
         
-        print(f"Searching for image with keyword: '{keyword}'")
+        log.info(f"Searching for image with keyword: '{keyword}'", extra={"provider": "google"})
         
         # Ensure the directory for output_path exists
         dir_name = os.path.dirname(output_path)
@@ -78,37 +103,39 @@ def download_image_google(keyword, output_path="output.jpg"):
             "searchType": "image",
             "num": 1
         }
-        url = f"https://www.googleapis.com/customsearch/v1?{urlencode(params)}"
-        response = requests.get(url)
+        url = f"{os.getenv('GOOGLE_SEARCH_API_URL', GOOGLE_SEARCH_API_URL)}?{urlencode(params)}"
+        response = _get("google", "search", url, keyword)
         
         # Check for API response success
         if response.status_code != 200:
-            print(f"Failed to fetch image for keyword '{keyword}': {response.text}")
+            log.warning(f"Failed to fetch image for keyword '{keyword}': {response.text}",
+                        extra={"status": response.status_code})
             return None
         
         response_json = response.json()
         if "items" not in response_json or not response_json["items"]:
-            print(f"No images found for keyword '{keyword}'")
+            log.warning(f"No images found for keyword '{keyword}'")
             return None
         
         # Get the first image URL
         image_url = response_json["items"][0]["link"]
-        print(f"Found image URL: {image_url}")
+        log.info(f"Found image URL: {image_url}")
         
         # Download the image content
-        image_response = requests.get(image_url)
+        image_response = _get("google", "media", image_url, keyword)
         if image_response.status_code == 200:
             # Save the image locally
             with open(output_path, "wb") as f:
                 f.write(image_response.content)
-            print(f"Image saved: {output_path}")
+            log.info(f"Image saved: {output_path}", extra={"bytes": len(image_response.content)})
             return output_path
         else:
-            print(f"Failed to download image from URL: {image_url}")
+            log.warning(f"Failed to download image from URL: {image_url}",
+                        extra={"status": image_response.status_code})
             return None
     
     except Exception as e:
-        print(f"Error during image search and save: {e}")
+        log.error(f"Error during image search and save: {e}", extra={"keyword": keyword})
         return None
 
 def download_gif_tenor(keyword, output_path="output.mp4"):
@@ -117,22 +144,23 @@ def download_gif_tenor(keyword, output_path="output.mp4"):
     ckey = os.getenv('C_KEY')
     try:
         # Get the GIF data from the Tenor API
-        print(f"Searching for GIF with search term: '{keyword}'")
-        url = f"https://tenor.googleapis.com/v2/search?q={keyword}&key={tenor_api_key}&client_key={ckey}&limit={lmt}"
-        r = requests.get(url)
+        log.info(f"Searching for GIF with search term: '{keyword}'", extra={"provider": "tenor"})
+        base_url = os.getenv('TENOR_API_URL', TENOR_API_URL)
+        url = f"{base_url}/search?q={keyword}&key={tenor_api_key}&client_key={ckey}&limit={lmt}"
+        r = _get("tenor", "search", url, keyword)
 
         if r.status_code != 200:
-            print(f"Failed to fetch GIF data: {r.text}")
+            log.warning(f"Failed to fetch GIF data: {r.text}", extra={"status": r.status_code})
             return None
 
         gif_data = r.json()
         if "results" not in gif_data or not gif_data["results"]:
-            print(f"No GIFs found for search term '{keyword}'")
+            log.warning(f"No GIFs found for search term '{keyword}'")
             return None
 
         # Extract the MP4 URL
         mp4_url = gif_data["results"][0]["media_formats"]["mp4"]["url"]
-        print(f"Found MP4 URL: {mp4_url}")
+        log.info(f"Found MP4 URL: {mp4_url}")
 
         # Create directory only if output_path contains one
         dir_name = os.path.dirname(output_path)
@@ -140,17 +168,18 @@ def download_gif_tenor(keyword, output_path="output.mp4"):
             os.makedirs(dir_name, exist_ok=True)
 
         # Download the MP4 content
-        mp4_response = requests.get(mp4_url)
+        mp4_response = _get("tenor", "media", mp4_url, keyword)
         if mp4_response.status_code == 200:
             # Save the MP4 file locally
             with open(output_path, "wb") as f:
                 f.write(mp4_response.content)
-            print(f"MP4 file downloaded successfully: {output_path}")
+            log.info(f"MP4 file downloaded successfully: {output_path}",
+                     extra={"bytes": len(mp4_response.content)})
             return output_path
         else:
-            print("Failed to download the MP4 file.")
+            log.warning("Failed to download the MP4 file.", extra={"status": mp4_response.status_code})
             return None
 
     except Exception as e:
-        print(f"Error during GIF search and save: {e}")
+        log.error(f"Error during GIF search and save: {e}", extra={"keyword": keyword})
         return None
\ No newline at end of file
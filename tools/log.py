@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import sys
+import time
+
+# Everything under tools/ logs to children of this logger
+ROOT_LOGGER = "tools"
+
+# LogRecord attributes that are not user fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time, so redirected job logs capture it."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class TextFormatter(logging.Formatter):
+    """The message as before, followed by any structured fields as key=value."""
+
+    def format(self, record):
+        message = record.getMessage()
+        fields = _fields(record)
+        if fields:
+            message += "  " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and fields."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                    + f".{int(record.msecs):03d}",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+
+
+def configure_logging(level=None, json_format=None):
+    """
+    Sets up the tools logger: level from TOOLS_LOG_LEVEL (default INFO) and
+    format from TOOLS_LOG_FORMAT ("text" or "json"). Called on first use of
+    get_logger; call it again to change either.
+    """
+    level = level or os.getenv("TOOLS_LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("TOOLS_LOG_FORMAT", "text").lower() == "json"
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        if isinstance(handler, _StdoutHandler):
+            logger.removeHandler(handler)
+    handler = _StdoutHandler()
+    handler.setFormatter(JsonFormatter() if json_format else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    # The tools print their own progress; applications that want it elsewhere reconfigure
+    logger.propagate = False
+    return logger
+
+
+def get_logger(name):
+    """Logger for a tools module; structured fields go in extra={...}."""
+    root = logging.getLogger(ROOT_LOGGER)
+    if not any(isinstance(h, _StdoutHandler) for h in root.handlers):
+        configure_logging()
+    return logging.getLogger(name if name.startswith(ROOT_LOGGER) else f"{ROOT_LOGGER}.{name}")
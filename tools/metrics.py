@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _Metric:
+    """A named family of samples, one per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(dict(zip(self.labels, key)), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """Monotonic total, e.g. calls or bytes."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. open readers or the last render's fps."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics. Collectors are called at export time for
+    values that live elsewhere (e.g. the hit counts of the disk caches).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labels):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def add_collector(self, collect):
+        """collect() -> iterable of (name, kind, help, labels dict, value), run at export."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        families = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            families[metric.name] = (metric.kind, metric.help, metric.samples())
+        for collect in collectors:
+            for name, kind, help_text, labels, value in collect():
+                families.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+
+        lines = []
+        for name in sorted(families):
+            kind, help_text, samples = families[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples, key=lambda s: sorted(s[0].items())):
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_number(value)}" if label_text
+                             else f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the text format to path atomically (e.g. for node_exporter's textfile collector)."""
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Metrics shared by the tools ---
+
+PROVIDER_CALLS = REGISTRY.counter("tools_provider_calls_total", "API calls per provider", ("provider",))
+PROVIDER_ERRORS = REGISTRY.counter("tools_provider_errors_total", "Failed API calls per provider", ("provider",))
+PROVIDER_RETRIES = REGISTRY.counter("tools_provider_retries_total", "Retried API calls per provider", ("provider",))
+PROVIDER_SECONDS = REGISTRY.counter("tools_provider_seconds_total", "Time spent in API calls per provider",
+                                    ("provider",))
+DOWNLOADED_BYTES = REGISTRY.counter("tools_downloaded_bytes_total", "Bytes downloaded per provider", ("provider",))
+
+MEMORY_CACHE_LOOKUPS = REGISTRY.counter("tools_memory_cache_lookups_total",
+                                        "In-process cache lookups by cache and result (hit or miss)",
+                                        ("cache", "result"))
+
+RENDER_FRAMES = REGISTRY.counter("tools_render_frames_total", "Frames encoded", ("kind",))
+RENDER_ENCODE_SECONDS = REGISTRY.counter("tools_render_encode_seconds_total", "Time spent encoding", ("kind",))
+RENDER_OUTPUT_SECONDS = REGISTRY.counter("tools_render_output_seconds_total", "Seconds of video encoded", ("kind",))
+RENDER_FPS = REGISTRY.gauge("tools_render_fps", "Frames per second of the last encode", ("kind",))
+RENDER_SECONDS_PER_OUTPUT_SECOND = REGISTRY.gauge("tools_render_encode_seconds_per_output_second",
+                                                  "Encode time per second of output of the last encode", ("kind",))
+FFMPEG_READERS = REGISTRY.gauge("tools_ffmpeg_readers_open", "ffmpeg reader processes currently open")
+FFMPEG_READERS.set(0)
+
+
+@contextmanager
+def track_call(provider):
+    """Counts a provider call, its duration, and an error if the block raises."""
+    PROVIDER_CALLS.inc(provider=provider)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PROVIDER_ERRORS.inc(provider=provider)
+        raise
+    finally:
+        PROVIDER_SECONDS.inc(time.perf_counter() - started, provider=provider)
+
+
+def record_encode(kind, frames, fps, seconds):
+    """Records one finished encode of frames at fps that took seconds."""
+    output_seconds = frames / fps if fps else 0
+    RENDER_FRAMES.inc(frames, kind=kind)
+    RENDER_ENCODE_SECONDS.inc(seconds, kind=kind)
+    RENDER_OUTPUT_SECONDS.inc(output_seconds, kind=kind)
+    if seconds > 0:
+        RENDER_FPS.set(round(frames / seconds, 2), kind=kind)
+    if output_seconds > 0:
+        RENDER_SECONDS_PER_OUTPUT_SECOND.set(round(seconds / output_seconds, 3), kind=kind)
+
+
+def _disk_cache_samples():
+    from tools.cache import all_cache_stats
+
+    for name, stats in all_cache_stats().items():
+        labels = {"cache": name}
+        yield "tools_disk_cache_hits_total", "counter", "Disk cache hits", labels, stats["hits"]
+        yield "tools_disk_cache_misses_total", "counter", "Disk cache misses", labels, stats["misses"]
+        yield "tools_disk_cache_hit_ratio", "gauge", "Disk cache hit ratio", labels, stats["hit_rate"]
+        yield "tools_disk_cache_bytes", "gauge", "Disk cache size", labels, stats["bytes"]
+
+
+REGISTRY.add_collector(_disk_cache_samples)
+
+
+def write_metrics(path=None):
+    """Writes all metrics to path, or to TOOLS_METRICS_FILE if set; returns the path or None."""
+    path = path or os.getenv("TOOLS_METRICS_FILE")
+    return REGISTRY.write_prometheus(path) if path else None
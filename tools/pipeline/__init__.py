@@ -0,0 +1,26 @@
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "PipelineState": ".state",
+    "run_script": ".stages",
+    "run_tts": ".stages",
+    "run_stt": ".stages",
+    "run_segment": ".stages",
+    "run_assets": ".stages",
+    "run_map": ".stages",
+    "run_fetch": ".stages",
+    "run_render": ".stages",
+    "Stage": ".runner",
+    "build_stages": ".runner",
+    "run_pipeline": ".runner",
+    "run_streaming": ".streaming",
+    "RunJournal": ".journal",
+    "run_batch": ".batch",
+    "Job": ".jobs",
+    "JobRunner": ".jobs",
+    "RenderDaemon": ".daemon",
+    "submit_job": ".daemon",
+    "wait_for_job": ".daemon",
+    "render_via_daemon": ".daemon",
+})
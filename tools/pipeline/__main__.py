@@ -0,0 +1,5 @@
+import sys
+
+from tools.pipeline.runner import main
+
+sys.exit(main())
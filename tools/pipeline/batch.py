@@ -0,0 +1,142 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tools.pipeline.state import _write_text
+from tools.log import get_logger
+
+log = get_logger(__name__)
+
+# Job keys that are inputs rather than pipeline config
+_SOURCE_KEYS = ("topic", "script", "script_file", "audio")
+
+
+def load_manifest(manifest_path):
+    """
+    Reads a batch manifest: either a JSON list of jobs, a JSON object
+    {"defaults": {...}, "jobs": [...]}, or JSON Lines with one job per line.
+    Each job needs one of topic, script, script_file or audio; every other
+    key overrides a pipeline config option (see runner.DEFAULT_CONFIG).
+    Any other key (a typo, or workdir, which the batch sets per job) is an
+    error, so a misspelled option never silently falls back to its default.
+
+    Returns:
+        list: jobs with defaults applied and a unique "id".
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if manifest_path.endswith(".jsonl"):
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        data = json.loads(text)
+    defaults = data.get("defaults", {}) if isinstance(data, dict) else {}
+    entries = data.get("jobs", []) if isinstance(data, dict) else data
+
+    from tools.pipeline.runner import DEFAULT_CONFIG
+    known = set(_SOURCE_KEYS) | {"id"} | set(DEFAULT_CONFIG) - {"workdir"}
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs, seen = [], set()
+    for idx, entry in enumerate(entries, start=1):
+        job = {**defaults, **entry}
+        unknown = sorted(set(job) - known)
+        if unknown:
+            raise ValueError(f"Job {idx} has unknown keys: {', '.join(unknown)}")
+        if not any(job.get(key) for key in _SOURCE_KEYS):
+            raise ValueError(f"Job {idx} needs one of: {', '.join(_SOURCE_KEYS)}")
+        # Input files are relative to the manifest, not to wherever the batch is started
+        for key in ("script_file", "audio", "background"):
+            if job.get(key) and not os.path.isabs(job[key]):
+                job[key] = os.path.join(base_dir, job[key])
+        job_id = _safe_id(str(job.get("id") or f"job_{idx:03d}"))
+        if job_id in seen:
+            raise ValueError(f"Duplicate job id '{job_id}'")
+        seen.add(job_id)
+        job["id"] = job_id
+        jobs.append(job)
+    return jobs
+
+
+def _safe_id(job_id):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", job_id).strip("._") or "job"
+
+
+def run_job(job, batch_dir):
+    """
+    Runs one job in its own workspace, <batch_dir>/<id>/, which holds its
+    state, journal, media, render and a job.log with everything it logged.
+    Meant to run in a worker process; never raises, the outcome is in the
+    returned (and saved) result.json.
+    """
+    from tools.pipeline.runner import run_pipeline
+
+    workdir = os.path.join(batch_dir, job["id"])
+    os.makedirs(workdir, exist_ok=True)
+    config = {k: v for k, v in job.items() if k not in _SOURCE_KEYS and k != "id"}
+    config["workdir"] = workdir
+
+    result = {"id": job["id"], "workdir": workdir, "status": "failed", "video_path": None,
+              "stages": [], "error": None}
+    started = time.time()
+    with open(os.path.join(workdir, "job.log"), "a", encoding="utf-8") as log_file, \
+            contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        log.info(f"=== job {job['id']} started {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+        try:
+            script = None
+            if job.get("script_file"):
+                with open(job["script_file"], "r", encoding="utf-8") as f:
+                    script = f.read()
+            state, report = run_pipeline(config, topic=job.get("topic"),
+                                         script=job.get("script") or script,
+                                         audio_path=job.get("audio"))
+            result.update(status="done", video_path=state.video_path, stages=report)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            log.exception(result["error"], extra={"job": job["id"]})
+        result["seconds"] = round(time.time() - started, 2)
+        log.info(f"=== job {job['id']} {result['status']} in {result['seconds']}s ===")
+
+    _write_text(os.path.join(workdir, "result.json"), json.dumps(result, indent=2))
+    return result
+
+
+def run_batch(manifest_path, batch_dir="output/batch", max_workers=2):
+    """
+    Runs every job of a manifest on a pool of worker processes. Jobs are
+    isolated from each other (separate workspace, log and journal) and one
+    failing job does not stop the others; re-running the batch resumes
+    unfinished jobs from their journals.
+
+    Returns:
+        list: per-job results, also written to <batch_dir>/results.json.
+    """
+    jobs = load_manifest(manifest_path)
+    os.makedirs(batch_dir, exist_ok=True)
+    log.info(f"Running {len(jobs)} jobs with {max_workers} workers...")
+
+    results = {}
+    # spawn: workers must not inherit the parent's threads (cache flushers, state writer)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {executor.submit(run_job, job, batch_dir): job["id"] for job in jobs}
+        for future in as_completed(futures):
+            job_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # the worker process itself died
+                result = {"id": job_id, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            results[job_id] = result
+            log.info(f"[{len(results)}/{len(jobs)}] {job_id}: {result['status']}"
+                     + (f" ({result['error']})" if result.get("error") else ""),
+                     extra={"job": job_id, "status": result["status"]})
+
+    ordered = [results[job["id"]] for job in jobs]
+    _write_text(os.path.join(batch_dir, "results.json"), json.dumps(ordered, indent=2))
+    failed = sum(1 for r in ordered if r["status"] != "done")
+    log.info(f"Batch finished: {len(ordered) - failed} done, {failed} failed. See {batch_dir}/results.json",
+             extra={"done": len(ordered) - failed, "failed": failed})
+    return ordered
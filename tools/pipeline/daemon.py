@@ -0,0 +1,299 @@
+import contextlib
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.pipeline.state import _write_text
+from tools.log import ROOT_LOGGER, TextFormatter, get_logger
+from tools.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LOG_DIR = "output/daemon"
+
+
+class RenderDaemon:
+    """
+    Long-lived local worker that runs render and pipeline jobs.
+
+    Everything that is expensive to set up stays warm between jobs: the
+    imported libraries (moviepy, pygame, SDK clients), loaded fonts, the
+    decoded and resized background, and the shared TTS/transcript caches.
+    Jobs are queued and run one at a time on a worker thread, since each
+    render already keeps the CPU busy.
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR):
+        self.log_dir = log_dir
+        self.started = time.time()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._work, name="render-daemon", daemon=True)
+
+    def warm_up(self, background_image_path="background.jpg"):
+        """Pays the import and decode costs before the first job arrives."""
+        import importlib
+        # Stages import their tools lazily; a daemon wants them all loaded up front
+        for module in ("tools.video.video_editor", "tools.video.text_video", "tools.agent.find_save",
+                       "tools.text.text_to_text", "tools.text.speech_to_text", "tools.audio.text_to_audio"):
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                log.warning(f"Warm-up skipped {module}: {e}")
+        from tools.video.video_editor import load_background
+        from tools.video.text_video import _init_pygame
+        _init_pygame()
+        if os.path.exists(background_image_path):
+            load_background(background_image_path)
+
+    def start(self):
+        self._worker.start()
+
+    def submit(self, kind, payload):
+        if kind not in _HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}' (expected one of: {', '.join(_HANDLERS)})")
+        job_id = f"{next(self._ids):05d}"
+        job = {"id": job_id, "kind": kind, "status": "queued", "submitted": time.time(),
+               "started": None, "finished": None, "result": None, "error": None,
+               "log": os.path.join(self.log_dir, f"job_{job_id}.log")}
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put((job_id, payload))
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def status(self):
+        from tools.cache import all_cache_stats
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"status": "ok", "pid": os.getpid(), "uptime": round(time.time() - self.started, 1),
+                "queued": self._queue.qsize(), "jobs": counts, "caches": all_cache_stats()}
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _work(self):
+        while True:
+            job_id, payload = self._queue.get()
+            with self._lock:
+                job = self.jobs[job_id]
+                job.update(status="running", started=time.time())
+                kind, log_path = job["kind"], job["log"]
+            os.makedirs(self.log_dir, exist_ok=True)
+            with job_log(log_path):
+                try:
+                    result = _HANDLERS[kind](payload, log_path)
+                    self._update(job_id, status="done", result=result, finished=time.time())
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    log.exception(error, extra={"job": job_id})
+                    self._update(job_id, status="failed", error=error, finished=time.time())
+
+
+@contextlib.contextmanager
+def job_log(path):
+    """
+    Copies what the tools log to path while a job runs. A handler on the
+    tools logger rather than a redirect of sys.stdout, which would also
+    capture every other thread of the process (the HTTP server's included).
+    """
+    handler = logging.FileHandler(path, mode="w", encoding="utf-8")
+    handler.setFormatter(TextFormatter())
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.addHandler(handler)
+    try:
+        yield handler
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _render_job(payload, log_path):
+    """
+    {"mapped" | "mapped_path", "audio_path", "output", "background", "fps",
+     "media_dir", "segment_seconds", "preflight", "motion", "transcript",
+     "caption_style"} -> {"video_path", "log"}
+
+    The options mean what they do for run_render; a transcript turns on
+    captions.
+    """
+    from tools.video.video_editor import render_timeline, render_segmented
+
+    mapped = payload.get("mapped")
+    if mapped is None:
+        with open(payload["mapped_path"], "r", encoding="utf-8") as f:
+            mapped = json.load(f)
+    output = payload.get("output", "output/render/final.mp4")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    args = (mapped, payload.get("background", "background.jpg"), output,
+            payload["audio_path"], payload.get("fps", 30))
+    options = dict(media_dir=payload.get("media_dir", "output"),
+                   preflight_policy=payload.get("preflight", "placeholder"), motion=payload.get("motion"),
+                   captions=payload.get("transcript"), caption_style=payload.get("caption_style"))
+    if payload.get("segment_seconds"):
+        render_segmented(*args, segment_seconds=payload["segment_seconds"], **options)
+    else:
+        render_timeline(*args, **options)
+    return {"video_path": output, "log": log_path}
+
+
+def _pipeline_job(payload, log_path):
+    """
+    {"config", "topic" | "script" | "audio", "force"} -> {"video_path", "stages", "log"}
+    (see run_pipeline; the workdir in config keeps jobs apart).
+    """
+    from tools.pipeline.runner import run_pipeline
+
+    state, report = run_pipeline(payload.get("config"), topic=payload.get("topic"),
+                                 script=payload.get("script"), audio_path=payload.get("audio"),
+                                 force=set(payload.get("force", [])))
+    return {"video_path": state.video_path, "stages": report, "log": log_path}
+
+
+_HANDLERS = {"render": _render_job, "pipeline": _pipeline_job}
+
+
+def _make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_metrics(self):
+            data = REGISTRY.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, daemon.status())
+            if self.path == "/metrics":
+                return self._send_metrics()
+            if self.path.startswith("/jobs/"):
+                job = daemon.get(self.path[len("/jobs/"):])
+                return self._send(200, job) if job else self._send(404, {"error": "unknown job"})
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                job = daemon.submit(request.get("kind"), request.get("payload", {}))
+            except (ValueError, json.JSONDecodeError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(202, job)
+
+        def log_message(self, format, *args):
+            pass  # keep job logs and the console free of access lines
+
+    return Handler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, log_dir=DEFAULT_LOG_DIR, background_image_path="background.jpg"):
+    """Runs the render daemon on localhost until interrupted."""
+    daemon = RenderDaemon(log_dir)
+    started = time.time()
+    daemon.warm_up(background_image_path)
+    log.info(f"Warmed up in {time.time() - started:.2f}s")
+    daemon.start()
+    server = ThreadingHTTPServer((host, port), _make_handler(daemon))
+    _write_text(os.path.join(log_dir, "daemon.json"),
+                json.dumps({"pid": os.getpid(), "url": f"http://{host}:{port}"}))
+    log.info(f"Render daemon listening on http://{host}:{port} (metrics at /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _request(url, data=None, timeout=10):
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def daemon_available(url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=0.5):
+    """True when a render daemon answers at url."""
+    try:
+        return _request(f"{url}/health", timeout=timeout).get("status") == "ok"
+    except OSError:
+        return False
+
+
+def submit_job(kind, payload, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"):
+    """Queues a job on the daemon and returns its job record."""
+    return _request(f"{url}/jobs", {"kind": kind, "payload": payload})
+
+
+def wait_for_job(job_id, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", poll_seconds=0.5, timeout=None):
+    """Polls until the job is done or failed and returns its final record."""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        job = _request(f"{url}/jobs/{job_id}")
+        if job["status"] in ("done", "failed"):
+            return job
+        if deadline and time.time() > deadline:
+            raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+        time.sleep(poll_seconds)
+
+
+def render_via_daemon(state, output_video_path, background_image_path="background.jpg", fps=30,
+                      media_dir="output", url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", segment_seconds=None,
+                      preflight_policy="placeholder", motion=None, captions=False, caption_style=None):
+    """
+    Renders a PipelineState on the render daemon if one is running. The
+    options are run_render's, so the video matches an in-process render.
+
+    Returns:
+        bool: False when no daemon answered (the caller renders in-process).
+    """
+    if not daemon_available(url):
+        return False
+    # The daemon may run from another directory, so send absolute paths
+    job = submit_job("render", {
+        "mapped": state.mapped,
+        "audio_path": os.path.abspath(state.audio_path),
+        "output": os.path.abspath(output_video_path),
+        "background": os.path.abspath(background_image_path),
+        "media_dir": os.path.abspath(media_dir),
+        "fps": fps,
+        "segment_seconds": segment_seconds,
+        "preflight": preflight_policy,
+        "motion": motion,
+        "transcript": state.transcript if captions else None,
+        "caption_style": caption_style,
+    }, url)
+    job = wait_for_job(job["id"], url)
+    if job["status"] != "done":
+        raise RuntimeError(f"Render daemon job {job['id']} failed: {job['error']} (log: {job['log']})")
+    state.video_path = output_video_path
+    return True
@@ -0,0 +1,102 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.log import get_logger
+
+log = get_logger(__name__)
+
+
+class Job:
+    """
+    A unit of work running on a JobRunner. The work function reports
+    progress through the job; the UI thread only reads snapshot().
+    """
+
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = "queued"
+        self.stage = None
+        self.fraction = 0.0
+        self.message = ""
+        self.stages = []  # (stage, seconds) of finished stages, in order
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.submitted = time.time()
+        self.finished = None
+        self._stage_started = None
+        self._lock = threading.Lock()
+
+    def report(self, stage=None, fraction=None, message=None):
+        """Moves to a new stage and/or updates its progress (0..1) and message."""
+        with self._lock:
+            if stage is not None and stage != self.stage:
+                self._close_stage()
+                self.stage, self._stage_started = stage, time.time()
+                self.fraction, self.message = 0.0, ""
+            if fraction is not None:
+                self.fraction = max(0.0, min(1.0, fraction))
+            if message is not None:
+                self.message = message
+
+    def progress(self, stage):
+        """Callback for tools that report a fraction, bound to one stage."""
+        return lambda fraction: self.report(stage, fraction)
+
+    @property
+    def running(self):
+        return self.status in ("queued", "running")
+
+    def snapshot(self):
+        with self._lock:
+            return {"id": self.id, "name": self.name, "status": self.status, "stage": self.stage,
+                    "fraction": self.fraction, "message": self.message, "stages": list(self.stages),
+                    "error": self.error, "elapsed": round((self.finished or time.time()) - self.submitted, 1)}
+
+    def _close_stage(self):
+        if self.stage is not None:
+            self.stages.append((self.stage, round(time.time() - self._stage_started, 2)))
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self._close_stage()
+            self.stage, self.status, self.result, self.error = None, status, result, error
+            self.finished = time.time()
+
+
+class JobRunner:
+    """
+    Runs pipeline work off the calling thread, so a UI script can return
+    right away and poll jobs for per-stage progress instead of blocking on
+    them. Work functions are called as fn(job, *args, **kwargs).
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        job = Job(f"{next(self._ids):05d}", name)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            job._finish("done", result=fn(job, *args, **kwargs))
+        except Exception as e:
+            job.traceback = traceback.format_exc()
+            log.error(f"Job {job.name} failed", extra={"job": job.id}, exc_info=True)
+            job._finish("failed", error=f"{type(e).__name__}: {e}")
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+
+from tools.cache import file_sha256
+
+
+class RunJournal:
+    """
+    Append-only record of completed work units (stages, assets, render
+    segments) with the content hashes of the files each one produced.
+
+    Every completion is one JSON line, flushed and fsynced before the next
+    unit starts, so after a crash the journal says exactly what finished.
+    A unit counts as done only while its fingerprint matches and its files
+    still hash to what was recorded; anything else is redone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        lines = 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write from a crash; that unit simply is not done
+                    self._records[(record["kind"], record["key"])] = record
+        except FileNotFoundError:
+            pass
+        if lines > 2 * len(self._records) + 100:
+            self.compact()
+
+    def get(self, kind, key):
+        with self._lock:
+            return self._records.get((kind, str(key)))
+
+    def is_done(self, kind, key, fingerprint):
+        """True when the unit finished with this fingerprint and its files are intact."""
+        record = self.get(kind, key)
+        if record is None or record["fingerprint"] != fingerprint:
+            return False
+        return all(_verify(entry) for entry in record["files"])
+
+    def record(self, kind, key, fingerprint, files=(), **extra):
+        """Marks a unit done, hashing the files it produced."""
+        record = {
+            "kind": kind,
+            "key": str(key),
+            "fingerprint": fingerprint,
+            "files": [_describe(p) for p in files if p],
+            "time": time.time(),
+            **extra,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            dir_name = os.path.dirname(self.path)
+            if dir_name:
+                os.makedirs(dir_name, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._records[(kind, str(key))] = record
+        return record
+
+    def forget(self, kind, key):
+        """Drops a unit so it is redone (e.g. its output was found to be broken)."""
+        with self._lock:
+            self._records.pop((kind, str(key)), None)
+            self._rewrite()
+
+    def compact(self):
+        """Rewrites the journal with only the latest record per unit."""
+        with self._lock:
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp_path = f"{self.path}.tmp"
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self._records.values():
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def _describe(path):
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+def _verify(entry):
+    """A file is intact if its size matches and it is either untouched or hashes the same."""
+    try:
+        stat = os.stat(entry["path"])
+    except FileNotFoundError:
+        return False
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    return file_sha256(entry["path"]) == entry["sha256"]
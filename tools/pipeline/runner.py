@@ -0,0 +1,430 @@
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+from tools import trace
+from tools.log import get_logger
+from tools.metrics import write_metrics
+from tools.cache import file_sha256, make_cache_key
+from tools.pipeline.state import PipelineState
+from tools.pipeline.journal import RunJournal
+from tools.video.preflight import POLICIES as PREFLIGHT_POLICIES
+from tools.pipeline.stages import (run_script, run_tts, run_stt, run_segment,
+                                   run_assets, run_map, run_fetch, run_render)
+
+log = get_logger(__name__)
+
+# Stage names in pipeline order
+STAGES = ("script", "tts", "stt", "segment", "assets", "map", "fetch", "render", "stream")
+
+# State field a run has to produce to stop after each stage (--until)
+UNTIL_TARGETS = {
+    "script": "script",
+    "tts": "audio_path",
+    "stt": "transcript",
+    "segment": "sentences",
+    "assets": "assets",
+    "map": "mapped",
+    "fetch": "media",
+    "render": "video_path",
+    "stream": "video_path",
+}
+
+# Defaults for every option a stage can read; the CLI and callers override them
+DEFAULT_CONFIG = {
+    "workdir": "output",
+    "background": "background.jpg",
+    "output": None,               # defaults to <workdir>/render/final.mp4
+    "fps": 30,
+    "tts_timestamps": True,       # take word timings from TTS instead of STT
+    "chunked_tts": False,
+    "chunked_stt": False,
+    "assets_per_minute": None,
+    "streaming": False,           # overlap asset planning, fetching and rendering
+    "segmented": False,           # render in resumable segments
+    "segment_seconds": 10,        # render segment length (streaming or segmented)
+    "fetch_workers": 4,
+    "preflight": "placeholder",   # broken assets before a render: placeholder, skip, fail or None (no check)
+    "motion": None,               # overrides of video_editor.DEFAULT_MOTION, e.g. {"shake_amount": 0}
+    "captions": False,            # karaoke captions from the transcript's word timings
+    "caption_style": None,        # overrides of captions.DEFAULT_CAPTION_STYLE, e.g. {"font_size": 56}
+    "trace": False,               # write a Chrome trace of the run to <workdir>/.pipeline/trace.json
+    "metrics_file": None,         # Prometheus metrics; TOOLS_METRICS_FILE or <workdir>/.pipeline/metrics.prom
+}
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    inputs/outputs name PipelineState fields; params name config keys. Input
+    fields listed in files hold paths, and their file contents (not the paths)
+    go into the fingerprint. artifacts returns files the stage must have left
+    on disk for a skip to be valid.
+    """
+    name: str
+    run: Callable[[PipelineState, dict], None]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+    files: Tuple[str, ...] = ()
+    artifacts: Callable[[PipelineState, dict], list] = lambda state, config: []
+    version: int = 1
+
+    def fingerprint(self, state, config):
+        """Hash of everything the stage's result depends on."""
+        values = {}
+        for name in self.inputs:
+            value = getattr(state, name)
+            if name in self.files:
+                paths = value if isinstance(value, list) else [value]
+                value = [file_sha256(p) if p and os.path.exists(p) else None for p in paths]
+            values[name] = value
+        for name in self.params:
+            value = config[name]
+            if name in self.files:
+                value = file_sha256(value) if os.path.exists(value) else None
+            values[name] = value
+        return make_cache_key("stage", self.name, self.version, values)
+
+
+def _path(config, *parts):
+    return os.path.join(config["workdir"], *parts)
+
+
+def _video_path(config):
+    return config["output"] or _path(config, "render", "final.mp4")
+
+
+def build_stages(config, provided=(), journal=None):
+    """
+    Declares the stages for one run. Word timings come from TTS when the
+    narration is synthesized here with tts_timestamps; otherwise (or when the
+    audio is supplied by the user) the STT stage produces the transcript.
+    journal is handed to the stages that resume per asset or per segment.
+    """
+    tts_timings = config["tts_timestamps"] and "audio_path" not in provided
+
+    def script(state, config):
+        run_script(state, script_path=_path(config, "scripts", "script.json"))
+
+    def tts(state, config):
+        transcript_path = _path(config, "transcript", "transcript.json") if tts_timings else None
+        run_tts(state, _path(config, "audio", "narration.mp3"), transcript_path=transcript_path,
+                chunked=config["chunked_tts"])
+
+    def stt(state, config):
+        state.transcript = None
+        run_stt(state, chunked=config["chunked_stt"])
+
+    def segment(state, config):
+        run_segment(state, assets_per_minute=config["assets_per_minute"])
+
+    def stream(state, config):
+        from tools.pipeline.streaming import run_streaming
+        path = _video_path(config)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        run_streaming(state, path, config["background"], config["fps"],
+                      config["segment_seconds"], config["fetch_workers"], journal=journal,
+                      media_dir=config["workdir"], preflight_policy=config["preflight"],
+                      motion=config["motion"], captions=config["captions"],
+                      caption_style=config["caption_style"])
+
+    def render(state, config):
+        path = _video_path(config)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        run_render(state, path, config["background"], config["fps"],
+                   config["segment_seconds"] if config["segmented"] else None, journal,
+                   media_dir=config["workdir"], preflight_policy=config["preflight"],
+                   motion=config["motion"], captions=config["captions"],
+                   caption_style=config["caption_style"])
+
+    # Captioned renders also depend on the word timings
+    captioned = ("transcript",) if config["captions"] else ()
+
+    stages = [
+        Stage("script", script, inputs=("topic",), outputs=("script",)),
+        Stage("tts", tts, inputs=("script",),
+              outputs=("audio_path", "transcript") if tts_timings else ("audio_path",),
+              params=("chunked_tts",), artifacts=lambda s, c: [s.audio_path]),
+    ]
+    if not tts_timings:
+        stages.append(Stage("stt", stt, inputs=("audio_path",), outputs=("transcript",),
+                            params=("chunked_stt",), files=("audio_path",)))
+    stages.append(Stage("segment", segment, inputs=("transcript",), outputs=("sentences",),
+                        params=("assets_per_minute",)))
+    if config["streaming"]:
+        # One stage, since planning, fetching and rendering overlap
+        stages.append(Stage("stream", stream, inputs=("sentences", "audio_path") + captioned,
+                            outputs=("assets", "mapped", "media", "video_path"),
+                            params=("background", "fps", "output", "segment_seconds", "preflight", "motion",
+                                    "captions", "caption_style"),
+                            files=("audio_path", "background"),
+                            artifacts=lambda s, c: s.media + [s.video_path]))
+        return stages
+    stages += [
+        Stage("assets", lambda s, c: run_assets(s), inputs=("sentences",), outputs=("assets",)),
+        Stage("map", lambda s, c: run_map(s), inputs=("sentences", "assets"), outputs=("mapped",)),
+        Stage("fetch", lambda s, c: run_fetch(s, journal, c["workdir"]), inputs=("mapped",), outputs=("media",),
+              artifacts=lambda s, c: s.media),
+        Stage("render", render, inputs=("mapped", "media", "audio_path") + captioned, outputs=("video_path",),
+              params=("background", "fps", "output", "segmented", "segment_seconds", "preflight",
+                      "motion", "captions", "caption_style"),
+              files=("media", "audio_path", "background"),
+              artifacts=lambda s, c: [s.video_path]),
+    ]
+    return stages
+
+
+def plan(stages, targets=("video_path",), provided=()):
+    """
+    Resolves the stages needed to produce targets, in dependency order.
+    Fields in provided are roots supplied by the caller, so their producing
+    stages are left out.
+    """
+    producers = {}
+    for stage in stages:
+        for name in stage.outputs:
+            producers[name] = stage
+
+    ordered, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in provided:
+            return
+        stage = producers.get(name)
+        if stage is None:
+            raise ValueError(f"Nothing produces '{name}'; it must be provided")
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Cycle in pipeline at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.inputs:
+            visit(dep)
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for target in targets:
+        visit(target)
+    return ordered
+
+
+def _is_set(value):
+    return value is not None and value != []
+
+
+def run_pipeline(config=None, topic=None, script=None, audio_path=None,
+                 targets=("video_path",), force=(), dry_run=False):
+    """
+    Runs the stages needed for targets, skipping every stage whose
+    fingerprint matches the last successful run and whose outputs and files
+    are still intact. Completed stages, assets and render segments are
+    recorded in a run journal in the workdir, so a run that crashed resumes
+    from the first unfinished unit. With tracing on (config "trace" or
+    TOOLS_TRACE), the run's spans are exported even if it fails.
+
+    Returns:
+        tuple: (PipelineState, list of (stage name, "run" | "skip")).
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    state_path = _path(config, "state.json")
+    journal = RunJournal(_path(config, ".pipeline", "journal.jsonl"))
+
+    state = PipelineState.load(state_path) if os.path.exists(state_path) else PipelineState()
+
+    sources = {name: value for name, value in
+               (("topic", topic), ("script", script), ("audio_path", audio_path)) if value is not None}
+    if sources:
+        for name, value in sources.items():
+            setattr(state, name, value)
+        provided = set(sources)
+    else:
+        # Re-running a workdir without inputs reuses those of its last run
+        last_run = journal.get("run", "sources")
+        provided = set(last_run["sources"]) if last_run else set()
+    if not provided:
+        raise ValueError("Provide a topic, a script or an audio file")
+    if sources and not dry_run:
+        journal.record("run", "sources", "", sources=sorted(provided))
+
+    stages = plan(build_stages(config, provided, journal), targets, provided)
+    traced_before = trace.is_enabled()
+    tracing = config["trace"] or traced_before
+    if tracing:
+        trace.enable()
+    try:
+        report = []
+        pending = set()  # fields a dry run would recompute, so their consumers are stale too
+        for stage in stages:
+            fingerprint = stage.fingerprint(state, config)
+            fresh = (
+                stage.name not in force
+                and not pending.intersection(stage.inputs)
+                and journal.is_done("stage", stage.name, fingerprint)
+                and all(_is_set(getattr(state, name)) for name in stage.outputs)
+            )
+            if fresh:
+                log.info(f"[{stage.name}] up to date, skipped", extra={"stage": stage.name})
+                report.append((stage.name, "skip"))
+                continue
+            report.append((stage.name, "run"))
+            if dry_run:
+                log.info(f"[{stage.name}] would run", extra={"stage": stage.name})
+                pending.update(stage.outputs)
+                continue
+
+            log.info(f"[{stage.name}] running...", extra={"stage": stage.name})
+            with trace.span(f"stage.{stage.name}", category="stage"):
+                stage.run(state, config)
+            # State first: a stage recorded as done must have its outputs persisted
+            state.save(state_path, background=False)
+            journal.record("stage", stage.name, fingerprint, stage.artifacts(state, config))
+    finally:
+        if tracing:
+            log.info(f"Trace written to {trace.export_chrome_trace(_path(config, '.pipeline', 'trace.json'))}")
+            if not traced_before:
+                trace.disable()  # a traced job must not leave tracing on in a long-lived process
+        if not dry_run:
+            # Process-wide totals, so in a daemon or batch worker they include earlier jobs
+            write_metrics(config["metrics_file"] or os.getenv("TOOLS_METRICS_FILE")
+                          or _path(config, ".pipeline", "metrics.prom"))
+
+    return state, report
+
+
+def _motion_args(args):
+    motion = {}
+    if args.shake_amount is not None:
+        motion["shake_amount"] = args.shake_amount
+    if args.shake_frequency is not None:
+        motion["shake_frequency_x"] = motion["shake_frequency_y"] = args.shake_frequency
+    if args.ken_burns:
+        motion["ken_burns"] = True
+    if args.zoom is not None:
+        motion["zoom"] = args.zoom
+    return motion or None
+
+
+def _caption_style_args(args):
+    style = {}
+    if args.caption_font_size is not None:
+        style["font_size"] = args.caption_font_size
+    if args.caption_lines is not None:
+        style["lines"] = args.caption_lines
+    return style or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.pipeline",
+        description="Runs the video pipeline, re-running only the stages whose inputs changed."
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--topic", help="Generate the script from this topic")
+    source.add_argument("--script-file", help="Narrate this text file instead of generating a script")
+    source.add_argument("--audio", help="Use this narration audio (transcribed with STT)")
+    source.add_argument("--batch", metavar="MANIFEST",
+                        help="Run every job of a JSON/JSONL manifest in parallel worker processes")
+    parser.add_argument("--batch-dir", default="output/batch", help="Where batch job workspaces are created")
+    parser.add_argument("--max-jobs", type=int, default=2, help="Batch jobs run at the same time")
+    parser.add_argument("--serve", action="store_true",
+                        help="Start a render daemon that keeps libraries, fonts and caches warm")
+    parser.add_argument("--port", type=int, default=8765, help="Render daemon port (localhost only)")
+    parser.add_argument("--remote", metavar="URL",
+                        help="Run the job on a render daemon, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--workdir", default=DEFAULT_CONFIG["workdir"],
+                        help="Where state, the run journal and intermediate files live")
+    parser.add_argument("--background", default=DEFAULT_CONFIG["background"])
+    parser.add_argument("--output", help="Final video path (default <workdir>/render/final.mp4)")
+    parser.add_argument("--fps", type=int, default=DEFAULT_CONFIG["fps"])
+    parser.add_argument("--assets-per-minute", type=int)
+    parser.add_argument("--no-tts-timestamps", action="store_true",
+                        help="Transcribe the narration with STT instead of using TTS word timings")
+    parser.add_argument("--chunked-tts", action="store_true")
+    parser.add_argument("--chunked-stt", action="store_true")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Fetch and render assets while they are still being planned")
+    parser.add_argument("--segmented", action="store_true",
+                        help="Render in segments, so an interrupted render resumes where it stopped")
+    parser.add_argument("--segment-seconds", type=float, default=DEFAULT_CONFIG["segment_seconds"])
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_CONFIG["fetch_workers"])
+    parser.add_argument("--preflight", choices=PREFLIGHT_POLICIES + ("off",), default=DEFAULT_CONFIG["preflight"],
+                        help="What to do with assets whose media is missing or broken before rendering")
+    parser.add_argument("--shake-amount", type=float,
+                        help="Camera shake of image and GIF overlays in pixels (0 keeps them still)")
+    parser.add_argument("--shake-frequency", type=float, help="Shakes per second, horizontally and vertically")
+    parser.add_argument("--ken-burns", action="store_true", help="Slowly pan and zoom still images instead of shaking them")
+    parser.add_argument("--zoom", type=float, help="Ken Burns zoom factor (default 1.15)")
+    parser.add_argument("--captions", action="store_true",
+                        help="Draw karaoke captions that highlight each word as it is spoken")
+    parser.add_argument("--caption-font-size", type=int, help="Caption font size (default 64)")
+    parser.add_argument("--caption-lines", type=int, help="Most caption lines shown at once (default 2)")
+    parser.add_argument("--until", choices=STAGES, help="Stop after this stage")
+    parser.add_argument("--force", nargs="+", choices=STAGES, default=[], help="Re-run these stages")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    parser.add_argument("--trace", action="store_true",
+                        help="Export a Chrome trace of the run to <workdir>/.pipeline/trace.json")
+    parser.add_argument("--metrics-file",
+                        help="Prometheus metrics of the run (default <workdir>/.pipeline/metrics.prom)")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        from tools.pipeline.daemon import serve
+        serve(port=args.port, background_image_path=args.background)
+        return 0
+    if args.batch:
+        from tools.pipeline.batch import run_batch
+        results = run_batch(args.batch, args.batch_dir, args.max_jobs)
+        return 0 if all(r["status"] == "done" for r in results) else 1
+
+    config = {
+        "workdir": args.workdir,
+        "background": args.background,
+        "output": args.output,
+        "fps": args.fps,
+        "tts_timestamps": not args.no_tts_timestamps,
+        "chunked_tts": args.chunked_tts,
+        "chunked_stt": args.chunked_stt,
+        "assets_per_minute": args.assets_per_minute,
+        "streaming": args.streaming,
+        "segmented": args.segmented,
+        "segment_seconds": args.segment_seconds,
+        "fetch_workers": args.fetch_workers,
+        "preflight": None if args.preflight == "off" else args.preflight,
+        "motion": _motion_args(args),
+        "captions": args.captions,
+        "caption_style": _caption_style_args(args),
+        "trace": args.trace,
+        "metrics_file": args.metrics_file,
+    }
+    script = None
+    if args.script_file:
+        with open(args.script_file, "r", encoding="utf-8") as f:
+            script = f.read()
+
+    targets = (UNTIL_TARGETS[args.until],) if args.until else ("video_path",)
+    if args.remote:
+        from tools.pipeline.daemon import submit_job, wait_for_job
+        job = submit_job("pipeline", {"config": config, "topic": args.topic, "script": script,
+                                      "audio": args.audio, "force": args.force}, args.remote)
+        print(f"Submitted job {job['id']} to {args.remote}")
+        job = wait_for_job(job["id"], args.remote)
+        print(f"Job {job['id']} {job['status']} (log: {job['log']})")
+        if job["status"] != "done":
+            print(job["error"])
+            return 1
+        print(f"Video: {job['result']['video_path']}")
+        return 0
+
+    state, report = run_pipeline(config, topic=args.topic, script=script, audio_path=args.audio,
+                                 targets=targets, force=set(args.force), dry_run=args.dry_run)
+    ran = [name for name, action in report if action == "run"]
+    verb = "Would run" if args.dry_run else "Ran"
+    print(f"{verb} {len(ran)} of {len(report)} stages: {', '.join(ran) or 'none'}")
+    if {"render", "stream"} & set(dict(report)) and not args.dry_run:
+        print(f"Video: {state.video_path}")
+    return 0
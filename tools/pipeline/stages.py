@@ -0,0 +1,83 @@
+import json
+
+# Each stage reads what it needs from a PipelineState and fills in its own
+# fields, so data moves between stages in memory. Paths are only used for
+# media files and for optional persistence. Stages import their tools when
+# they run, so a run that only segments never loads moviepy or the SDKs.
+
+
+def run_script(state, script_path=None):
+    """Topic -> script text."""
+    from tools.text.text_to_text import generate_script
+    state.script = generate_script(state.topic, output_path=script_path).get("script", "").strip()
+    return state
+
+
+def run_tts(state, audio_path, transcript_path=None, **options):
+    """Script -> narration audio; with transcript_path, word timings come back too."""
+    from tools.audio.text_to_audio import text_to_audio_elevenlabs
+    state.audio_path = text_to_audio_elevenlabs(state.script, output_path=audio_path,
+                                                transcript_path=transcript_path, **options)
+    if transcript_path:
+        with open(transcript_path, "r") as f:
+            state.transcript = json.load(f)
+    else:
+        state.transcript = None  # timings of any previous narration no longer apply
+    return state
+
+
+def run_stt(state, **options):
+    """Audio -> word timings (skipped when TTS already produced them)."""
+    from tools.text.speech_to_text import transcribe_audio
+    if state.transcript is None:
+        state.transcript = transcribe_audio(state.audio_path, **options)
+    return state
+
+
+def run_segment(state, **options):
+    """Word timings -> timed sentences."""
+    from tools.text.text_tools import segment_transcript
+    state.sentences = segment_transcript(state.transcript, **options)
+    return state
+
+
+def run_assets(state):
+    """Sentences -> one asset idea per sentence."""
+    from tools.text.text_to_text import plan_assets
+    state.assets = plan_assets(state.sentences)
+    return state
+
+
+def run_map(state):
+    """Assets + sentence timings -> timed asset list."""
+    from tools.text.text_tools import map_assets
+    state.mapped = map_assets(state.sentences, state.assets)
+    return state
+
+
+def run_fetch(state, journal=None, media_dir="output", progress=None):
+    """Downloads or renders the media file of every mapped asset into media_dir."""
+    from tools.agent.find_save import generate_asset_files
+    state.media = generate_asset_files(state.mapped, journal, media_dir, progress)
+    return state
+
+
+def run_render(state, output_video_path="output/render/final.mp4", background_image_path="background.jpg", fps=30,
+               segment_seconds=None, journal=None, media_dir="output", progress=None,
+               preflight_policy="placeholder", motion=None, captions=False, caption_style=None):
+    """
+    Mapped assets + audio -> final video; with segment_seconds, rendered in resumable segments.
+    With captions, the words of state.transcript are drawn as karaoke captions.
+    """
+    from tools.video.video_editor import render_timeline, render_segmented
+    transcript = state.transcript if captions else None
+    if segment_seconds:
+        render_segmented(state.mapped, background_image_path, output_video_path, state.audio_path, fps,
+                         segment_seconds, journal=journal, media_dir=media_dir, progress=progress,
+                         preflight_policy=preflight_policy, motion=motion, captions=transcript,
+                         caption_style=caption_style)
+    else:
+        render_timeline(state.mapped, background_image_path, output_video_path, state.audio_path, fps,
+                        media_dir, progress, preflight_policy, motion, transcript, caption_style)
+    state.video_path = output_video_path
+    return state
@@ -0,0 +1,84 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+# One background writer per process: persistence never blocks a stage,
+# and snapshots of the same file are written in submission order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-writer")
+
+
+@dataclass
+class PipelineState:
+    """
+    Everything the pipeline stages hand to each other, kept in memory.
+
+    Stages read and fill these fields directly instead of writing an
+    indented JSON file that the next stage re-parses. save() persists a
+    minified snapshot, optionally on a background thread.
+    """
+    topic: Optional[str] = None
+    script: Optional[str] = None
+    audio_path: Optional[str] = None
+    transcript: Optional[Dict[str, Any]] = None      # {"text", "words": [{start, end, word}]}
+    sentences: List[Dict[str, Any]] = field(default_factory=list)  # [{start, end, sentence}]
+    assets: List[Dict[str, Any]] = field(default_factory=list)     # [{order_id, text, type}]
+    mapped: List[Dict[str, Any]] = field(default_factory=list)     # [{order_id, text, type, start, end}]
+    media: List[str] = field(default_factory=list)                 # media files written for mapped
+    video_path: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def save(self, path, background=True):
+        """
+        Writes a minified JSON snapshot. With background=True the state is
+        serialized now (so later mutations do not leak in) and written off
+        the critical path; the returned future can be waited on.
+        """
+        payload = json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+        if background:
+            return _writer.submit(_write_text, path, payload)
+        _write_text(path, payload)
+        return None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_files(cls, transcript_path=None, sentences_path=None, assets_path=None, mapped_path=None):
+        """Builds a state from the legacy per-stage JSON files that exist."""
+        state = cls()
+        if transcript_path and os.path.exists(transcript_path):
+            state.transcript = _read_json(transcript_path)
+        if sentences_path and os.path.exists(sentences_path):
+            state.sentences = _read_json(sentences_path).get("sentences", [])
+        if assets_path and os.path.exists(assets_path):
+            state.assets = _read_json(assets_path).get("assets", [])
+        if mapped_path and os.path.exists(mapped_path):
+            state.mapped = _read_json(mapped_path)
+        return state
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_text(path, text):
+    dir_name = os.path.dirname(path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,198 @@
+import os
+import queue
+import threading
+
+from tools.text.text_to_text import generate_assets_stream
+from tools.text.text_tools import map_asset
+from tools.cache import file_sha256
+from tools.agent.find_save import prepare_folders, fetch_item
+from tools.video.video_editor import (plan_segments, load_background, render_segment,
+                                      segment_path, segment_fingerprint, concat_segments, SCREEN_SIZE)
+from tools.video.captions import CaptionTrack
+from tools.video.preflight import run_preflight
+from tools.log import get_logger
+
+log = get_logger(__name__)
+
+# Marks the end of a queue's stream
+_DONE = object()
+
+# How often a worker blocked on a queue checks whether the run was stopped
+_POLL_SECONDS = 0.1
+
+
+def _put(q, item, stop):
+    """q.put that gives up once stop is set; False when it did."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """q.get that returns _DONE once stop is set."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _drain(q):
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def run_streaming(state, output_video_path="output/render/final.mp4",
+                  background_image_path="background.jpg", fps=30, segment_seconds=10,
+                  fetch_workers=4, queue_size=8, plan=None, fetch=None, journal=None,
+                  media_dir="output", preflight_policy="placeholder", motion=None,
+                  captions=False, caption_style=None):
+    """
+    Streaming alternative to run_assets -> run_map -> run_fetch -> run_render.
+
+    Asset planning, fetching and rendering run at the same time, connected
+    by bounded queues:
+
+        planner --(planned)--> fetch workers --(fetched)--> segment renderer
+
+    Every asset is mapped to its sentence slot and handed to the fetchers as
+    soon as the model emits it. The renderer encodes a segment as soon as all
+    of its assets are on disk and joins the segments at the end, so total
+    time approaches that of the slowest stage instead of the sum. When a
+    queue is full, the stage feeding it waits. If the render fails, the
+    planner and fetchers are stopped and joined before the error propagates.
+    With a RunJournal, assets and segments finished by an earlier run are
+    verified and reused.
+
+    Parameters:
+        captions (bool): draw karaoke captions from state.transcript (see CaptionTrack).
+        plan (callable): sentences -> iterable of assets (default: one streamed LLM call).
+        fetch (callable): mapped item -> media path or None (default: fetch_item).
+    """
+    sentences = state.sentences
+    plan = plan or generate_assets_stream
+    fetch = fetch or (lambda item: fetch_item(item, journal, media_dir))
+
+    # Sentence timings are known up front, so the segment plan does not need the assets
+    slots = [map_asset(sentences, i, {"order_id": i + 1, "text": "", "type": ""})
+             for i in range(len(sentences))]
+    segments = plan_segments(slots, fps, segment_seconds)
+
+    planned = queue.Queue(maxsize=queue_size)
+    fetched = queue.Queue(maxsize=queue_size)
+    # Set when the renderer stops early, so workers waiting on a full or empty queue give up
+    stop = threading.Event()
+    errors = []
+    mapped = [None] * len(sentences)
+    prepare_folders(media_dir)
+
+    def planner():
+        try:
+            for i, asset in enumerate(plan(sentences)):
+                if i >= len(sentences):
+                    break
+                mapped[i] = map_asset(sentences, i, asset)
+                if not _put(planned, i, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(fetch_workers):
+                _put(planned, _DONE, stop)
+
+    def fetcher():
+        while True:
+            i = _get(planned, stop)
+            if i is _DONE:
+                _put(fetched, _DONE, stop)
+                return
+            try:
+                path = fetch(mapped[i])
+            except Exception as e:
+                log.warning(f"Fetching asset {mapped[i]['order_id']} failed: {e}",
+                            extra={"asset_id": mapped[i]["order_id"]})
+                path = None
+            if not _put(fetched, (i, path), stop):
+                return
+
+    threads = [threading.Thread(target=planner, name="asset-planner", daemon=True)]
+    threads += [threading.Thread(target=fetcher, name=f"asset-fetch-{n}", daemon=True)
+                for n in range(fetch_workers)]
+    for thread in threads:
+        thread.start()
+
+    segment_dir = os.path.splitext(output_video_path)[0] + "_segments"
+    os.makedirs(segment_dir, exist_ok=True)
+    background = None  # decoded only if some segment has to be rendered
+    background_hash = file_sha256(background_image_path)
+    # The narration is known up front, so captions do not wait for any asset
+    track = CaptionTrack(state.transcript, caption_style, SCREEN_SIZE) if captions and state.transcript else None
+
+    done = {}  # sentence index -> media path (None when the fetch failed)
+    finished_workers = 0
+    paths = []
+    try:
+        for segment in segments:
+            # Drain fetch results until every asset of this segment is settled
+            while any(i not in done for i in segment["items"]) and finished_workers < fetch_workers:
+                result = fetched.get()
+                if result is _DONE:
+                    finished_workers += 1
+                    continue
+                done[result[0]] = result[1]
+            if errors:
+                raise RuntimeError(f"Asset planning failed: {errors[0]}")
+
+            # Assets the planner never produced or that failed to download leave their slot empty
+            ready = [i for i in segment["items"] if done.get(i)]
+            timeline = {i: mapped[i] for i in ready}
+            segment = dict(segment, items=ready)
+            path = segment_path(segment_dir, segment)
+            paths.append(path)
+            fingerprint = segment_fingerprint(timeline, segment, background_hash, fps, media_dir, motion, track)
+            if journal is not None and journal.is_done("segment", path, fingerprint):
+                log.info(f"Segment {segment['index'] + 1}/{len(segments)} already rendered, reusing it.")
+                continue
+            log.info(f"Rendering segment {segment['index'] + 1}/{len(segments)} "
+                     f"({len(ready)} of {len(segment['items'])} assets)...")
+            if preflight_policy:
+                # Downloaded is not the same as decodable; check this segment's files before encoding it
+                items, _ = run_preflight([timeline[i] for i in ready], fps=fps, media_dir=media_dir,
+                                         policy=preflight_policy)
+                timeline = dict(zip(ready, items))
+            if background is None:
+                background = load_background(background_image_path)
+            render_segment(timeline, segment, background, path, fps, media_dir, motion=motion, captions=track)
+            if journal is not None:
+                journal.record("segment", path, fingerprint, [path])
+
+        # Let the fetchers hand over their end markers before joining them
+        while finished_workers < fetch_workers:
+            if fetched.get() is _DONE:
+                finished_workers += 1
+    finally:
+        # On an error the workers may be blocked on a queue nobody drains any more
+        stop.set()
+        _drain(planned)
+        _drain(fetched)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise RuntimeError(f"Asset planning failed: {errors[0]}")
+
+    concat_segments(paths, state.audio_path, output_video_path)
+    log.info("Video rendered successfully!", extra={"path": output_video_path})
+
+    state.mapped = [item for item in mapped if item is not None]
+    state.assets = [{k: item[k] for k in ("order_id", "text", "type")} for item in state.mapped]
+    state.media = [done[i] for i in sorted(done) if done.get(i)]
+    state.video_path = output_video_path
+    return state
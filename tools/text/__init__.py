@@ -1,8 +1,21 @@
-from .speech_to_text import speech_to_text_assemblyai
-from .text_to_text import generate_script
-from .text_to_text import generate_assets
-from .text_tools import text_to_sentences_json
-from .text_tools import json_to_script_text
-from .text_tools import words_to_sentances
-from .text_tools import extract_json
-from .text_tools import map_assets_to_sentences
\ No newline at end of file
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "speech_to_text_assemblyai": ".speech_to_text",
+    "transcribe_audio": ".speech_to_text",
+    "generate_script": ".text_to_text",
+    "generate_script_stream": ".text_to_text",
+    "generate_assets": ".text_to_text",
+    "plan_assets": ".text_to_text",
+    "generate_assets_stream": ".text_to_text",
+    "text_to_sentences_json": ".text_tools",
+    "json_to_script_text": ".text_tools",
+    "words_to_sentances": ".text_tools",
+    "extract_json": "tools.utils",
+    "iter_json_objects": "tools.utils",
+    "map_assets_to_sentences": ".text_tools",
+    "map_assets": ".text_tools",
+    "segment_transcript": ".text_tools",
+    "WordTimeline": ".timeline",
+})
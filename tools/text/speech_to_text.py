@@ -2,34 +2,58 @@ import assemblyai as aai
 from dotenv import load_dotenv
 import os
 import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.cache import get_shared_cache, make_cache_key, file_sha256
+from tools.audio.audio_utils import split_audio_at_silences
+from tools.log import get_logger
+from tools.metrics import track_call
+from tools.trace import span
 
 load_dotenv()
-assemblyai_api_key = os.getenv('ASSEMBLYAI_API_KEY')
 
-aai.settings.api_key = assemblyai_api_key
+log = get_logger(__name__)
 
 
-def speech_to_text_assemblyai(audio_file, output_file="transcript.json"):
-    # Configure transcription settings
-    config = aai.TranscriptionConfig(
-        word_boost=None,       # Add keywords to boost recognition accuracy (optional)
-        boost_param=None,
-        speaker_labels=False,  # Enable speaker labels if needed
-        punctuate=True,        # Add punctuation to the transcription
-        format_text=True       # Format text for readability
-    )
+def _configure_assemblyai():
+    """Sets the AssemblyAI key when a transcription actually runs, not at import."""
+    if not aai.settings.api_key:
+        aai.settings.api_key = os.getenv('ASSEMBLYAI_API_KEY')
 
-    transcriber = aai.Transcriber(config=config)
 
-    try:
-        # Perform transcription
-        transcript = transcriber.transcribe(audio_file)
+def get_transcript_cache():
+    """
+    Returns the shared on-disk transcript cache. Location and size limit come
+    from TRANSCRIPT_CACHE_DIR and TRANSCRIPT_CACHE_MAX_MB.
+    """
+    return get_shared_cache("transcript", ".cache/transcripts", 100)
+
+
+def _save_transcript(transcription_result, output_file):
+    # Ensure output folder exists
+    dir_name = os.path.dirname(output_file)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+
+    # Save transcription result to a JSON file
+    with open(output_file, 'w') as json_file:
+        json.dump(transcription_result, json_file, indent=4)
+
+
+def _transcribe_with(transcriber):
+    """Wraps an AssemblyAI transcriber into audio path -> {"text", "words"}."""
+    def transcribe(audio_file):
+        with span("stt.assemblyai", audio=audio_file) as s, track_call("assemblyai"):
+            transcript = transcriber.transcribe(audio_file)
+            s.set(words=len(transcript.words or []))
 
         if transcript.status == aai.TranscriptStatus.error:
             raise Exception(f"Transcription failed: {transcript.error}")
 
         # Collect transcription result: text + individual words with timestamps
-        transcription_result = {
+        return {
             "text": transcript.text,
             "words": [
                 {
@@ -37,24 +61,117 @@ def speech_to_text_assemblyai(audio_file, output_file="transcript.json"):
                     "end": word.end,
                     "word": word.text
                 }
-                for word in transcript.words
+                for word in transcript.words or []  # None for a chunk that is all silence
             ],
         }
+    return transcribe
+
+
+def merge_chunk_transcripts(chunks, results):
+    """
+    Merges per-chunk transcripts into one, shifting word times by each chunk's
+    offset and keeping a word only in the chunk whose own window contains its
+    midpoint, which drops the duplicates from the overlap regions.
+    """
+    words = []
+    for chunk, result in zip(chunks, results):
+        for word in result["words"]:
+            start = int(round(word["start"] + chunk["offset"]))
+            end = int(round(word["end"] + chunk["offset"]))
+            midpoint = (start + end) / 2
+            if chunk["own_start"] <= midpoint < chunk["own_end"]:
+                words.append({"start": start, "end": end, "word": word["word"]})
+    words.sort(key=lambda w: w["start"])
+    return {"text": " ".join(w["word"] for w in words), "words": words}
 
-        # Ensure output folder exists
-        dir_name = os.path.dirname(output_file)
-        if dir_name:
-            os.makedirs(dir_name, exist_ok=True)
 
+def transcribe_chunked(audio_file, transcribe, chunk_seconds=300, overlap_seconds=2.0, max_workers=4):
+    """
+    Splits long audio at silences into overlapping chunks, transcribes them
+    concurrently and merges the results, so wall time is bounded by the
+    slowest chunk instead of the whole file.
 
-        # Save transcription result to a JSON file
-        with open(output_file, 'w') as json_file:
-            json.dump(transcription_result, json_file, indent=4)
+    Parameters:
+        transcribe (callable): audio path -> {"text", "words"} (e.g. a local stub).
+    """
+    temp_dir = tempfile.mkdtemp(prefix="stt_chunks_")
+    try:
+        chunks = split_audio_at_silences(audio_file, temp_dir, chunk_seconds, overlap_seconds)
+        log.info(f"Transcribing {len(chunks)} chunks in parallel...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(transcribe, [c["path"] for c in chunks]))
+        return merge_chunk_transcripts(chunks, results)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def transcribe_audio(audio_file, word_boost=None, boost_param=None, speaker_labels=False,
+                     punctuate=True, format_text=True, use_cache=True,
+                     chunked=False, chunk_seconds=300, overlap_seconds=2.0,
+                     max_workers=4, transcribe=None):
+    """
+    In-memory core of speech_to_text_assemblyai: returns the
+    {"text", "words": [{start, end, word}]} dict without writing a file.
+    transcribe replaces AssemblyAI (e.g. with a local stub); what it returns
+    is never cached.
+    """
+    # Transcripts are cached by audio content + config, so re-running the same
+    # narration never uploads it again. Remote URLs are not cached, and neither
+    # is the output of a caller's transcribe, which is not AssemblyAI's.
+    cache_key = None
+    if use_cache and transcribe is None and os.path.isfile(audio_file):
+        cache_key = make_cache_key("transcript", file_sha256(audio_file), {
+            "word_boost": word_boost,
+            "boost_param": str(boost_param) if boost_param else None,
+            "speaker_labels": speaker_labels,
+            "punctuate": punctuate,
+            "format_text": format_text,
+            "chunk_seconds": chunk_seconds if chunked else None,
+            "overlap_seconds": overlap_seconds if chunked else None,
+        })
+        cached = get_transcript_cache().get(cache_key)
+        if cached is not None:
+            log.info("Transcript loaded from cache", extra=get_transcript_cache().stats())
+            return json.loads(cached)
+
+    # Configure transcription settings
+    config = aai.TranscriptionConfig(
+        word_boost=word_boost,         # Add keywords to boost recognition accuracy (optional)
+        boost_param=boost_param,
+        speaker_labels=speaker_labels, # Enable speaker labels if needed
+        punctuate=punctuate,           # Add punctuation to the transcription
+        format_text=format_text        # Format text for readability
+    )
+
+    if transcribe is None:
+        _configure_assemblyai()
+        transcribe = _transcribe_with(aai.Transcriber(config=config))
+
+    try:
+        # Perform transcription (long local files optionally in parallel chunks)
+        if chunked and os.path.isfile(audio_file):
+            transcription_result = transcribe_chunked(audio_file, transcribe, chunk_seconds,
+                                                      overlap_seconds, max_workers)
+        else:
+            transcription_result = transcribe(audio_file)
+
+        if cache_key:
+            get_transcript_cache().set(cache_key, json.dumps(transcription_result).encode("utf-8"))
+            get_transcript_cache().flush()
 
-        print("Transcript saved successfully.")
-        return output_file
+        return transcription_result
 
     except Exception as e:
         raise RuntimeError(f"Error during transcription: {e}")
 
 
+def speech_to_text_assemblyai(audio_file, output_file="transcript.json", **options):
+    """
+    Transcribes audio and saves the word timings to output_file.
+    Accepts the same keyword options as transcribe_audio.
+    """
+    transcription_result = transcribe_audio(audio_file, **options)
+    _save_transcript(transcription_result, output_file)
+
+    log.info("Transcript saved successfully.", extra={"path": output_file})
+    return output_file
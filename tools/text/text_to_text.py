@@ -1,79 +1,142 @@
 import os
-from google import genai
+import threading
 from dotenv import load_dotenv
 import json
 
-from tools.utils import extract_json
+from tools.utils import extract_json, iter_json_objects, StreamingFieldReader, SentenceSplitter
+from tools.metrics import track_call
+from tools.trace import span
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Gemini client
-client = genai.Client()
+# Gemini client, created on first use so importing this module needs no API key
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_genai_client():
+    """Returns the shared Gemini client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+            _client = genai.Client()
+        return _client
+
+SCRIPT_SYSTEM_INSTRUCTION = (
+    "You are a short YouTube narration script generator. Create engaging scripts using this proven framework: "
+    "HOOK (first 30 seconds): Phase 1 (0-7s) - Open with validation statement confirming viewer clicked right video, establish yourself as guide with authority/credentials. "
+    "Phase 2 (7-20s) - State what viewer will gain, make it personal with brief relatable anecdote showing why topic matters to you. "
+    "Phase 3 (20-30s) - Introduce unexpected element not implied by title, create curiosity gap with 'but what you didn't expect' style reveal. "
+    "BODY: Structure as question-answer journey. Use disproportionate pacing - don't answer every question immediately. "
+    "Introduce new questions while others remain unanswered. Always maintain 'looming questions' to prevent drop-off. "
+    "Use techniques like strategic lists ('there are X ways to...'), progressive revelation ('when I first discovered...'), "
+    "and journey narration taking audience along your discovery process. "
+    "Write conversationally using 'you' direct address, include specific examples and personal experiences throughout, "
+    "not just opening. Vary information density, use transition phrases like 'but here's the thing' and 'that's not even the best part'. "
+    "Return only valid JSON: {\"script\": \"complete flowing narration text here\"}. No markdown, code blocks, section headers, or explanations."
+)
+
 
 def generate_script(     
    text,      
    output_path="text.json",      
-   system_instruction = (
-       "You are a short YouTube narration script generator. Create engaging scripts using this proven framework: "
-       "HOOK (first 30 seconds): Phase 1 (0-7s) - Open with validation statement confirming viewer clicked right video, establish yourself as guide with authority/credentials. "
-       "Phase 2 (7-20s) - State what viewer will gain, make it personal with brief relatable anecdote showing why topic matters to you. "
-       "Phase 3 (20-30s) - Introduce unexpected element not implied by title, create curiosity gap with 'but what you didn't expect' style reveal. "
-       "BODY: Structure as question-answer journey. Use disproportionate pacing - don't answer every question immediately. "
-       "Introduce new questions while others remain unanswered. Always maintain 'looming questions' to prevent drop-off. "
-       "Use techniques like strategic lists ('there are X ways to...'), progressive revelation ('when I first discovered...'), "
-       "and journey narration taking audience along your discovery process. "
-       "Write conversationally using 'you' direct address, include specific examples and personal experiences throughout, "
-       "not just opening. Vary information density, use transition phrases like 'but here's the thing' and 'that's not even the best part'. "
-       "Return only valid JSON: {\"script\": \"complete flowing narration text here\"}. No markdown, code blocks, section headers, or explanations."
-   )
+   system_instruction=SCRIPT_SYSTEM_INSTRUCTION
 ):
  
     
     prompt = f"{system_instruction}\nTopic: {text}"
 
     # Call Gemini API
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
+    with span("llm.generate_script", model="gemini-2.5-flash") as s, track_call("gemini"):
+        response = get_genai_client().models.generate_content(
+            model="gemini-2.5-flash",
+            contents=prompt
+        )
+        s.set(chars=len(response.text or ""))
     
     # Extract JSON safely
     result_json = extract_json(response.text)
 
-    # Ensure directory exists
-    dir_name = os.path.dirname(output_path)
-    if dir_name and not os.path.exists(dir_name):
-        os.makedirs(dir_name)
+    # output_path=None keeps the result in memory only
+    if output_path:
+        # Ensure directory exists
+        dir_name = os.path.dirname(output_path)
+        if dir_name and not os.path.exists(dir_name):
+            os.makedirs(dir_name)
 
-    # Save to JSON file
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result_json, f, indent=2, ensure_ascii=False)
+        # Save to JSON file
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result_json, f, indent=2, ensure_ascii=False)
     
     return result_json
 
 
-def generate_assets(
-    input_path,
-    output_path="asset.json",
-    system_instruction = (
-        "For each input sentence, create a very short representation suitable for a YouTube video asset. "
-        "Return only a JSON object with two fields: 'text' and 'type'.\n"
-        "- 'text' should be a concise keyword, phrase, or literal text to show on screen (1–3 words). "
-        "- 'type' must be one of 'gif', 'image', or 'text'.\n"
-        "- Use 'gif' or 'image' only if the sentence describes a concrete action, object, or scene that can be visualized. "
-        "If the idea is abstract, conceptual, or cannot easily have a visual, use 'text'.\n"
-        "- Do NOT repeat the original sentence. Focus on a short, visualizable idea or literal text.\n"
-        "- Keep responses extremely short. Return only valid JSON, nothing else."
-    )
-
-
+def generate_script_stream(
+    text,
+    output_path="text.json",
+    system_instruction=SCRIPT_SYSTEM_INSTRUCTION
 ):
-    # Load the input JSON file
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    """
+    Streams the script from Gemini and yields narration sentences as soon as
+    each one completes, so TTS can start before the model has finished.
+    The full script is still saved to output_path once the stream ends.
+    """
+    prompt = f"{system_instruction}\nTopic: {text}"
+
+    reader = StreamingFieldReader("script")
+    splitter = SentenceSplitter()
+    raw_chunks = []
 
-    sentences = data.get("sentences", [])
+    # The span includes time spent by the consumer between sentences
+    with span("llm.generate_script_stream", model="gemini-2.5-flash") as s, track_call("gemini"):
+        for chunk in get_genai_client().models.generate_content_stream(
+            model="gemini-2.5-flash",
+            contents=prompt
+        ):
+            if not chunk.text:
+                continue
+            raw_chunks.append(chunk.text)
+            for sentence in splitter.feed(reader.feed(chunk.text)):
+                yield sentence
+        s.set(chars=sum(len(c) for c in raw_chunks))
+
+    raw_text = "".join(raw_chunks)
+    result_json = extract_json(raw_text)
+
+    remaining = []
+    if not reader.in_value:
+        # Model ignored the JSON format; fall back to the parsed script text
+        remaining = splitter.feed(result_json.get("script", ""))
+    for sentence in remaining + splitter.flush():
+        yield sentence
+
+    if output_path:
+        # Ensure directory exists
+        dir_name = os.path.dirname(output_path)
+        if dir_name and not os.path.exists(dir_name):
+            os.makedirs(dir_name)
+
+        # Save to JSON file
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result_json, f, indent=2, ensure_ascii=False)
+
+
+ASSET_SYSTEM_INSTRUCTION = (
+    "For each input sentence, create a very short representation suitable for a YouTube video asset. "
+    "Return only a JSON object with two fields: 'text' and 'type'.\n"
+    "- 'text' should be a concise keyword, phrase, or literal text to show on screen (1–3 words). "
+    "- 'type' must be one of 'gif', 'image', or 'text'.\n"
+    "- Use 'gif' or 'image' only if the sentence describes a concrete action, object, or scene that can be visualized. "
+    "If the idea is abstract, conceptual, or cannot easily have a visual, use 'text'.\n"
+    "- Do NOT repeat the original sentence. Focus on a short, visualizable idea or literal text.\n"
+    "- Keep responses extremely short. Return only valid JSON, nothing else."
+)
+
+
+def plan_assets(sentences, system_instruction=ASSET_SYSTEM_INSTRUCTION):
+    """In-memory core of generate_assets: one asset dict per sentence dict."""
     assets = []
 
     for idx, s in enumerate(sentences, start=1):
@@ -81,10 +144,11 @@ def generate_assets(
         prompt = f"{system_instruction}\nSentence: {sentence_text}"
 
         # Call Gemini API
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
+        with span("llm.plan_asset", model="gemini-2.5-flash", asset_id=idx), track_call("gemini"):
+            response = get_genai_client().models.generate_content(
+                model="gemini-2.5-flash",
+                contents=prompt
+            )
 
         # Use your existing extract_json function to parse output
         asset_info = extract_json(response.text)
@@ -96,6 +160,20 @@ def generate_assets(
             "type": asset_info.get("type", "text")
         })
 
+    return assets
+
+
+def generate_assets(
+    input_path,
+    output_path="asset.json",
+    system_instruction=ASSET_SYSTEM_INSTRUCTION
+):
+    # Load the input JSON file
+    with open(input_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    assets = plan_assets(data.get("sentences", []), system_instruction)
+
     # Ensure directory exists
     dir_name = os.path.dirname(output_path)
     if dir_name and not os.path.exists(dir_name):
@@ -106,3 +184,42 @@ def generate_assets(
         json.dump({"assets": assets}, f, indent=2, ensure_ascii=False)
 
     return {"assets": assets}
+
+
+def generate_assets_stream(
+    sentences,
+    system_instruction = (
+        "For each numbered input sentence, create a very short representation suitable for a YouTube video asset. "
+        "Return only a JSON array with one object per sentence, in order, each with three fields: 'order_id', 'text' and 'type'.\n"
+        "- 'order_id' is the sentence number. "
+        "- 'text' should be a concise keyword, phrase, or literal text to show on screen (1–3 words). "
+        "- 'type' must be one of 'gif', 'image', or 'text'.\n"
+        "- Use 'gif' or 'image' only if the sentence describes a concrete action, object, or scene that can be visualized. "
+        "If the idea is abstract, conceptual, or cannot easily have a visual, use 'text'.\n"
+        "- Do NOT repeat the original sentence. Focus on a short, visualizable idea or literal text.\n"
+        "- Keep responses extremely short. Return only valid JSON, nothing else."
+    )
+):
+    """
+    Plans assets for all sentences in one streamed Gemini call and yields each
+    asset as soon as its array element closes, so downloads can start before
+    the model has finished the whole batch.
+    """
+    numbered = "\n".join(f"{idx}. {s['sentence']}" for idx, s in enumerate(sentences, start=1))
+    prompt = f"{system_instruction}\nSentences:\n{numbered}"
+
+    stream = get_genai_client().models.generate_content_stream(
+        model="gemini-2.5-flash",
+        contents=prompt
+    )
+
+    with span("llm.plan_assets_stream", model="gemini-2.5-flash", sentences=len(sentences)), \
+            track_call("gemini"):
+        for idx, asset_info in enumerate(iter_json_objects(chunk.text or "" for chunk in stream), start=1):
+            if not isinstance(asset_info, dict):
+                continue
+            yield {
+                "order_id": asset_info.get("order_id", idx),
+                "text": asset_info.get("text", ""),
+                "type": asset_info.get("type", "text")
+            }
@@ -2,42 +2,11 @@ import json
 import re
 import os
 
-def extract_json(text):
-    """
-    Extract valid JSON from messy text safely.
-    Tries direct load, then simple regex, then manual brace counting.
-    """
-    # Try direct parse first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    # Try simple regex to find the first {...} block
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
-
-    # Manual brace counting fallback
-    start = text.find("{")
-    if start != -1:
-        brace_count = 0
-        for i, char in enumerate(text[start:], start=start):
-            if char == "{":
-                brace_count += 1
-            elif char == "}":
-                brace_count -= 1
-                if brace_count == 0:
-                    try:
-                        return json.loads(text[start:i+1])
-                    except json.JSONDecodeError:
-                        break
-
-    # If everything fails, return raw text
-    return {"script": text.strip()}
+from tools.utils import extract_json, iter_json_objects
+from tools.text.timeline import WordTimeline
+from tools.log import get_logger
+
+log = get_logger(__name__)
 
 def json_to_script_text(json_path):
     """
@@ -93,45 +62,51 @@ def text_to_sentences_json(text, output_path="sentences.json", split_on_comma=Tr
     
     return result_json
 
-def words_to_sentances(input_path, output_path="sentences.json"):
-    # Load JSON from input path
-    with open(input_path, "r") as f:
-        data = json.load(f)
-
-    words = data.get("words", [])
-    sentences = []
-    current_sentence = []
-    start_time = None
-
+def segment_timeline(timeline, mode="punctuation", min_duration_ms=1500, max_duration_ms=6000,
+                     pause_ms=400, assets_per_minute=None):
+    """In-memory core of words_to_sentances; returns the list of sentence dicts."""
     # Punctuation marks that indicate sentence break
     sentence_endings = (".", "?", "!", ",")
 
-    for w in words:
-        word_text = w["word"]
-        if start_time is None:
-            start_time = w["start"]
-
-        current_sentence.append(word_text)
-
-        # Check if the word ends a sentence (including comma)
-        if word_text.endswith(sentence_endings):
-            sentence_text = " ".join(current_sentence)
-            sentences.append({
-                "start": start_time,
-                "end": w["end"],
-                "sentence": sentence_text
-            })
-            current_sentence = []
-            start_time = None
-
-    # Handle leftover words (if any)
-    if current_sentence:
-        sentence_text = " ".join(current_sentence)
-        sentences.append({
-            "start": start_time,
-            "end": words[-1]["end"],
-            "sentence": sentence_text
-        })
+    if assets_per_minute:
+        mode = "duration"
+        target_ms = 60000 / assets_per_minute
+        min_duration_ms, max_duration_ms = target_ms * 0.7, target_ms * 1.5
+
+    if mode == "duration":
+        return timeline.segments_by_duration(min_duration_ms, max_duration_ms, pause_ms, sentence_endings)
+    elif mode == "punctuation":
+        return timeline.sentences(sentence_endings)
+    raise ValueError("Invalid segmentation mode. Use 'punctuation' or 'duration'.")
+
+
+def segment_transcript(transcript, **options):
+    """Segments an in-memory transcript dict ({"text", "words"}); see words_to_sentances for options."""
+    return segment_timeline(WordTimeline.from_words(transcript.get("words", [])), **options)
+
+
+def words_to_sentances(input_path, output_path="sentences.json", mode="punctuation",
+                       min_duration_ms=1500, max_duration_ms=6000, pause_ms=400,
+                       assets_per_minute=None):
+    """
+    Groups transcript words into timed segments, one asset each.
+
+    Parameters:
+        mode (str): 'punctuation' breaks on every . ? ! and comma;
+            'duration' merges fragments shorter than min_duration_ms, splits
+            run-ons longer than max_duration_ms and also breaks on pauses of
+            at least pause_ms.
+        assets_per_minute (float): Shortcut for 'duration' mode that derives
+            the min/max durations from a target asset rate.
+
+    Also writes the binary timeline sidecar next to input_path
+    (transcript.timeline.npz), which later loads of the same transcript reuse.
+    """
+    # Stream the transcript into a compact timeline (reusing its binary
+    # sidecar when present) and segment it in one vectorized pass
+    timeline = WordTimeline.from_transcript(input_path)
+    sentences = segment_timeline(timeline, mode, min_duration_ms, max_duration_ms,
+                                 pause_ms, assets_per_minute)
 
     result = {"sentences": sentences}
 
@@ -144,9 +119,37 @@ def words_to_sentances(input_path, output_path="sentences.json"):
     with open(output_path, "w") as f:
         json.dump(result, f, indent=4)
 
-    print(f"Sentences saved to: {output_path}")
+    log.info(f"Sentences saved to: {output_path}", extra={"sentences": len(sentences)})
     return output_path
 
+def map_asset(sentences, i, asset):
+    """Time slot of the i-th asset: from its sentence's start to just before the next one."""
+    # Determine start
+    if i < len(sentences):
+        start = sentences[i]['start']
+    else:
+        start = sentences[-1]['start']  # fallback if more assets than sentences
+
+    # Determine end
+    if i + 1 < len(sentences):
+        end = sentences[i+1]['start'] - 1
+    else:
+        end = sentences[-1]['end']  # last sentence keeps original end
+
+    return {
+        'order_id': asset['order_id'],
+        'text': asset['text'],
+        'type': asset['type'],
+        'start': start,
+        'end': end
+    }
+
+
+def map_assets(sentences, assets):
+    """Assigns each asset the time slot of its sentence; returns the mapped list."""
+    return [map_asset(sentences, i, asset) for i, asset in enumerate(assets)]
+
+
 def map_assets_to_sentences(sentence_path, asset_path, output_path='mapped.json'):
     # Load sentences
     with open(sentence_path, 'r', encoding='utf-8') as f:
@@ -158,29 +161,7 @@ def map_assets_to_sentences(sentence_path, asset_path, output_path='mapped.json'
         assets_data = json.load(f)
         assets = assets_data.get('assets', [])
     
-    mapped_assets = []
-    
-    for i, asset in enumerate(assets):
-        # Determine start
-        if i < len(sentences):
-            start = sentences[i]['start']
-        else:
-            start = sentences[-1]['start']  # fallback if more assets than sentences
-
-        # Determine end
-        if i + 1 < len(sentences):
-            end = sentences[i+1]['start'] - 1
-        else:
-            end = sentences[-1]['end']  # last sentence keeps original end
-
-        mapped_asset = {
-            'order_id': asset['order_id'],
-            'text': asset['text'],
-            'type': asset['type'],
-            'start': start,
-            'end': end
-        }
-        mapped_assets.append(mapped_asset)
+    mapped_assets = map_assets(sentences, assets)
     
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True) if os.path.dirname(output_path) else None
@@ -190,7 +171,3 @@ def map_assets_to_sentences(sentence_path, asset_path, output_path='mapped.json'
         json.dump(mapped_assets, f, indent=4)
     
     return output_path
-
-
-
-
@@ -0,0 +1,250 @@
+import os
+import re
+from array import array
+
+import numpy as np
+
+from tools.log import get_logger
+from tools.utils import JSONStreamParser
+
+log = get_logger(__name__)
+
+# Matches the "words" key of a transcript; the lookbehind skips escaped
+# quotes, so the key text inside the "text" string value never matches
+_WORDS_KEY = re.compile(r'(?<!\\)"words"\s*:\s*(?=\[)')
+
+
+def iter_transcript_words(transcript_path, block_size=1024 * 1024):
+    """
+    Streams the word dicts out of a transcript.json without loading the whole
+    file, yielding each {"start", "end", "word"} as soon as it is read.
+    """
+    parser = None
+    pending = ""
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            if parser is None:
+                pending += block
+                match = _WORDS_KEY.search(pending)
+                if not match:
+                    pending = pending[-64:]  # enough to catch a key split across blocks
+                    continue
+                parser = JSONStreamParser(split_arrays=True)
+                block = pending[match.end():]
+            for word in parser.feed(block):
+                yield word
+            if not parser.in_array:
+                return
+
+
+class WordTimeline:
+    """
+    Compact columnar word timeline: start/end times (ms) as int32 arrays plus
+    an interned word table, so multi-hour transcripts fit in a few bytes per
+    word and time queries are binary searches instead of list scans.
+    """
+
+    def __init__(self, starts, ends, word_ids, vocab):
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+        self.word_ids = np.asarray(word_ids, dtype=np.int32)
+        self.vocab = list(vocab)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_words(cls, words):
+        """Builds a timeline from an iterable of {"start", "end", "word"} dicts."""
+        starts, ends, word_ids = array("i"), array("i"), array("i")
+        index = {}
+        vocab = []
+        for w in words:
+            text = w["word"]
+            word_id = index.get(text)
+            if word_id is None:
+                word_id = index[text] = len(vocab)
+                vocab.append(text)
+            starts.append(int(w["start"]))
+            ends.append(int(w["end"]))
+            word_ids.append(word_id)
+        return cls(np.frombuffer(starts, dtype=np.int32), np.frombuffer(ends, dtype=np.int32),
+                   np.frombuffer(word_ids, dtype=np.int32), vocab)
+
+    @classmethod
+    def from_transcript(cls, transcript_path, use_sidecar=True):
+        """
+        Loads a transcript.json by streaming its word list. With use_sidecar,
+        the binary sidecar next to the transcript (see sidecar_path) is reused
+        when it was saved from a transcript of the same size and mtime, and
+        (re)written after a JSON load.
+        """
+        sidecar = sidecar_path(transcript_path)
+        source = transcript_stamp(transcript_path)
+        if use_sidecar and os.path.exists(sidecar):
+            timeline = cls.load(sidecar, source)
+            if timeline is not None:
+                return timeline
+
+        timeline = cls.from_words(iter_transcript_words(transcript_path))
+        if use_sidecar:
+            try:
+                timeline.save(sidecar, source)
+            except OSError as e:  # e.g. a read-only transcript folder; the sidecar only saves time
+                log.warning(f"Could not write timeline sidecar {sidecar}: {e}")
+        return timeline
+
+    def word(self, index):
+        return self.vocab[self.word_ids[index]]
+
+    def text(self, first, last):
+        """Text of words first..last inclusive."""
+        return " ".join(self.vocab[i] for i in self.word_ids[first:last + 1])
+
+    def active_at(self, t):
+        """
+        Index of the word being spoken at time t (ms), or -1 between words.
+        t may also be an array of times, answered in one vectorized search.
+        """
+        idx = np.searchsorted(self.starts, t, side="right") - 1
+        if np.ndim(idx) == 0:
+            return int(idx) if idx >= 0 and t < self.ends[idx] else -1
+        valid = idx >= 0
+        active = valid & (np.asarray(t) < self.ends[np.maximum(idx, 0)])
+        return np.where(active, idx, -1)
+
+    def in_range(self, t0, t1):
+        """Slice of the words overlapping [t0, t1) ms."""
+        first = int(np.searchsorted(self.ends, t0, side="right"))
+        last = int(np.searchsorted(self.starts, t1, side="left"))
+        return slice(first, max(first, last))
+
+    def sentence_bounds(self, endings=(".", "?", "!", ",")):
+        """
+        Vectorized sentence segmentation: a word ends a sentence when its text
+        ends with one of endings. The check runs once per unique word and is
+        then broadcast through the word ids.
+
+        Returns:
+            tuple: (first word index, last word index) arrays, one entry per sentence.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        is_ending = np.fromiter((w.endswith(endings) for w in self.vocab), dtype=bool, count=len(self.vocab))
+        last = np.flatnonzero(is_ending[self.word_ids])
+        if len(last) == 0 or last[-1] != len(self) - 1:
+            last = np.append(last, len(self) - 1)  # leftover words form the final sentence
+        first = np.concatenate(([0], last[:-1] + 1))
+        return first, last
+
+    def duration_bounds(self, min_duration_ms=1500, max_duration_ms=6000, pause_ms=400,
+                        endings=(".", "?", "!", ",")):
+        """
+        Duration-aware segmentation. Breaks are allowed after punctuation or
+        before a pause of at least pause_ms; fragments are merged until they
+        last min_duration_ms, and run-ons longer than max_duration_ms are split
+        at their longest pause. Segment count per minute therefore stays
+        close to 60000 / segment length instead of following every comma.
+
+        Returns:
+            tuple: (first word index, last word index) arrays, one entry per segment.
+        """
+        n = len(self)
+        if n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        gaps = np.empty(n, dtype=np.int64)
+        gaps[:-1] = self.starts[1:].astype(np.int64) - self.ends[:-1]
+        gaps[-1] = np.iinfo(np.int64).max
+        is_ending = np.fromiter((w.endswith(endings) for w in self.vocab), dtype=bool, count=len(self.vocab))
+        candidates = np.flatnonzero(is_ending[self.word_ids] | (gaps >= pause_ms))
+
+        first, last = [], []
+        s = 0
+        while s < n:
+            seg_start = int(self.starts[s])
+            # First word at which the segment is long enough, and last word before it is too long
+            min_word = max(s, int(np.searchsorted(self.ends, seg_start + min_duration_ms, side="left")))
+            max_word = max(s, int(np.searchsorted(self.ends, seg_start + max_duration_ms, side="right")) - 1)
+            k = int(np.searchsorted(candidates, min(min_word, n - 1)))
+            end = int(candidates[k]) if k < len(candidates) else n - 1
+            if end > max_word:
+                # Run-on: split at the longest pause that keeps the segment within bounds
+                lo = min(min_word, max_word)
+                end = lo + int(np.argmax(gaps[lo:max_word + 1]))
+            first.append(s)
+            last.append(end)
+            s = end + 1
+
+        # A trailing fragment shorter than the minimum joins the previous segment if it fits
+        if len(first) > 1:
+            tail_ms = self.ends[last[-1]] - self.starts[first[-1]]
+            merged_ms = self.ends[last[-1]] - self.starts[first[-2]]
+            if tail_ms < min_duration_ms and merged_ms <= max_duration_ms:
+                first.pop()
+                last[-1] = last.pop()
+
+        return np.array(first, dtype=np.int64), np.array(last, dtype=np.int64)
+
+    def segments_by_duration(self, min_duration_ms=1500, max_duration_ms=6000, pause_ms=400,
+                             endings=(".", "?", "!", ",")):
+        """Duration-aware segments in the sentences.json schema."""
+        return self._as_sentences(*self.duration_bounds(min_duration_ms, max_duration_ms, pause_ms, endings))
+
+    def sentences(self, endings=(".", "?", "!", ",")):
+        """Sentences in the sentences.json schema ({"start", "end", "sentence"})."""
+        return self._as_sentences(*self.sentence_bounds(endings))
+
+    def _as_sentences(self, first, last):
+        return [
+            {"start": int(self.starts[f]), "end": int(self.ends[l]), "sentence": self.text(f, l)}
+            for f, l in zip(first.tolist(), last.tolist())
+        ]
+
+    def save(self, path, source=None):
+        """
+        Writes the timeline as an uncompressed .npz (no pickled objects).
+        source (see transcript_stamp) records which transcript it came from.
+        """
+        encoded = [w.encode("utf-8") for w in self.vocab]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        arrays = dict(starts=self.starts, ends=self.ends, word_ids=self.word_ids,
+                      vocab_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8), vocab_offsets=offsets)
+        if source is not None:
+            arrays["source"] = np.asarray(source, dtype=np.int64)
+        # Written aside and moved into place, so a reader never sees half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, source=None):
+        """
+        Reads a timeline written by save. With source, returns None unless
+        the file was saved with that same source.
+        """
+        with np.load(path) as data:
+            if source is not None and ("source" not in data.files
+                                       or data["source"].tolist() != list(source)):
+                return None
+            blob = data["vocab_blob"].tobytes()
+            offsets = data["vocab_offsets"]
+            vocab = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            return cls(data["starts"], data["ends"], data["word_ids"], vocab)
+
+
+def transcript_stamp(transcript_path):
+    """(size, mtime in ns) of a transcript, which its sidecar must match to be reused."""
+    stat = os.stat(transcript_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def sidecar_path(transcript_path):
+    """Binary timeline file kept next to a transcript.json (transcript.timeline.npz)."""
+    return os.path.splitext(transcript_path)[0] + ".timeline.npz"
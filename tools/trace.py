@@ -0,0 +1,140 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# Tracing is off unless TOOLS_TRACE is set or enable() is called. When off,
+# span() hands back one shared no-op object, so instrumented code pays a
+# flag check per call and nothing else.
+_enabled = bool(os.getenv("TOOLS_TRACE"))
+_events = []
+_lock = threading.Lock()
+_origin = time.perf_counter_ns()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed region, recorded as a Chrome "complete" event when it closes."""
+
+    __slots__ = ("name", "category", "attrs", "_start")
+
+    def __init__(self, name, category, attrs):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        thread = threading.current_thread()
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": (self._start - _origin) / 1000,
+            "dur": (end - self._start) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": self.attrs,
+        }
+        with _lock:
+            _events.append((event, thread.name))
+        return False
+
+    def set(self, **attrs):
+        """Adds attributes known only once the work is done (bytes, frames, ...)."""
+        self.attrs.update(attrs)
+
+
+def span(name, category="tool", **attrs):
+    """
+    Context manager timing a block as a nested span:
+
+        with span("download.tenor", keyword=keyword) as s:
+            ...
+            s.set(bytes=len(data))
+
+    Spans nest by time on each thread, which is how trace viewers draw them.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, category, attrs)
+
+
+def traced(name=None, category="tool"):
+    """Decorator form of span(); the span is named after the function by default."""
+    def decorate(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(clear=True):
+    """Starts recording spans (dropping earlier ones unless clear=False)."""
+    global _enabled
+    if clear:
+        with _lock:
+            _events.clear()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def export_chrome_trace(path):
+    """
+    Writes the recorded spans as Chrome trace-event JSON, for chrome://tracing
+    or https://ui.perfetto.dev, and returns the path.
+    """
+    with _lock:
+        recorded = list(_events)
+    events, threads = [], {}
+    for event, thread_name in recorded:
+        events.append(event)
+        threads[(event["pid"], event["tid"])] = thread_name
+    # Thread names instead of bare ids in the viewer
+    for (pid, tid), thread_name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": thread_name}})
+
+    dir_name = os.path.dirname(path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+    os.replace(tmp_path, path)
+    return path
@@ -1,10 +1,144 @@
 import json
 import re
 
+
+class JSONStreamParser:
+    """
+    Resumable scanner that pulls complete JSON values out of text arriving in
+    chunks (e.g. a streamed LLM response wrapped in prose or markdown fences).
+
+    Every character is scanned once across feeds; a candidate value is only
+    handed to JSONDecoder.raw_decode once its closing bracket has been seen.
+    With split_arrays=True the elements of a top-level array are yielded one
+    by one as they close instead of waiting for the whole array.
+    """
+
+    def __init__(self, split_arrays=True):
+        self.split_arrays = split_arrays
+        self._decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0            # next character to scan
+        self.start = None       # start of the value being scanned
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.in_array = False   # inside a top-level array being split
+
+    # Characters the scanner has to stop at in each state; runs of anything
+    # else are skipped with a single regex search.
+    _STRING_STOP = re.compile(r'["\\\\]')
+    _SEEK_STOP = re.compile(r'[{\[]')
+    _ARRAY_STOP = re.compile(r'[^\s,]')
+    _VALUE_STOP = re.compile(r'["{}\[\],]')
+
+    def feed(self, chunk):
+        """Adds a chunk and returns the list of values completed by it."""
+        self.buffer += chunk
+        buf = self.buffer
+        n = len(buf)
+        results = []
+        i = self.pos
+
+        while i < n:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    i += 1
+                    continue
+                match = self._STRING_STOP.search(buf, i)
+                if not match:
+                    i = n
+                    break
+                i = match.start()
+                if buf[i] == "\\":
+                    self.escape = True
+                else:
+                    self.in_string = False
+                i += 1
+                continue
+
+            if self.start is None:
+                # Looking for the beginning of the next value
+                stop = self._ARRAY_STOP if self.in_array else self._SEEK_STOP
+                match = stop.search(buf, i)
+                if not match:
+                    i = n
+                    break
+                i = match.start()
+                char = buf[i]
+                if char == "[" and self.split_arrays and not self.in_array:
+                    self.in_array = True
+                elif char in "{[":
+                    # Fast path: a value that is already complete is decoded
+                    # in one C call; otherwise scan it as it arrives
+                    try:
+                        value, i = self._decoder.raw_decode(buf, i)
+                        results.append(value)
+                        continue
+                    except json.JSONDecodeError:
+                        self.start, self.depth = i, 1
+                elif char == "]":
+                    self.in_array = False
+                else:
+                    # Scalar array element, ends at the next , or ]
+                    self.start, self.depth = i, 0
+                    self.in_string = char == '"'
+                i += 1
+                continue
+
+            match = self._VALUE_STOP.search(buf, i)
+            if not match:
+                i = n
+                break
+            i = match.start()
+            char = buf[i]
+            if char == '"':
+                self.in_string = True
+            elif self.depth == 0 and char in ",]":
+                # End of a scalar array element
+                try:
+                    results.append(json.loads(buf[self.start:i]))
+                except json.JSONDecodeError:
+                    pass
+                self.start = None
+                if char == "]":
+                    self.in_array = False
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        value, _ = self._decoder.raw_decode(buf, self.start)
+                        results.append(value)
+                    except json.JSONDecodeError:
+                        # Not JSON after all (e.g. "{braces}" in prose): rescan after it
+                        i = self.start
+                    self.start = None
+            i += 1
+
+        # Drop everything that can no longer be part of a value
+        keep = self.start if self.start is not None else i
+        self.buffer = buf[keep:]
+        self.pos = i - keep
+        if self.start is not None:
+            self.start = 0
+        return results
+
+
+def iter_json_objects(chunks, split_arrays=True):
+    """Yields each complete JSON value from an iterable of text chunks as soon as it closes."""
+    parser = JSONStreamParser(split_arrays=split_arrays)
+    for chunk in chunks:
+        for value in parser.feed(chunk):
+            yield value
+
+
 def extract_json(text):
     """
     Extract valid JSON from messy text safely.
-    Tries direct load, then simple regex, then manual brace counting.
+    Tries a direct load, then decoding from the first brace, then a single
+    scan for the first complete object.
     """
     # Try direct parse first
     try:
@@ -12,28 +146,153 @@ def extract_json(text):
     except json.JSONDecodeError:
         pass
 
-    # Try simple regex to find the first {...} block
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
+    # Common case: prose or markdown fences around one object
+    start = text.find("{")
+    if start != -1:
         try:
-            return json.loads(match.group(0))
+            value, _ = json.JSONDecoder().raw_decode(text, start)
+            return value
         except json.JSONDecodeError:
             pass
 
-    # Manual brace counting fallback
-    start = text.find("{")
-    if start != -1:
-        brace_count = 0
-        for i, char in enumerate(text[start:], start=start):
-            if char == "{":
-                brace_count += 1
-            elif char == "}":
-                brace_count -= 1
-                if brace_count == 0:
-                    try:
-                        return json.loads(text[start:i+1])
-                    except json.JSONDecodeError:
-                        break
+    offset = 0
+    while True:
+        parser = JSONStreamParser(split_arrays=False)
+        for value in parser.feed(text[offset:]):
+            if isinstance(value, dict):
+                return value
+        if parser.start is None:
+            break
+        # An unclosed "{" swallowed the rest of the text; retry just after it
+        offset = len(text) - len(parser.buffer) + 1
 
     # If everything fails, return raw text
-    return {"script": text.strip()}
\ No newline at end of file
+    return {"script": text.strip()}
+
+
+class StreamingFieldReader:
+    """
+    Incrementally decodes one string field (e.g. "script") out of a JSON
+    object that arrives in chunks, returning newly decoded text on each feed.
+    """
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b',
+                'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field="script"):
+        self.key_pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ""
+        self.pos = 0
+        self.in_value = False
+        self.done = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if not self.in_value:
+            match = self.key_pattern.search(self.buffer)
+            if not match:
+                return ""
+            self.in_value = True
+            self.pos = match.end()
+
+        out = []
+        buf = self.buffer
+        while self.pos < len(buf):
+            char = buf[self.pos]
+            if char == '"':
+                self.done = True
+                self.pos += 1
+                break
+            if char != '\\':
+                out.append(char)
+                self.pos += 1
+                continue
+            # Escape sequence: wait for the rest of it if it was cut mid-chunk
+            if self.pos + 1 >= len(buf):
+                break
+            code = buf[self.pos + 1]
+            if code == 'u':
+                if self.pos + 6 > len(buf):
+                    break
+                length = 6
+                if 0xD800 <= int(buf[self.pos + 2:self.pos + 6], 16) < 0xDC00:
+                    # High surrogate: decode together with its low half
+                    if self.pos + 12 > len(buf):
+                        break
+                    length = 12
+                out.append(json.loads('"%s"' % buf[self.pos:self.pos + length]))
+                self.pos += length
+            else:
+                out.append(self._ESCAPES.get(code, code))
+                self.pos += 2
+        return "".join(out)
+
+
+class SentenceSplitter:
+    """
+    Accumulates streamed text and emits sentences as soon as they complete.
+    A sentence is complete once a terminator (. ! ?) is followed by whitespace,
+    matching the split used by text_to_sentences_json.
+    """
+    _boundary = re.compile(r'(?<=[.!?])\s+')
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, text):
+        self.pending += text
+        parts = self._boundary.split(self.pending)
+        # The last part may still be growing
+        self.pending = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self):
+        rest, self.pending = self.pending.strip(), ""
+        return [rest] if rest else []
+
+
+def chunk_text(text, max_chars=800):
+    """
+    Splits text at sentence boundaries into chunks of at most max_chars.
+    Consecutive short sentences are grouped; a sentence longer than the
+    budget is split at commas, and only a clause that is still too long is
+    split at spaces.
+
+    Returns:
+        list: Chunk strings in narration order.
+    """
+    pieces = []
+    for match in re.finditer(r'\S.*?(?:[.!?](?=\s)|$)', text.strip(), re.DOTALL):
+        sentence = match.group(0).strip()
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        # Run-on sentence: clauses are grouped below like sentences
+        for clause in re.split(r'(?<=,)\s+', sentence):
+            if len(clause) <= max_chars:
+                pieces.append(clause)
+                continue
+            # Clause still too long: fall back to words
+            current = ""
+            for word in clause.split():
+                if current and len(current) + 1 + len(word) > max_chars:
+                    pieces.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}" if current else word
+            if current:
+                pieces.append(current)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
@@ -1,2 +1,11 @@
-from .text_video import create_text_video
-from .video_editor import render_video
\ No newline at end of file
+from tools._lazy import lazy_exports
+
+# Submodules are imported on first use of one of their names
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "create_text_video": ".text_video",
+    "render_video": ".video_editor",
+    "render_timeline": ".video_editor",
+    "render_segmented": ".video_editor",
+    "run_preflight": ".preflight",
+    "CaptionTrack": ".captions",
+})
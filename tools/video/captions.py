@@ -0,0 +1,317 @@
+import threading
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+from tools.cache import make_cache_key
+from tools.log import get_logger
+from tools.metrics import MEMORY_CACHE_LOOKUPS
+from tools.text.timeline import WordTimeline
+from tools.trace import span
+from tools.video.text_video import get_font
+
+log = get_logger(__name__)
+
+# Look of the caption layer. Renders take overrides as caption_style={...}
+DEFAULT_CAPTION_STYLE = {
+    "font_path": "fonts/Roboto-Bold.ttf",
+    "font_size": 64,
+    "color": (255, 255, 255),      # words of the caption not being spoken
+    "highlight": (255, 214, 10),   # the word being spoken
+    "outline": 4,                  # outline width in pixels (0 for none)
+    "outline_color": (0, 0, 0),
+    "max_width": 1600,             # lines wrap at this width
+    "lines": 2,                    # most lines shown at once
+    "line_spacing": 1.1,
+    "bottom_margin": 60,           # gap between the captions and the bottom of the frame
+    "pause_ms": 700,               # a pause this long starts a new caption
+    "hold_ms": 400,                # how long a caption stays up after its last word before a pause
+}
+
+
+def caption_style(style=None):
+    """DEFAULT_CAPTION_STYLE with the given overrides applied."""
+    unknown = set(style or {}) - set(DEFAULT_CAPTION_STYLE)
+    if unknown:
+        raise ValueError(f"Unknown caption style settings: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_CAPTION_STYLE, **(style or {})}
+
+
+def rasterize_word(font, word, outline=0):
+    """
+    One word as a (height, width, 2) uint8 sprite: the coverage of the
+    glyphs and of the glyphs plus their outline. Colors are applied when
+    the sprite is placed, so one raster serves every color of the word.
+    """
+    import pygame
+
+    surface = font.render(word, True, (255, 255, 255))
+    width, height = surface.get_size()
+    glyphs = np.frombuffer(pygame.image.tostring(surface, "RGBA"), np.uint8).reshape(height, width, 4)[:, :, 3]
+    sprite = np.zeros((height + 2 * outline, width + 2 * outline, 2), np.uint8)
+    sprite[outline:outline + height, outline:outline + width, 0] = glyphs
+    shape = sprite[:, :, 1]
+    # The outline is the glyph coverage stamped at every offset within its radius
+    for dy in range(-outline, outline + 1):
+        for dx in range(-outline, outline + 1):
+            if dx * dx + dy * dy <= outline * outline:
+                region = shape[outline + dy:outline + dy + height, outline + dx:outline + dx + width]
+                np.maximum(region, glyphs, out=region)
+    return sprite
+
+
+class SpriteAtlas:
+    """
+    Words of one font, size and outline, each rasterized once and packed
+    side by side into rows of one array. Every sprite of a font has the same
+    height, so rows have a fixed height and a sprite is an (x, y, width)
+    entry. Shared by every render in the process (see get_atlas).
+    """
+
+    def __init__(self, font_path, font_size, outline, row_width=4096):
+        self.font = get_font(font_path, font_size)
+        self.outline = outline
+        self.height = self.font.get_height() + 2 * outline
+        self.row_width = row_width
+        self.pixels = np.zeros((self.height, row_width, 2), np.uint8)
+        self.rects = {}
+        self._x = self._y = 0
+        self._lock = threading.Lock()
+
+    def width(self, word):
+        """Sprite width of word, measured without rasterizing it."""
+        return min(self.font.size(word)[0] + 2 * self.outline, self.row_width)
+
+    def add(self, word):
+        """(x, y, width) of the sprite of word, rasterized on first use."""
+        rect = self.rects.get(word)
+        if rect is not None:
+            return rect
+        with self._lock:
+            rect = self.rects.get(word)
+            if rect is not None:
+                return rect
+            sprite = rasterize_word(self.font, word, self.outline)[:, :self.row_width]
+            width = sprite.shape[1]
+            if self._x + width > self.row_width:
+                self._x, self._y = 0, self._y + self.height
+            if self._y + self.height > self.pixels.shape[0]:
+                # Double the rows, so a long transcript reallocates a few times, not once per row
+                self.pixels = np.concatenate([self.pixels, np.zeros_like(self.pixels)])
+            self.pixels[self._y:self._y + self.height, self._x:self._x + width] = sprite
+            rect = self.rects[word] = (self._x, self._y, width)
+            self._x += width
+            return rect
+
+    def sprite(self, rect):
+        x, y, width = rect
+        return self.pixels[y:y + self.height, x:x + width]
+
+
+_atlas_cache = {}
+
+
+def get_atlas(style):
+    """Atlas for the font, size and outline of style, kept per process like the fonts."""
+    key = (style["font_path"], style["font_size"], style["outline"])
+    atlas = _atlas_cache.get(key)
+    MEMORY_CACHE_LOOKUPS.inc(cache="caption_atlas", result="miss" if atlas is None else "hit")
+    if atlas is None:
+        if len(_atlas_cache) >= 4:
+            _atlas_cache.pop(next(iter(_atlas_cache)))
+        atlas = _atlas_cache[key] = SpriteAtlas(*key)
+    return atlas
+
+
+def as_timeline(transcript):
+    """WordTimeline from a WordTimeline, a transcript dict ({"text", "words"}) or a word list."""
+    if isinstance(transcript, WordTimeline):
+        return transcript
+    if isinstance(transcript, dict):
+        transcript = transcript.get("words", [])
+    return WordTimeline.from_words(transcript)
+
+
+def layout_captions(timeline, widths, gap, max_width, lines, pause_ms, hold_ms):
+    """
+    Breaks the words into captions: a line takes words while they fit in
+    max_width, a caption takes up to `lines` lines, and a pause of pause_ms
+    or more between two words starts a new caption. A caption disappears
+    hold_ms after its last word when a pause follows, otherwise when the
+    next one appears.
+
+    Returns:
+        dict: per word "x", "line_width", "row", "rows" (lines of its caption)
+        and "caption"; per caption "first" word and "end" (ms).
+    """
+    n = len(timeline)
+    x, row, caption = (np.zeros(n, np.int32) for _ in range(3))
+    line_of = np.zeros(n, np.int32)
+    line_widths, caption_rows, firsts = [], [], []
+    starts, ends = timeline.starts, timeline.ends
+    for i in range(n):
+        width = int(widths[i])
+        pause = i > 0 and starts[i] - ends[i - 1] >= pause_ms
+        fits = i > 0 and line_widths[-1] + gap + width <= max_width
+        new_caption = i == 0 or pause or (not fits and caption_rows[-1] >= lines)
+        if new_caption:
+            caption_rows.append(0)
+            firsts.append(i)
+        if new_caption or not fits:
+            line_widths.append(-gap)  # so the first word of the line lands at 0
+            caption_rows[-1] += 1
+        x[i] = line_widths[-1] + gap
+        line_widths[-1] += gap + width
+        line_of[i] = len(line_widths) - 1
+        row[i] = caption_rows[-1] - 1
+        caption[i] = len(firsts) - 1
+
+    firsts = np.asarray(firsts, np.int64)
+    lasts = np.append(firsts[1:] - 1, n - 1).astype(np.int64) if n else firsts
+    end = ends[lasts].astype(np.int64) + hold_ms
+    if len(firsts) > 1:
+        next_start = starts[firsts[1:]].astype(np.int64)
+        # Back-to-back captions hand over directly instead of blinking out in between
+        follows = next_start - ends[lasts[:-1]] < pause_ms
+        end[:-1] = np.where(follows, next_start, np.minimum(end[:-1], next_start))
+    return {
+        "x": x,
+        "line_width": np.asarray(line_widths, np.int32)[line_of],
+        "row": row,
+        "rows": np.asarray(caption_rows, np.int32)[caption],
+        "caption": caption,
+        "first": firsts,
+        "end": end,
+    }
+
+
+class CaptionTrack:
+    """
+    Karaoke captions for a transcript: the current caption's words at the
+    bottom of the frame, with the word being spoken highlighted.
+
+    Nothing is rasterized per frame. Each unique word is rasterized once into
+    the SpriteAtlas of the style, the line layout of the whole transcript is
+    computed up front, and each frame of a clip is mapped to the word it
+    highlights ahead of encoding. A frame is then a lookup, and a new frame
+    is composed only when the highlighted word changes: the caption with all
+    words in the base color (composed once per caption) plus one sprite in
+    the highlight color. The cost per frame stays flat however long the
+    transcript is.
+
+    Build one per render; segmented renders share it across segments.
+    """
+
+    def __init__(self, transcript, style=None, size=(1920, 1080)):
+        self.style = caption_style(style)
+        self.timeline = as_timeline(transcript)
+        self.atlas = get_atlas(self.style)
+        outline = self.style["outline"]
+        widths = np.asarray([self.atlas.width(word) for word in self.timeline.vocab], np.int32)
+        word_widths = widths[self.timeline.word_ids] if len(widths) else np.zeros(0, np.int32)
+        # Sprites carry their outline as padding, which counts towards the space between words
+        gap = max(self.atlas.font.size(" ")[0] - 2 * outline, 0)
+        self.layout = layout_captions(self.timeline, word_widths, gap, self.style["max_width"],
+                                      self.style["lines"], self.style["pause_ms"], self.style["hold_ms"])
+
+        line_step = round(self.atlas.font.get_height() * self.style["line_spacing"])
+        band_w = int(self.layout["line_width"].max()) if len(self.timeline) else 2
+        band_h = (self.style["lines"] - 1) * line_step + self.atlas.height
+        self.size = (band_w + band_w % 2, band_h + band_h % 2)  # even for video encoders
+        # Lines are centered, and a caption with fewer lines sits on the bottom ones
+        self.x = self.layout["x"] + (self.size[0] - self.layout["line_width"]) // 2
+        self.y = (self.style["lines"] - self.layout["rows"] + self.layout["row"]) * line_step
+        self.position = ((size[0] - self.size[0]) // 2, size[1] - self.style["bottom_margin"] - self.size[1])
+
+        self._color = np.asarray(self.style["color"], np.float32)
+        self._highlight = np.asarray(self.style["highlight"], np.float32)
+        self._outline_color = np.asarray(self.style["outline_color"], np.float32)
+        self._captions = {}  # caption index -> composed caption in the base color
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def _caption_words(self, t0, t1):
+        """Indices of the words of every caption shown in [t0, t1) seconds."""
+        words = self.timeline.in_range(t0 * 1000, t1 * 1000)
+        if words.start >= words.stop:
+            return range(0)
+        captions = self.layout["caption"][words.start], self.layout["caption"][words.stop - 1]
+        first = int(self.layout["first"][captions[0]])
+        last = int(self.layout["first"][captions[1] + 1]) if captions[1] + 1 < len(self.layout["first"]) \
+            else len(self.timeline)
+        return range(first, last)
+
+    def fingerprint(self, t0, t1):
+        """What the captions of [t0, t1) seconds look like: the style and the words of their captions."""
+        words = self._caption_words(t0, t1)
+        timeline = self.timeline
+        return make_cache_key("captions", self.style, self.size,
+                              [[int(timeline.starts[i]), int(timeline.ends[i]), timeline.word(i)] for i in words])
+
+    def frame_words(self, frames, fps, offset_sec=0):
+        """Word highlighted in each frame of a clip starting at offset_sec, or -1 while no caption is up."""
+        t = (np.arange(frames) / fps + offset_sec) * 1000
+        word = np.searchsorted(self.timeline.starts, t, side="right") - 1
+        shown = word >= 0
+        shown[shown] = t[shown] < self.layout["end"][self.layout["caption"][word[shown]]]
+        return np.where(shown, word, -1)
+
+    def _paint(self, frame, i, color):
+        sprite = self.atlas.sprite(self.atlas.add(self.timeline.word(i)))
+        height, width = sprite.shape[:2]
+        region = frame[self.y[i]:self.y[i] + height, self.x[i]:self.x[i] + width]
+        fill = sprite[:, :, :1] * np.float32(1 / 255)
+        region[:, :, :3] = self._outline_color + (color - self._outline_color) * fill + 0.5
+        region[:, :, 3] = sprite[:, :, 1]
+
+    def _caption(self, c):
+        frame = self._captions.get(c)
+        if frame is None:
+            first = int(self.layout["first"][c])
+            last = int(self.layout["first"][c + 1]) if c + 1 < len(self.layout["first"]) else len(self.timeline)
+            frame = np.zeros((self.size[1], self.size[0], 4), np.uint8)
+            for i in range(first, last):
+                self._paint(frame, i, self._color)
+            if len(self._captions) >= 8:
+                self._captions.pop(next(iter(self._captions)))
+            self._captions[c] = frame
+        return frame
+
+    def compose(self, i):
+        """RGBA caption band with word i highlighted."""
+        frame = self._caption(int(self.layout["caption"][i])).copy()
+        self._paint(frame, i, self._highlight)
+        return frame
+
+    def clip(self, duration, fps=30, offset_sec=0):
+        """
+        Caption layer for duration seconds of the timeline from offset_sec
+        (the start of the segment being rendered), positioned on the frame
+        and with a mask. None when no caption is up in that time.
+        """
+        frames = int(np.ceil(duration * fps)) + 1
+        with span("render.captions", category="render", frames=frames) as s:
+            highlighted = self.frame_words(frames, fps, offset_sec)
+            used = np.unique(highlighted[highlighted >= 0])
+            if not len(used):
+                return None
+            for i in self._caption_words(offset_sec, offset_sec + duration):
+                self.atlas.add(self.timeline.word(i))
+            s.set(words=len(used), sprites=len(self.atlas.rects))
+
+        blank = np.zeros((self.size[1], self.size[0], 4), np.uint8)
+        current = {"word": -1, "rgb": blank[:, :, :3], "mask": blank[:, :, 3].astype(np.float32)}
+
+        def frame_at(t):
+            # The highlighted word only changes a few times a second, so most frames reuse the last one
+            word = int(highlighted[min(max(int(t * fps + 0.5), 0), frames - 1)])
+            if word != current["word"]:
+                rgba = self.compose(word) if word >= 0 else blank
+                current.update(word=word, rgb=rgba[:, :, :3], mask=rgba[:, :, 3] * np.float32(1 / 255))
+            return current
+
+        mask = VideoClip(lambda t: frame_at(t)["mask"], ismask=True, duration=duration)
+        return (VideoClip(lambda t: frame_at(t)["rgb"], duration=duration)
+                .set_mask(mask)
+                .set_position(self.position))
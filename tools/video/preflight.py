@@ -0,0 +1,174 @@
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.log import get_logger
+from tools.trace import span
+
+log = get_logger(__name__)
+
+# What to do with an asset whose media is missing or unreadable:
+#   placeholder - show a flat card in its slot
+#   skip        - leave its slot empty (the background shows)
+#   fail        - raise before anything is rendered
+POLICIES = ("placeholder", "skip", "fail")
+
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_SIZE = re.compile(r"Stream #.*?: Video: .*?(\d{2,5})x(\d{2,5})")
+
+
+def _media_path(item, media_dir):
+    from tools.video.video_editor import media_path
+    return media_path(item, media_dir)
+
+
+def parse_probe(output):
+    """Width, height (None without a video stream) and duration (None for stills) from ffmpeg's stderr."""
+    duration = None
+    match = _DURATION.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _VIDEO_SIZE.search(output)
+    width, height = (int(match.group(1)), int(match.group(2))) if match else (None, None)
+    return width, height, duration
+
+
+def probe_media(path, audio=False):
+    """
+    Checks that a media file exists and that its first frame (or first
+    second of audio) decodes, without decoding the rest. Reads dimensions
+    and duration from the container header.
+
+    Returns:
+        dict: {"path", "ok", "error", "width", "height", "duration"}
+    """
+    result = {"path": path, "ok": False, "error": None, "width": None, "height": None, "duration": None}
+    if not os.path.isfile(path):
+        result["error"] = "missing"
+        return result
+    if os.path.getsize(path) == 0:
+        result["error"] = "empty file"
+        return result
+
+    import imageio_ffmpeg  # here, so the runner can read POLICIES without loading it
+
+    decode = ["-map", "0:a:0", "-t", "1"] if audio else ["-map", "0:v:0", "-frames:v", "1"]
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", path,
+           *decode, "-f", "null", "-"]
+    completed = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    output = completed.stderr.decode("utf-8", errors="replace")
+    result["width"], result["height"], result["duration"] = parse_probe(output)
+    if completed.returncode != 0:
+        # ffmpeg puts the reason on its last line
+        lines = [line for line in output.strip().splitlines() if line.strip()]
+        result["error"] = f"undecodable ({lines[-1].strip() if lines else 'ffmpeg failed'})"
+    elif not audio and not (result["width"] and result["height"]):
+        result["error"] = "no video frames"
+    else:
+        result["ok"] = True
+    return result
+
+
+def is_placeable(item):
+    """Whether an item has a usable slot on the timeline: numeric start/end with 0 <= start < end."""
+    start, end = item.get("start"), item.get("end")
+    return isinstance(start, (int, float)) and isinstance(end, (int, float)) and 0 <= start < end
+
+
+def check_timing(mapped, audio_seconds=None):
+    """
+    Consistency problems in the timed asset list, as (index, problem, fatal).
+    Fatal problems mean the asset cannot be placed at all.
+    """
+    problems = []
+    seen = set()
+    previous_start = None
+    for i, item in enumerate(mapped):
+        start, end = item.get("start"), item.get("end")
+        if not isinstance(start, (int, float)) or not isinstance(end, (int, float)):
+            problems.append((i, "missing start/end", True))
+            continue
+        if start < 0:
+            problems.append((i, f"negative start ({start} ms)", True))
+        elif end <= start:
+            problems.append((i, f"empty slot ({start}-{end} ms)", True))
+        if item.get("order_id") in seen:
+            problems.append((i, f"duplicate order_id {item.get('order_id')}", False))
+        seen.add(item.get("order_id"))
+        if previous_start is not None and start < previous_start:
+            problems.append((i, "starts before the previous asset", False))
+        previous_start = start
+        if audio_seconds is not None and start >= audio_seconds * 1000:
+            problems.append((i, f"starts after the narration ends ({audio_seconds:.2f}s)", False))
+    return problems
+
+
+def run_preflight(mapped, audio_path=None, background_image_path=None, fps=30, media_dir="output",
+                  policy="placeholder", max_workers=8):
+    """
+    Checks everything a render will read before it starts, so a broken asset
+    is dealt with up front instead of crashing the render partway through.
+    Every media file is probed in parallel (see probe_media), text clips
+    shorter than their slot are cut to what they hold, and the timings are
+    checked for consistency.
+
+    The narration and background cannot be substituted, so problems with
+    them always raise. Broken assets are handled by policy (see POLICIES).
+
+    Returns:
+        tuple: (a copy of mapped where repaired items carry "repair" or
+        "clip_seconds" for build_overlay_clip, list of issue dicts)
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown preflight policy '{policy}' (expected one of: {', '.join(POLICIES)})")
+
+    mapped = [dict(item) for item in mapped]
+    paths = [_media_path(item, media_dir) for item in mapped]
+    with span("render.preflight", category="render", assets=len(mapped)), \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        audio = executor.submit(probe_media, audio_path, True) if audio_path else None
+        background = executor.submit(probe_media, background_image_path) if background_image_path else None
+        probes = list(executor.map(probe_media, paths))
+
+    fatal = []
+    for name, probe in (("narration", audio), ("background", background)):
+        if probe is not None and not probe.result()["ok"]:
+            fatal.append(f"{name} {probe.result()['path']}: {probe.result()['error']}")
+    if fatal:
+        raise RuntimeError(f"Preflight failed: {'; '.join(fatal)}")
+    audio_seconds = audio.result()["duration"] if audio else None
+
+    issues = []
+
+    def add(i, problem, action):
+        item = mapped[i]
+        issues.append({"order_id": item.get("order_id"), "type": item.get("type"), "path": paths[i],
+                       "problem": problem, "action": action})
+
+    for i, problem, unplaceable in check_timing(mapped, audio_seconds):
+        if unplaceable:
+            mapped[i]["repair"] = "skip"
+        add(i, problem, "skip" if unplaceable else "none")
+
+    for i, (item, probe) in enumerate(zip(mapped, probes)):
+        if item.get("repair"):
+            continue
+        if not probe["ok"]:
+            mapped[i]["repair"] = policy
+            add(i, probe["error"], policy)
+            continue
+        slot = (item["end"] - item["start"]) / 1000
+        # GIFs loop to fill their slot; text clips play once and must cover it
+        if item["type"] == "text" and probe["duration"] is not None and probe["duration"] < slot - 1 / fps:
+            mapped[i]["clip_seconds"] = probe["duration"]
+            add(i, f"clip is {probe['duration']:.2f}s for a {slot:.2f}s slot", "cut")
+
+    for issue in issues:
+        log.warning(f"Preflight: asset {issue['order_id']} ({issue['type']}): {issue['problem']} -> {issue['action']}",
+                    extra={"asset_id": issue["order_id"], "action": issue["action"]})
+    if policy == "fail" and any(issue["action"] == "fail" for issue in issues):
+        broken = [f"{issue['order_id']} ({issue['problem']})" for issue in issues if issue["action"] == "fail"]
+        raise RuntimeError(f"Preflight failed for assets: {', '.join(broken)}")
+    return mapped, issues
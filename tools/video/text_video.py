@@ -2,16 +2,30 @@ import os
 import pygame
 import shutil
 import random
+import time
 from moviepy.editor import ImageSequenceClip
 from typing import Tuple, Optional, List
 
+from tools.log import get_logger
+from tools.metrics import MEMORY_CACHE_LOOKUPS, record_encode
+from tools.trace import span
+
 # For a better experience, create a file named `requirements.txt` with:
 # pygame==2.5.2
 # moviepy==1.0.3
 
-# Initialize Pygame globally, ONCE.
-os.environ['SDL_VIDEODRIVER'] = 'dummy' 
-pygame.init()
+log = get_logger(__name__)
+
+_pygame_ready = False
+
+
+def _init_pygame():
+    """Initializes Pygame once, on first use rather than at import."""
+    global _pygame_ready
+    if not _pygame_ready:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.init()
+        _pygame_ready = True
 
 # ... (The VIBRANT_COLORS list and TextRenderer class remain unchanged) ...
 VIBRANT_COLORS = [
@@ -20,6 +34,22 @@ VIBRANT_COLORS = [
 ]
 Color = Tuple[int, int, int]
 
+# Loaded fonts by (font path, size), shared by every TextRenderer in the
+# process, so a long-lived worker opens each font file only once
+_FONT_CACHE = {}
+
+
+def get_font(font_path: Optional[str], size: int) -> pygame.font.Font:
+    """Font at size from font_path (None for pygame's default), opened once per process."""
+    key = (font_path, size)
+    if key not in _FONT_CACHE:
+        MEMORY_CACHE_LOOKUPS.inc(cache="font", result="miss")
+        _init_pygame()
+        _FONT_CACHE[key] = pygame.font.Font(font_path, size)
+    else:
+        MEMORY_CACHE_LOOKUPS.inc(cache="font", result="hit")
+    return _FONT_CACHE[key]
+
 
 class TextRenderer:
     """
@@ -37,15 +67,13 @@ class TextRenderer:
         self.font_color = font_color
         self.font_path = font_path
         self.max_text_width = resolution[0] * (1 - 2 * margin_percent)
-        self._font_cache = {}
+        _init_pygame()
 
         if self.font_path and not os.path.exists(self.font_path):
             raise FileNotFoundError(f"Font file not found at: {self.font_path}")
 
     def _get_font(self, size: int) -> pygame.font.Font:
-        if size not in self._font_cache:
-            self._font_cache[size] = pygame.font.Font(self.font_path, size)
-        return self._font_cache[size]
+        return get_font(self.font_path, size)
 
     def _wrap_text(self, text: str, font: pygame.font.Font) -> List[str]:
         lines = []
@@ -65,28 +93,18 @@ class TextRenderer:
         lines.append(current_line)
         return lines
 
-    def render_frame(self,
-                     text: str,
-                     font_size: int,
-                     text_align: str = 'center',
-                     v_align: str = 'middle',
-                     alpha: int = 255) -> pygame.Surface:
-        surface = pygame.Surface(self.resolution)
-        surface.fill(self.bg_color)
-        
+    def layout(self,
+               text: str,
+               font_size: int,
+               text_align: str = 'center',
+               v_align: str = 'middle') -> List[Tuple[str, int, int, int, int]]:
+        """Wrapped lines with their (x, y, width, height) in the frame, measured without drawing."""
         if not text.strip() or font_size <= 0:
-            return surface
+            return []
 
         font = self._get_font(font_size)
-        lines = self._wrap_text(text, font)
-        
-        line_surfaces = []
-        total_height = 0
-        for line in lines:
-            line_surf = font.render(line, True, self.font_color)
-            line_surf.set_alpha(alpha)
-            line_surfaces.append(line_surf)
-            total_height += line_surf.get_height()
+        sizes = [(line, *font.size(line)) for line in self._wrap_text(text, font)]
+        total_height = sum(height for _, _, height in sizes)
 
         if v_align == 'top':
             y_offset = int(self.resolution[1] * 0.1)
@@ -95,19 +113,79 @@ class TextRenderer:
         else: # 'middle'
             y_offset = (self.resolution[1] - total_height) // 2
 
-        for line_surf in line_surfaces:
+        placed = []
+        for line, width, height in sizes:
             if text_align == 'left':
                 x_offset = int(self.resolution[0] * 0.1)
             elif text_align == 'right':
-                x_offset = self.resolution[0] - line_surf.get_width() - int(self.resolution[0] * 0.1)
+                x_offset = self.resolution[0] - width - int(self.resolution[0] * 0.1)
             else: # 'center'
-                x_offset = (self.resolution[0] - line_surf.get_width()) // 2
-            
-            surface.blit(line_surf, (x_offset, y_offset))
-            y_offset += line_surf.get_height()
+                x_offset = (self.resolution[0] - width) // 2
+            placed.append((line, x_offset, y_offset, width, height))
+            y_offset += height
+        return placed
+
+    def render_frame(self,
+                     text: str,
+                     font_size: int,
+                     text_align: str = 'center',
+                     v_align: str = 'middle',
+                     alpha: int = 255,
+                     box: Optional[Tuple[int, int, int, int]] = None) -> pygame.Surface:
+        """
+        The full frame on bg_color, or with box=(x, y, width, height) only
+        that part of it, transparent except for the text.
+        """
+        if box is None:
+            surface = pygame.Surface(self.resolution)
+            surface.fill(self.bg_color)
+            origin_x, origin_y = 0, 0
+        else:
+            origin_x, origin_y, width, height = box
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            # Transparent pixels in the text color keep antialiased edges from darkening
+            surface.fill((*self.font_color, 0))
+
+        font = self._get_font(font_size) if font_size > 0 else None
+        for line, x_offset, y_offset, _, _ in self.layout(text, font_size, text_align, v_align):
+            line_surf = font.render(line, True, self.font_color)
+            line_surf.set_alpha(alpha)
+            surface.blit(line_surf, (x_offset - origin_x, y_offset - origin_y))
 
         return surface
 
+    def text_box(self, frames, text_align: str = 'center', v_align: str = 'middle') -> Tuple[int, int, int, int]:
+        """
+        Smallest box, centered on the frame, that holds the text of every
+        (text, font size) in frames. Centered so the clip can be placed with
+        position "center"; even sized for video encoders.
+        """
+        center_x, center_y = self.resolution[0] // 2, self.resolution[1] // 2
+        half_w, half_h = 1, 1
+        for text, font_size in set(frames):
+            for _, x, y, width, height in self.layout(text, font_size, text_align, v_align):
+                half_w = max(half_w, center_x - x, x + width - center_x)
+                half_h = max(half_h, center_y - y, y + height - center_y)
+        half_w, half_h = min(half_w, center_x), min(half_h, center_y)
+        return center_x - half_w, center_y - half_h, 2 * half_w, 2 * half_h
+
+def _write_rgba_frames(renderer, states, box, output_path, fps, text_align, v_align):
+    """Pipes the frames of box as RGBA to ffmpeg, which stores them as QuickTime Animation with alpha."""
+    import imageio_ffmpeg
+
+    writer = imageio_ffmpeg.write_frames(output_path, (box[2], box[3]), pix_fmt_in="rgba", pix_fmt_out="argb",
+                                         fps=fps, codec="qtrle", quality=None, macro_block_size=1,
+                                         ffmpeg_log_level="error")
+    writer.send(None)
+    try:
+        for text_to_render, current_font_size, alpha in states:
+            surface = renderer.render_frame(text=text_to_render, font_size=current_font_size,
+                                            text_align=text_align, v_align=v_align, alpha=alpha, box=box)
+            writer.send(pygame.image.tostring(surface, "RGBA"))
+    finally:
+        writer.close()
+
+
 def _calculate_dynamic_font_size(text: str) -> int:
     """Calculate a dynamic base font size based on text length."""
     length = len(text)
@@ -134,9 +212,16 @@ def create_text_video(
     hold_duration: float = 3.0,
     fade_out_duration: float = 1.0,
     fps: int = 24,
-    temp_folder: str = "temp_frames"
+    temp_folder: str = "temp_frames",
+    transparent: bool = False
     ) -> str:
-    # ... (function signature and docstring remain the same) ...
+    """
+    Renders text with an effect to a video. By default every frame is the
+    full resolution on bg_color, encoded as H.264. With transparent=True
+    only the box the text occupies is rendered, with an alpha channel, and
+    encoded losslessly to QuickTime Animation (use a .mov output_path);
+    the clip is centered on the frame, so it overlays with position "center".
+    """
     if video_format == "short":
         resolution = (1080, 1920)
     elif video_format == "long":
@@ -148,9 +233,10 @@ def create_text_video(
     output_dir = os.path.dirname(output_path)
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
-    if os.path.exists(temp_folder):
-        shutil.rmtree(temp_folder)
-    os.makedirs(temp_folder, exist_ok=True)
+    if not transparent:  # transparent frames are piped straight to ffmpeg
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+        os.makedirs(temp_folder, exist_ok=True)
     
     # Use a try...finally block to ensure cleanup
     try:
@@ -171,11 +257,9 @@ def create_text_video(
         hold_frames = int(hold_duration * fps)
         
         words = text.split(' ')
-        frame_paths = []
-        
-        print(f"Generating {total_frames} frames for '{text[:30]}...'")
 
-        for i in range(total_frames):
+        def frame_state(i):
+            """(text, font size, alpha) of frame i."""
             current_time = i / fps
             text_to_render = text
             current_font_size = base_font_size
@@ -189,31 +273,51 @@ def create_text_video(
                     text_to_render = " ".join(words[:int(len(words) * progress)])
                 elif effect_type == 'zoom':
                     current_font_size = int(base_font_size * (0.1 + progress * 0.9))
-            
+        
             elif i >= effect_frames + hold_frames:
                 fade_progress = (current_time - effect_duration - hold_duration) / fade_out_duration
                 alpha = int(255 * (1 - fade_progress))
+            return text_to_render, current_font_size, alpha
 
-            surface = renderer.render_frame(text=text_to_render, font_size=current_font_size,
-                                            text_align=text_align, v_align=v_align, alpha=alpha)
+        states = [frame_state(i) for i in range(total_frames)]
+        
+        log.info(f"Generating {total_frames} frames for '{text[:30]}...'", extra={"frames": total_frames})
+
+        if transparent:
+            box = renderer.text_box([(t, size) for t, size, _ in states], text_align, v_align)
+            started = time.perf_counter()
+            with span("text_video.frames", frames=total_frames, box=f"{box[2]}x{box[3]}"):
+                _write_rgba_frames(renderer, states, box, output_path, fps, text_align, v_align)
+            record_encode("text", total_frames, fps, time.perf_counter() - started)
+            log.info(f"Successfully created video: {output_path}", extra={"box": f"{box[2]}x{box[3]}"})
+            return output_path
+
+        frame_paths = []
+        with span("text_video.frames", frames=total_frames):
+            for i, (text_to_render, current_font_size, alpha) in enumerate(states):
+                surface = renderer.render_frame(text=text_to_render, font_size=current_font_size,
+                                                text_align=text_align, v_align=v_align, alpha=alpha)
             
-            frame_path = os.path.join(temp_folder, f"frame_{i:05d}.png")
-            pygame.image.save(surface, frame_path)
-            frame_paths.append(frame_path)
+                frame_path = os.path.join(temp_folder, f"frame_{i:05d}.png")
+                pygame.image.save(surface, frame_path)
+                frame_paths.append(frame_path)
 
-        print("All frames generated. Assembling video with MoviePy...")
-        clip = ImageSequenceClip(frame_paths, fps=fps)
-        clip.write_videofile(output_path, codec="libx264", audio=False, logger='bar')
-        
-        print(f"\nSuccessfully created video: {output_path}")
+        log.info("All frames generated. Assembling video with MoviePy...")
+        started = time.perf_counter()
+        with span("text_video.encode", frames=total_frames):
+            clip = ImageSequenceClip(frame_paths, fps=fps)
+            clip.write_videofile(output_path, codec="libx264", audio=False, logger='bar')
+        record_encode("text", total_frames, fps, time.perf_counter() - started)
+
+        log.info(f"Successfully created video: {output_path}")
         return output_path
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        log.error(f"An error occurred: {e}")
         raise
     finally:
         # Clean up ONLY the temporary files for this specific function call.
-        if os.path.exists(temp_folder):
+        if not transparent and os.path.exists(temp_folder):
             shutil.rmtree(temp_folder)
         # REMOVED: pygame.quit() from here
 
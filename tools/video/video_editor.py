@@ -1,114 +1,610 @@
 import json
+import os
+import subprocess
+import time
+
+import imageio_ffmpeg
 import numpy as np
-from moviepy.editor import (VideoFileClip, ImageClip, AudioFileClip, 
-                            CompositeVideoClip)
 
-def apply_media_effects(clip):
+from tools.cache import file_sha256, make_cache_key
+from tools.log import get_logger
+from tools.metrics import FFMPEG_READERS, MEMORY_CACHE_LOOKUPS, record_encode
+from tools.trace import span
+from tools.text.timeline import WordTimeline
+from tools.video.preflight import is_placeable, run_preflight
+from tools.video.captions import CaptionTrack
+from moviepy.editor import (VideoFileClip, ImageClip, AudioFileClip, ColorClip,
+                            CompositeVideoClip, VideoClip)
+
+log = get_logger(__name__)
+
+SCREEN_SIZE = (1920, 1080)
+MEDIA_BOX = (1200, 880)  # bounding box for overlays, leaving margins around them
+
+# Motion of image and GIF overlays. Renders take overrides as motion={...}
+# (e.g. {"shake_amount": 0} for still overlays).
+DEFAULT_MOTION = {
+    "shake_amount": 3,         # pixels of displacement
+    "shake_frequency_x": 2,    # shakes per second horizontally
+    "shake_frequency_y": 2,    # and vertically
+    "ken_burns": False,        # slow pan/zoom on still images instead of the shake
+    "zoom": 1.15,              # Ken Burns scale at the tight end of the move
+    "pan": 0.6,                # share of the room left by the zoom that the view drifts across
+}
+
+
+def motion_settings(motion=None):
+    """DEFAULT_MOTION with the given overrides applied; raises ValueError on invalid settings."""
+    unknown = set(motion or {}) - set(DEFAULT_MOTION)
+    if unknown:
+        raise ValueError(f"Unknown motion settings: {', '.join(sorted(unknown))}")
+    settings = {**DEFAULT_MOTION, **(motion or {})}
+    # Outside these ranges the Ken Burns crop would leave the image
+    if settings["zoom"] < 1:
+        raise ValueError(f"Motion zoom must be at least 1, got {settings['zoom']}")
+    if not 0 <= settings["pan"] <= 1:
+        raise ValueError(f"Motion pan must be between 0 and 1, got {settings['pan']}")
+    return settings
+
+
+def shake_offsets(frames, fps, motion=None):
     """
-    Applies resizing to create margins and a camera shake effect.
+    Integer (dx, dy) shake offsets for every frame of a clip, computed for
+    all frames at once. Sine horizontally and cosine vertically, so the
+    motion traces a loop instead of a line.
+    """
+    motion = motion_settings(motion)
+    t = np.arange(frames) / fps
+    dx = np.rint(motion["shake_amount"] * np.sin(t * motion["shake_frequency_x"] * 2 * np.pi))
+    dy = np.rint(motion["shake_amount"] * np.cos(t * motion["shake_frequency_y"] * 2 * np.pi))
+    return dx.astype(np.int32), dy.astype(np.int32)
+
+
+def frame_positions(xs, ys, fps):
+    """
+    moviepy position function backed by per-frame tables: the compositor's
+    call for time t becomes a list lookup, and the integer positions keep
+    the blit on whole pixels.
+    """
+    table = list(zip(xs.tolist(), ys.tolist()))
+    last = len(table) - 1
+
+    def position(t):
+        return table[min(max(int(t * fps + 0.5), 0), last)]
+    return position
+
+
+def fit_scale(size):
+    """Scale factor that fits media of this size inside MEDIA_BOX."""
+    return min(MEDIA_BOX[0] / size[0], MEDIA_BOX[1] / size[1])
+
+
+def apply_media_effects(clip, fps=30, motion=None):
+    """
+    Applies resizing to create margins and a camera shake effect. The shake
+    is precomputed for every frame of the clip at fps (see shake_offsets).
     """
     # --- 1. Resize to fit with margins ---
-    # Define screen and max media dimensions
-    screen_w, screen_h = 1920, 1080
-    max_media_w, max_media_h = 1200, 880 # Bounding box for margins
-
-    # Calculate scale factor to fit inside the bounding box
-    original_w, original_h = clip.size
-    scale_factor = min(max_media_w / original_w, max_media_h / original_h)
-    
-    resized_clip = clip.resize(scale_factor)
+    resized_clip = clip.resize(fit_scale(clip.size))
     resized_w, resized_h = resized_clip.size
 
     # --- 2. Create camera shake effect ---
-    # Shake parameters (you can tweak these)
-    SHAKE_AMOUNT = 3  # Pixels of displacement
-    SHAKE_FREQUENCY_X = 2 # How fast it shakes horizontally
-    SHAKE_FREQUENCY_Y = 2 # How fast it shakes vertically (different for irregular motion)
-
     # Calculate the centered (x, y) position
-    center_x = (screen_w - resized_w) / 2
-    center_y = (screen_h - resized_h) / 2
+    center_x = (SCREEN_SIZE[0] - resized_w) // 2
+    center_y = (SCREEN_SIZE[1] - resized_h) // 2
 
-    # Define a function that returns the position (x, y) at a given time 't'
-    def shake_position(t):
-        # Use sine waves for smooth, continuous motion
-        dx = SHAKE_AMOUNT * np.sin(t * SHAKE_FREQUENCY_X * 2 * np.pi)
-        dy = SHAKE_AMOUNT * np.cos(t * SHAKE_FREQUENCY_Y * 2 * np.pi) # Use cosine for y for more random movement
-        return (center_x + dx, center_y + dy)
+    # One entry per frame, plus one for a final frame at t == duration
+    frames = int(np.ceil(clip.duration * fps)) + 1
+    dx, dy = shake_offsets(frames, fps, motion)
 
     # Apply the time-varying position
-    return resized_clip.set_position(shake_position)
+    return resized_clip.set_position(frame_positions(center_x + dx, center_y + dy, fps))
+
+
+def ken_burns_rects(source_size, frames, zoom, pan, direction=0):
+    """
+    Crop rectangle (x, y, width, height) of every frame of a Ken Burns move
+    over a source of source_size, as float arrays. Even directions zoom in
+    and odd ones zoom out; direction // 2 picks the diagonal the view
+    drifts along. The drift grows with the zoom, so for zoom >= 1 and
+    0 <= pan <= 1 (see motion_settings) the crop never leaves the source.
+    """
+    source_w, source_h = source_size
+    progress = np.linspace(0.0, 1.0, frames)
+    if direction % 2:
+        progress = progress[::-1]
+    scale = 1 + (zoom - 1) * progress
+    width, height = source_w / scale, source_h / scale
+    sign_x, sign_y = ((1, 1), (-1, 1), (1, -1), (-1, -1))[(direction // 2) % 4]
+    x = (source_w - width) / 2 * (1 + sign_x * pan)
+    y = (source_h - height) / 2 * (1 + sign_y * pan)
+    return x, y, width, height
+
+
+# Decoded stills prescaled for Ken Burns, see load_still
+_still_cache = {}
+
+
+def load_still(image_path, zoom):
+    """
+    Decodes an image once and resizes it once (with moviepy's regular
+    filter) to its fitted overlay size times zoom, the largest scale a Ken
+    Burns move needs. Pixels are packed one uint32 each, so cropping a frame
+    is two np.take calls. Kept per (path, mtime, zoom) like load_background.
+
+    Returns:
+        tuple: (packed pixels, fitted overlay size)
+    """
+    key = (os.path.abspath(image_path), os.path.getmtime(image_path), zoom)
+    entry = _still_cache.get(key)
+    MEMORY_CACHE_LOOKUPS.inc(cache="still", result="miss" if entry is None else "hit")
+    if entry is None:
+        clip = ImageClip(image_path)
+        scale = fit_scale(clip.size)
+        out_size = (int(clip.size[0] * scale), int(clip.size[1] * scale))
+        rgb = clip.resize((round(out_size[0] * zoom), round(out_size[1] * zoom))).get_frame(0)[:, :, :3]
+        rgba = np.zeros(rgb.shape[:2] + (4,), dtype=np.uint8)
+        rgba[:, :, :3] = rgb
+        entry = (rgba.view(np.uint32)[:, :, 0], out_size)
+        if len(_still_cache) >= 16:
+            _still_cache.pop(next(iter(_still_cache)))
+        _still_cache[key] = entry
+    return entry
+
+
+def ken_burns_clip(image_path, duration, fps=30, motion=None, direction=0):
+    """
+    Still image with a slow pan/zoom, sized and centered like
+    apply_media_effects. The image is decoded once at the largest scale the
+    move needs (see load_still); every frame is a nearest-neighbour crop of
+    that, with all crop rectangles computed ahead of time. Since no frame
+    shrinks the source by more than the zoom factor, nearest-neighbour
+    stays close to a filtered resize at a fraction of its cost.
+    """
+    motion = motion_settings(motion)
+    zoom = float(motion["zoom"])
+    source, (out_w, out_h) = load_still(image_path, zoom)
+    source_h, source_w = source.shape
+
+    frames = int(np.ceil(duration * fps)) + 1
+    rect_x, rect_y, rect_w, rect_h = ken_burns_rects((source_w, source_h), frames, zoom,
+                                                     float(motion["pan"]), direction)
+    columns = np.arange(out_w) + 0.5
+    rows = np.arange(out_h) + 0.5
+
+    def make_frame(t):
+        i = min(max(int(t * fps + 0.5), 0), frames - 1)
+        # Clipped on both sides: np.take would wrap a negative index around to the far edge
+        xs = np.clip((rect_x[i] + columns * (rect_w[i] / out_w)).astype(np.intp), 0, source_w - 1)
+        ys = np.clip((rect_y[i] + rows * (rect_h[i] / out_h)).astype(np.intp), 0, source_h - 1)
+        packed = np.take(np.take(source, ys, axis=0), xs, axis=1)
+        return packed.view(np.uint8).reshape(out_h, out_w, 4)[:, :, :3]
+
+    position = ((SCREEN_SIZE[0] - out_w) // 2, (SCREEN_SIZE[1] - out_h) // 2)
+    return VideoClip(make_frame, duration=duration).set_position(position)
+
+
+# Resized background frames, see load_background
+_background_cache = {}
+
+# Flat card shown in the slot of an asset whose media failed preflight
+PLACEHOLDER_SIZE = (960, 540)
+PLACEHOLDER_COLOR = (48, 48, 48)
+
+
+def media_path(item, media_dir="output"):
+    """File that generate_asset_files writes for a mapped asset."""
+    if item["type"] == "text":
+        # Transparent .mov clips; media from before they existed is an opaque full-frame .mp4
+        path = os.path.join(media_dir, "text", f"{item['order_id']}.mov")
+        legacy_path = os.path.splitext(path)[0] + ".mp4"
+        return legacy_path if not os.path.exists(path) and os.path.exists(legacy_path) else path
+    extension = "jpg" if item["type"] == "image" else "mp4"
+    return os.path.join(media_dir, item["type"], f"{item['order_id']}.{extension}")
+
+
+def open_reader(clip_class, path, readers=None):
+    """
+    Opens a VideoFileClip or AudioFileClip, each backed by an ffmpeg process,
+    and adds it to readers so the caller can close it with close_readers.
+    Without a readers list the clip is the caller's to close and is not counted.
+    """
+    clip = clip_class(path)
+    if readers is None:
+        return clip
+    FFMPEG_READERS.inc()
+    readers.append(clip)
+    return clip
+
+
+def close_readers(readers):
+    """Closes the clips opened with open_reader, ending their ffmpeg processes."""
+    while readers:
+        clip = readers.pop()
+        try:
+            clip.close()
+        finally:
+            FFMPEG_READERS.dec()
+
+
+def build_overlay_clip(item, offset_sec=0, media_dir="output", readers=None, fps=30, motion=None):
+    """
+    Builds the overlay clip for one mapped asset, placed at its start time
+    minus offset_sec (the start of the segment being rendered). File clips it
+    opens are added to readers; the caller closes them after encoding.
+    Items repaired by preflight become a placeholder card or nothing. fps
+    and motion set up the shake of images and GIFs (see apply_media_effects).
+    """
+    # Checked first: items skipped for bad timings have no usable start/end
+    repair = item.get("repair")
+    if repair == "skip":
+        return None
+
+    start_sec = item["start"] / 1000 - offset_sec
+    end_sec = item["end"] / 1000 - offset_sec
+    duration = end_sec - start_sec
+    clip_type = item["type"]
+    clip_path = media_path(item, media_dir)
+
+    if repair == "placeholder":
+        return (ColorClip(PLACEHOLDER_SIZE, color=PLACEHOLDER_COLOR, duration=duration)
+                .set_start(start_sec)
+                .set_position("center"))
+
+    if clip_type == "text":
+        # Alpha-channel clips are only as big as their text, centered on the frame.
+        # A clip shorter than its slot ends early rather than reading past its last frame.
+        transparent = clip_path.endswith(".mov")
+        return (open_reader(lambda path: VideoFileClip(path, has_mask=transparent), clip_path, readers)
+                .subclip(0, min(duration, item.get("clip_seconds", duration)))
+                .set_start(start_sec)
+                .set_position("center")) # Text remains centered without effects
+
+    elif clip_type == "image":
+        if motion_settings(motion)["ken_burns"]:
+            # Alternate zoom in/out and drift direction from one image to the next
+            return ken_burns_clip(clip_path, duration, fps, motion, item["order_id"]).set_start(start_sec)
+        img_clip = ImageClip(clip_path).set_duration(duration)
+        # Apply resizing for margins and the shake effect
+        return apply_media_effects(img_clip, fps, motion).set_start(start_sec)
+
+    elif clip_type == "gif":
+        gif_clip = open_reader(VideoFileClip, clip_path, readers)
+        # Loop the GIF to fill the required duration
+        looped_gif = gif_clip.loop(duration=duration)
+        # Apply resizing for margins and the shake effect
+        return apply_media_effects(looped_gif, fps, motion).set_start(start_sec)
+
+    return None
 
 
 def render_video(mapped_json_path,
                  background_image_path="background.jpg",
                  output_video_path="output/render/final.mp4",
-                 audio_path="output/audio/01.mp3"):
+                 audio_path="output/audio/01.mp3",
+                 fps=30,
+                 progress=None,
+                 preflight_policy="placeholder",
+                 motion=None,
+                 transcript_path=None,
+                 caption_style=None):
+    """
+    Renders the mapped assets of mapped_json_path over the background with
+    the narration. With transcript_path (a transcript.json with word
+    timings), karaoke captions are drawn on top; see render_timeline. The
+    transcript is loaded through WordTimeline.from_transcript, which writes
+    its binary sidecar next to it.
+    """
 
     # Load JSON
     with open(mapped_json_path, "r") as f:
         mapped = json.load(f)
+    captions = WordTimeline.from_transcript(transcript_path) if transcript_path else None
+
+    return render_timeline(mapped, background_image_path, output_video_path, audio_path, fps,
+                           progress=progress, preflight_policy=preflight_policy, motion=motion,
+                           captions=captions, caption_style=caption_style)
+
+
+def render_timeline(mapped,
+                    background_image_path="background.jpg",
+                    output_video_path="output/render/final.mp4",
+                    audio_path="output/audio/01.mp3",
+                    fps=30,
+                    media_dir="output",
+                    progress=None,
+                    preflight_policy="placeholder",
+                    motion=None,
+                    captions=None,
+                    caption_style=None):
+    """
+    In-memory core of render_video: takes the mapped asset list. Overlay
+    media is read from media_dir, where generate_asset_files wrote it.
+    progress, if given, is called with the fraction of frames written.
+    Every input is checked by preflight first, and broken assets are handled
+    by preflight_policy (see preflight.POLICIES; None skips the check).
+    motion overrides DEFAULT_MOTION for image and GIF overlays.
+    captions (a transcript dict, word list or WordTimeline) adds karaoke
+    captions in caption_style (overrides of DEFAULT_CAPTION_STYLE).
+    """
 
     # Prepare all overlay clips
     overlay_clips = []
     if not mapped:
-        print("JSON file is empty. Cannot render video.")
+        log.warning("JSON file is empty. Cannot render video.")
+        return
+    if preflight_policy:
+        mapped, _ = run_preflight(mapped, audio_path, background_image_path, fps, media_dir, preflight_policy)
+    # Items without a usable slot can neither be placed nor set the video length
+    mapped = [item for item in mapped if is_placeable(item)]
+    if not mapped:
+        log.warning("No asset has a usable start/end. Cannot render video.")
         return
-        
+
     total_duration_ms = mapped[-1]["end"]
     total_duration_sec = total_duration_ms / 1000
 
-    for item in mapped:
-        start_sec = item["start"] / 1000
-        end_sec = item["end"] / 1000
-        duration = end_sec - start_sec
-        order_id = item["order_id"]
-        clip_type = item["type"]
-        
-        clip = None # Initialize clip to None
-
-        if clip_type == "text":
-            clip_path = f"output/text/{order_id}.mp4"
-            clip = (VideoFileClip(clip_path)
-                    .subclip(0, duration)
-                    .set_start(start_sec)
-                    .set_position("center")) # Text remains centered without effects
-
-        elif clip_type == "image":
-            clip_path = f"output/image/{order_id}.jpg"
-            img_clip = ImageClip(clip_path).set_duration(duration)
-            # Apply resizing for margins and the shake effect
-            clip = apply_media_effects(img_clip).set_start(start_sec)
-            
-        elif clip_type == "gif":
-            clip_path = f"output/gif/{order_id}.mp4"
-            gif_clip = VideoFileClip(clip_path)
-            # Loop the GIF to fill the required duration
-            looped_gif = gif_clip.loop(duration=duration)
-            # Apply resizing for margins and the shake effect
-            clip = apply_media_effects(looped_gif).set_start(start_sec)
-            
+    readers = []
+    try:
+        with span("render.load", category="render", assets=len(mapped)):
+            for item in mapped:
+                clip = build_overlay_clip(item, media_dir=media_dir, readers=readers, fps=fps, motion=motion)
+                if clip is not None:
+                    overlay_clips.append(clip)
+            background = load_background(background_image_path)
+            audio = open_reader(AudioFileClip, audio_path, readers)
+            if captions is not None:
+                caption_clip = CaptionTrack(captions, caption_style, SCREEN_SIZE).clip(total_duration_sec, fps)
+                if caption_clip is not None:
+                    overlay_clips.append(caption_clip)
+
+        # --- Composition ---
+        with span("render.composite", category="render", layers=len(overlay_clips) + 1):
+            background_clip = ImageClip(background, duration=total_duration_sec)
+
+            final_video = CompositeVideoClip([background_clip] + overlay_clips)
+
+            # --- Finalizing with Audio ---
+            final_duration = min(final_video.duration, audio.duration)
+
+            final_video = final_video.set_duration(final_duration)
+            final_video = final_video.set_audio(audio.set_duration(final_duration))
+
+        # --- Export ---
+        # Temp audio next to the output instead of ./temp-audio.m4a, so parallel renders don't collide
+        temp_audiofile = os.path.splitext(output_video_path)[0] + ".temp-audio.m4a"
+        frames = round(final_duration * fps)
+        started = time.perf_counter()
+        # moviepy encodes the audio first and muxes it while writing the frames, so encode covers both
+        with span("render.encode", category="render", frames=frames, fps=fps):
+            final_video.write_videofile(output_video_path, fps=fps, codec="libx264", audio_codec="aac",
+                                        temp_audiofile=temp_audiofile, logger=frame_logger(progress))
+        record_encode("timeline", frames, fps, time.perf_counter() - started)
+    finally:
+        close_readers(readers)
+    log.info("Video rendered successfully!", extra={"path": output_video_path})
+
+
+def frame_logger(progress=None):
+    """
+    moviepy logger for write_videofile: the usual console bar, or with a
+    progress callable, one that reports the fraction of frames written.
+    """
+    if progress is None:
+        return "bar"
+    from proglog import ProgressBarLogger
+
+    class FrameProgressLogger(ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            # moviepy iterates video frames over the "t" bar (audio uses "chunk")
+            if bar == "t" and attr == "index":
+                total = self.bars[bar].get("total")
+                if total:
+                    progress(min(1.0, (value + 1) / total))
+
+    return FrameProgressLogger()
+
+
+def plan_segments(mapped, fps=30, segment_seconds=10):
+    """
+    Groups consecutive mapped assets into render segments of about
+    segment_seconds. Boundaries fall on asset start times rounded to whole
+    frames, so no overlay spans two segments and the encoded segments join
+    without drift.
+
+    Returns:
+        list: dicts with "index", "start"/"end" (seconds) and "items" (indices into mapped).
+    """
+    if not mapped:
+        return []
+    total_frames = round(mapped[-1]["end"] / 1000 * fps)
+    segments = []
+    first, start_frame = 0, 0
+    for i in range(1, len(mapped) + 1):
+        if i < len(mapped):
+            boundary = round(mapped[i]["start"] / 1000 * fps)
+            if boundary <= start_frame or (boundary - start_frame) / fps < segment_seconds:
+                continue
         else:
-            continue
+            boundary = max(total_frames, start_frame + 1)
+        segments.append({
+            "index": len(segments),
+            "start": start_frame / fps,
+            "end": boundary / fps,
+            "items": list(range(first, i)),
+        })
+        first, start_frame = i, boundary
+    return segments
+
+
+def load_background(background_image_path, size=(1920, 1080)):
+    """
+    Decoded and resized background frame. Frames are kept per (path, mtime,
+    size), so segments and later renders in the same process reuse them.
+    """
+    key = (os.path.abspath(background_image_path), os.path.getmtime(background_image_path), tuple(size))
+    frame = _background_cache.get(key)
+    MEMORY_CACHE_LOOKUPS.inc(cache="background", result="miss" if frame is None else "hit")
+    if frame is None:
+        frame = ImageClip(background_image_path).resize(size).get_frame(0)
+        if len(_background_cache) >= 4:
+            _background_cache.pop(next(iter(_background_cache)))
+        _background_cache[key] = frame
+    return frame
+
+
+def segment_path(segment_dir, segment):
+    return os.path.join(segment_dir, f"segment_{segment['index']:04d}.mp4")
+
+
+def segment_fingerprint(mapped, segment, background_hash, fps=30, media_dir="output", motion=None,
+                        captions=None):
+    """What a rendered segment depends on: its bounds, fps, background, motion, overlay media and captions."""
+    items = []
+    for i in segment["items"]:
+        item = mapped[i]
+        path = media_path(item, media_dir)
+        items.append([item["type"], item["start"], item["end"],
+                      file_sha256(path) if os.path.exists(path) else None])
+    # Uncaptioned segments keep the fingerprints they had before captions existed
+    extra = [captions.fingerprint(segment["start"], segment["end"])] if captions is not None else []
+    return make_cache_key("segment", segment["start"], segment["end"], fps, background_hash,
+                          motion_settings(motion), items, *extra)
+
+
+def render_segment(mapped, segment, background, output_path, fps=30, media_dir="output", progress=None,
+                   motion=None, captions=None):
+    """
+    Encodes one segment (video only) from its overlays, and its part of the
+    captions with a CaptionTrack. The file is written under a temporary name
+    and renamed when complete, so a finished segment on disk is always whole.
+    """
+    duration = segment["end"] - segment["start"]
+    overlay_clips = []
+    readers = []
+    try:
+        with span("render.load", category="render", segment=segment["index"], assets=len(segment["items"])):
+            for i in segment["items"]:
+                item = mapped[i]
+                if not item.get("repair") and not os.path.exists(media_path(item, media_dir)):
+                    log.warning(f"Missing media for asset {item['order_id']}, leaving its slot empty.",
+                                extra={"asset_id": item["order_id"]})
+                    continue
+                clip = build_overlay_clip(item, segment["start"], media_dir, readers, fps, motion)
+                if clip is not None:
+                    overlay_clips.append(clip)
+            if captions is not None:
+                clip = captions.clip(duration, fps, segment["start"])
+                if clip is not None:
+                    overlay_clips.append(clip)
+
+        with span("render.composite", category="render", segment=segment["index"],
+                  layers=len(overlay_clips) + 1):
+            background_clip = ImageClip(background, duration=duration)
+            video = CompositeVideoClip([background_clip] + overlay_clips).set_duration(duration)
+
+        base, ext = os.path.splitext(output_path)
+        tmp_path = f"{base}.part{ext}"
+        frames = round(duration * fps)
+        started = time.perf_counter()
+        with span("render.encode", category="render", segment=segment["index"], frames=frames, fps=fps):
+            video.write_videofile(tmp_path, fps=fps, codec="libx264", audio=False,
+                                  logger=frame_logger(progress) if progress else None)
+        record_encode("segment", frames, fps, time.perf_counter() - started)
+    finally:
+        close_readers(readers)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def concat_segments(segment_paths, audio_path, output_video_path):
+    """
+    Joins encoded segments without re-encoding them and muxes the narration,
+    cut to the shorter of video and audio like render_timeline does.
+    """
+    list_path = os.path.splitext(output_video_path)[0] + ".segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
 
-        overlay_clips.append(clip)
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error",
+           "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_path,
+           "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-shortest",
+           output_video_path]
+    with span("render.mux", category="render", segments=len(segment_paths)):
+        subprocess.run(cmd, check=True)
+    os.remove(list_path)
+    return output_video_path
 
-    # --- Composition ---
-    background_clip = ImageClip(background_image_path, duration=total_duration_sec).resize((1920, 1080))
-    
-    final_video = CompositeVideoClip([background_clip] + overlay_clips)
 
-    # --- Finalizing with Audio ---
-    audio = AudioFileClip(audio_path)
-    
-    final_duration = min(final_video.duration, audio.duration)
-    
-    final_video = final_video.set_duration(final_duration)
-    final_video = final_video.set_audio(audio.set_duration(final_duration))
+def render_segmented(mapped,
+                     background_image_path="background.jpg",
+                     output_video_path="output/render/final.mp4",
+                     audio_path="output/audio/01.mp3",
+                     fps=30,
+                     segment_seconds=10,
+                     segment_dir=None,
+                     journal=None,
+                     media_dir="output",
+                     progress=None,
+                     preflight_policy="placeholder",
+                     motion=None,
+                     captions=None,
+                     caption_style=None):
+    """
+    Renders the timeline as independently encoded segments that are then
+    joined losslessly. Each segment only composites its own overlays, and
+    segments can be encoded as soon as their assets exist. With a
+    RunJournal, segments finished by an earlier run are verified and
+    reused, so a crashed render resumes at the first unfinished segment.
+    progress, if given, is called with the fraction of the timeline done.
+    preflight_policy, motion, captions and caption_style work as in
+    render_timeline; the caption layout is computed once for all segments.
+    """
+    if not mapped:
+        log.warning("JSON file is empty. Cannot render video.")
+        return
+    if preflight_policy:
+        mapped, _ = run_preflight(mapped, audio_path, background_image_path, fps, media_dir, preflight_policy)
+    # Segments are planned on asset times, so items without a usable slot are left out
+    mapped = [item for item in mapped if is_placeable(item)]
+    segments = plan_segments(mapped, fps, segment_seconds)
+    if not segments:
+        log.warning("No asset has a usable start/end. Cannot render video.")
+        return
+    segment_dir = segment_dir or os.path.splitext(output_video_path)[0] + "_segments"
+    os.makedirs(segment_dir, exist_ok=True)
+    if captions is not None:
+        captions = CaptionTrack(captions, caption_style, SCREEN_SIZE)
+
+    background = None  # decoded only if some segment has to be rendered
+    background_hash = file_sha256(background_image_path)
+    total = segments[-1]["end"]
+    paths = []
+    for segment in segments:
+        path = segment_path(segment_dir, segment)
+        paths.append(path)
+        fingerprint = segment_fingerprint(mapped, segment, background_hash, fps, media_dir, motion, captions)
+        if journal is not None and journal.is_done("segment", path, fingerprint):
+            log.info(f"Segment {segment['index'] + 1}/{len(segments)} already rendered, reusing it.")
+            if progress:
+                progress(segment["end"] / total)
+            continue
+        log.info(f"Rendering segment {segment['index'] + 1}/{len(segments)}...")
+        if background is None:
+            background = load_background(background_image_path)
+        # Frames of this segment advance the overall fraction by its share of the timeline
+        on_frames = None
+        if progress:
+            on_frames = lambda f, s=segment: progress((s["start"] + f * (s["end"] - s["start"])) / total)
+        render_segment(mapped, segment, background, path, fps, media_dir, on_frames, motion, captions)
+        if journal is not None:
+            journal.record("segment", path, fingerprint, [path])
 
-    # --- Export ---
-    final_video.write_videofile(output_video_path, fps=30, codec="libx264", audio_codec="aac")
-    print("Video rendered successfully!")
+    concat_segments(paths, audio_path, output_video_path)
+    log.info("Video rendered successfully!", extra={"path": output_video_path})
+    return output_video_path
 
 # Example usage:
 # render_video("mapped.json")
\ No newline at end of file